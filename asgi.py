@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point: async serving mode for the stats dashboard
+    
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+
+/api/stats, /health and /metrics are served on the event loop. Collections
+run as coroutines on the shared httpx client (YouTube and Search Console,
+which use the synchronous Google client, run in threads), so a slow
+platform never holds up other visitors or health probes. All other routes
+are handed to the Flask app in a worker thread.
+"""
+
+import asyncio
+import io
+import os
+import sys
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import BadRequest
+
+import stats
+from collectors import async_transport, metrics, tracing
+
+
+async def send_response(send, status, body, content_type, headers=()):
+    """Send a complete (non-streamed) response"""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode()),
+            (b'content-length', str(len(body)).encode()),
+            *headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def health(scope, receive, send):
+    """/health, answered without waiting for any collection"""
+    body = stats.app.json.dumps(await asyncio.to_thread(stats.health_status)).encode()
+    await send_response(send, 200, body, 'application/json')
+
+
+async def prometheus_metrics(scope, receive, send):
+    """/metrics in Prometheus text format (totals read from the shared SQLite file in a worker thread)"""
+    body = await asyncio.to_thread(metrics.REGISTRY.render)
+    await send_response(send, 200, body.encode(), 'text/plain; version=0.0.4')
+
+
+async def api_stats(scope, receive, send):
+    """/api/stats streamed from the async collectors (same lines as the Flask route)"""
+    query = scope['query_string'].decode('latin-1')
+    args = MultiDict(parse_qsl(query, keep_blank_values=True))
+    try:
+        selected, days, start, end = stats.dashboard_args(args)
+    except BadRequest:
+        # Invalid parameters: the Flask route answers with the same 400
+        await wsgi(scope, receive, send)
+        return
+    
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'application/x-ndjson'), (b'x-accel-buffering', b'no')]
+    })
+    
+    with tracing.request_trace(f"GET {scope['path']}?{query}", args.get('trace') == '1') as trace:
+        async for platform, value, meta in stats.iter_stats_async(selected or None, days, start, end):
+            with stats.app.app_context():
+                line = stats.stream_line(platform, value, meta)
+            await send({'type': 'http.response.body', 'body': line.encode(), 'more_body': True})
+    await send({'type': 'http.response.body', 'body': stats.stream_end(trace).encode()})
+
+
+ROUTES = {
+    '/api/stats': api_stats,
+    '/health': health,
+    '/metrics': prometheus_metrics
+}
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope and its request body"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('',))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'content-length':
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def call_wsgi(environ):
+    """Run the Flask app for one request; returns (status, headers, body)"""
+    response = {}
+    
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+    
+    result = stats.app(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], body
+
+
+async def wsgi(scope, receive, send):
+    """Serve a request with the Flask app in a worker thread"""
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    
+    status, headers, content = await asyncio.to_thread(call_wsgi, wsgi_environ(scope, body))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    })
+    await send({'type': 'http.response.body', 'body': content})
+
+
+async def lifespan(receive, send):
+    """Start the background threads; on shutdown close the HTTP client, stop them and flush metrics"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            stats.start_background()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_transport.close()
+            stats.scheduler.stop()
+            metrics.REGISTRY.stop_flushing()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    
+    handler = ROUTES.get(scope['path'])
+    if handler and scope['method'] == 'GET':
+        await handler(scope, receive, send)
+    else:
+        await wsgi(scope, receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    
+    uvicorn.run('asgi:app', host='0.0.0.0', port=int(os.getenv('PORT', 5050)))
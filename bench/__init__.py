@@ -0,0 +1,4 @@
+"""
+Offline benchmarks: synthetic API fixtures, a transport-level replay
+layer and a runner (python -m bench.run)
+"""
@@ -0,0 +1,33 @@
+"""
+Server entry points for the concurrency benchmark
+
+Imported by gunicorn (bench.apps:wsgi_app) or uvicorn (bench.apps:asgi_app)
+in a child process started by bench.concurrency. Every collector call is
+replayed from SyntheticAPIs for the life of the process, and the stats
+cache is turned off so each request runs a full collection.
+"""
+
+import os
+import tempfile
+from contextlib import ExitStack
+
+from .fixtures import SyntheticAPIs
+from .run import configure_environment
+
+workdir = os.getenv('BENCH_WORKDIR') or tempfile.mkdtemp(prefix='stats-bench-')
+configure_environment(workdir)
+os.environ.update({'STATS_CACHE_TTL': '0', 'STATS_CACHE_STALE_TTL': '0', 'STORE_SYNC_TTL': '0'})
+
+# Imported late: these modules read the environment at import time
+import asgi  # noqa: E402
+import stats  # noqa: E402
+from .replay import replay  # noqa: E402
+
+_replay = ExitStack()
+_replay.enter_context(replay(SyntheticAPIs(
+    latency=float(os.getenv('BENCH_LATENCY', 0.05)),
+    padding=int(os.getenv('BENCH_PADDING', 200))
+)))
+
+wsgi_app = stats.app
+asgi_app = asgi.app
@@ -0,0 +1,179 @@
+"""
+Concurrent serving benchmark: gunicorn (sync worker) vs uvicorn (ASGI)
+
+Starts each server on bench.apps, then has --clients threads request
+/api/stats back to back for --duration seconds while a probe polls /health.
+Every request is a cold collection against SyntheticAPIs, so the numbers
+show how many dashboard loads one process can serve at once and whether
+health checks stay responsive meanwhile.
+
+Usage:
+    python -m bench.concurrency [--servers gunicorn,uvicorn] [--clients 8]
+                                [--duration 10] [--latency 0.05] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+SERVERS = {
+    'gunicorn': lambda port: [
+        sys.executable, '-m', 'gunicorn', 'bench.apps:wsgi_app',
+        '--bind', f'127.0.0.1:{port}', '--workers', '1', '--timeout', '120'
+    ],
+    'uvicorn': lambda port: [
+        sys.executable, '-m', 'uvicorn', 'bench.apps:asgi_app',
+        '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'
+    ]
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def fetch(url, timeout=120):
+    """GET url and read the whole body; returns seconds taken"""
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def wait_until_up(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            fetch(url, timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not answer {url} within {timeout}s")
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(int(len(values) * fraction), len(values) - 1)], 4)
+
+
+def load(base_url, clients, duration):
+    """
+    Run the clients and the health probe against a started server
+
+    Returns:
+        dict with requests, errors, req_per_s, p50/p95 of /api/stats and
+        p50/max of /health
+    """
+    stop_at = time.monotonic() + duration
+    latencies = []
+    health = []
+    errors = []
+    lock = threading.Lock()
+
+    def client():
+        while time.monotonic() < stop_at:
+            try:
+                seconds = fetch(f'{base_url}/api/stats')
+            except OSError as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(seconds)
+
+    def probe():
+        while time.monotonic() < stop_at:
+            try:
+                health.append(fetch(f'{base_url}/health', timeout=30))
+            except OSError as e:
+                errors.append(f'health: {e}')
+            time.sleep(0.2)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)] + [threading.Thread(target=probe)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'req_per_s': round(len(latencies) / elapsed, 2),
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'health_p50': percentile(health, 0.5),
+        'health_max': round(max(health), 4) if health else None,
+        'mean': round(statistics.mean(latencies), 4) if latencies else None
+    }
+
+
+def run_server(name, args):
+    """Start one server in a fresh work directory, load it, then stop it"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        BENCH_WORKDIR=tempfile.mkdtemp(prefix=f'stats-bench-{name}-'),
+        BENCH_LATENCY=str(args.latency)
+    )
+    process = subprocess.Popen(SERVERS[name](port), env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_until_up(f'{base_url}/health', process)
+        # One request first, so imports and store creation are not measured
+        fetch(f'{base_url}/api/stats')
+        return load(base_url, args.clients, args.duration)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent serving benchmark')
+    parser.add_argument('--servers', default=','.join(SERVERS), help='comma-separated servers to run')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent /api/stats clients')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load per server')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every API call')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args(argv)
+
+    selected = [name for name in args.servers.split(',') if name]
+    unknown = [name for name in selected if name not in SERVERS]
+    if unknown:
+        parser.error(f"unknown servers: {', '.join(unknown)}")
+
+    results = {name: run_server(name, args) for name in selected}
+
+    print(f"{'server':<10}{'requests':>10}{'errors':>8}{'req/s':>8}{'p50 (s)':>9}{'p95 (s)':>9}{'health p50':>12}{'health max':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:<10}{result['requests']:>10}{result['errors']:>8}{result['req_per_s']:>8}"
+            f"{result['p50']!s:>9}{result['p95']!s:>9}{result['health_p50']!s:>12}{result['health_max']!s:>12}"
+        )
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""Synthetic stand-ins for the Reddit, GitHub, YouTube Data and Search Console APIs"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def _iso(ts):
+    return datetime.utcfromtimestamp(ts).strftime(TIME_FORMAT)
+
+
+class SyntheticAPIs:
+    """
+    Deterministic fixture data answering the requests the collectors make
+
+    Payload sizes are configurable so benchmarks can model small and large
+    accounts, and every call sleeps for `latency` seconds to model the
+    network round trip.
+    """
+
+    def __init__(self, posts=200, repos=150, events=300, videos=120, countries=20,
+                 history_days=45, latency=0.05, padding=200):
+        """
+        Args:
+            posts: Reddit submissions per user
+            repos: GitHub repositories per user
+            events: GitHub events per user (the real feed stops at 300)
+            videos: YouTube uploads per channel
+            countries: Search Console countries per day
+            history_days: how far back posts, events and videos reach
+            latency: seconds added to every call
+            padding: characters of filler text per item (payload size)
+        """
+        self.posts = posts
+        self.repos = repos
+        self.events = min(events, 300)
+        self.videos = videos
+        self.countries = countries
+        self.history_days = history_days
+        self.latency = latency
+        self.filler = 'x' * padding
+        self.now = time.time()
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    # Dispatch
+
+    def handle(self, method, url, headers=None, body=None, wait=True):
+        """
+        Answer one request
+
+        Args:
+            wait: sleep for `latency` first (callers on an event loop pass
+                False and sleep asynchronously themselves)
+
+        Returns:
+            tuple (status, headers dict, JSON-serialisable body or None)
+        """
+        parsed = urlparse(url)
+        host = parsed.hostname or ''
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        with self._lock:
+            self.calls[host] += 1
+        if self.latency and wait:
+            time.sleep(self.latency)
+
+        if host.endswith('reddit.com'):
+            return self._reddit(parsed.path, query)
+        if host == 'api.github.com' and parsed.path == '/graphql':
+            return self._github_graphql(json.loads(body or '{}'))
+        if host == 'api.github.com':
+            return self._github(url, parsed.path, query, headers or {})
+        if host == 'youtube.googleapis.com':
+            return self._youtube(parsed.path, query)
+        if host == 'searchconsole.googleapis.com':
+            return self._search_console(json.loads(body or '{}'))
+        return 404, {}, {'message': 'Not Found'}
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def _spread(self, index, count):
+        """Timestamp of item index out of count, spread over history_days (newest first)"""
+        return self.now - (index + 0.5) * self.history_days * 86400 / max(count, 1)
+
+    # Reddit
+
+    def _reddit_posts(self, username):
+        return [
+            {
+                'name': f't3_{username}_{i}',
+                'id': f'{username}_{i}',
+                'title': f'Post {i} {self.filler}',
+                'subreddit': f'sub{i % 7}',
+                'permalink': f'/r/sub{i % 7}/comments/{username}_{i}/',
+                'created_utc': self._spread(i, self.posts),
+                'score': (i * 37) % 500,
+                'num_comments': (i * 11) % 80
+            }
+            for i in range(self.posts)
+        ]
+
+    def _reddit(self, path, query):
+        parts = path.strip('/').split('/')
+        if parts[:1] == ['user'] and len(parts) >= 3:
+            posts = self._reddit_posts(parts[1])
+            limit = int(query.get('limit', 25))
+            start = 0
+            if query.get('after'):
+                names = [post['name'] for post in posts]
+                start = names.index(query['after']) + 1 if query['after'] in names else len(posts)
+            page = posts[start:start + limit]
+            after = page[-1]['name'] if page and start + limit < len(posts) else None
+            return 200, {}, {'kind': 'Listing', 'data': {
+                'after': after,
+                'children': [{'kind': 't3', 'data': post} for post in page]
+            }}
+        if path.startswith('/api/info'):
+            wanted = set(query.get('id', '').split(','))
+            children = []
+            for name in wanted:
+                username = name[3:].rsplit('_', 1)[0]
+                children.extend(
+                    {'kind': 't3', 'data': dict(post, score=post['score'] + 1)}
+                    for post in self._reddit_posts(username) if post['name'] == name
+                )
+            return 200, {}, {'kind': 'Listing', 'data': {'after': None, 'children': children}}
+        return 404, {}, {'message': 'Not Found'}
+
+    # GitHub
+
+    def _github_repos(self, username):
+        return [
+            {
+                'name': f'repo{i}',
+                'full_name': f'{username}/repo{i}',
+                'description': self.filler,
+                'stargazers_count': (i * 13) % 90,
+                'forks_count': (i * 7) % 20
+            }
+            for i in range(self.repos)
+        ]
+
+    def _github_events(self, username):
+        return [
+            {
+                'id': str(10 ** 9 + i),
+                'type': 'PushEvent' if i % 3 else 'WatchEvent',
+                'repo': {'name': f'{username}/repo{i % max(self.repos, 1)}'},
+                'created_at': _iso(self._spread(i, self.events)),
+                'payload': {'commits': [{'message': self.filler}] * (1 + i % 3)}
+            }
+            for i in range(self.events)
+        ]
+
+    def _github(self, url, path, query, headers):
+        etag = '"' + hashlib.sha1(url.encode()).hexdigest() + '"'
+        if headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, None
+
+        parts = path.strip('/').split('/')
+        if parts[0] != 'users' or len(parts) < 2:
+            return 404, {}, {'message': 'Not Found'}
+        username = parts[1]
+
+        if len(parts) == 2:
+            return 200, {'ETag': etag}, {
+                'login': username,
+                'bio': self.filler,
+                'public_repos': self.repos,
+                'followers': 120,
+                'following': 30
+            }
+        if parts[2] == 'repos':
+            items = self._github_repos(username)
+        elif parts[2] == 'events':
+            items = self._github_events(username)
+        else:
+            return 404, {}, {'message': 'Not Found'}
+
+        per_page = int(query.get('per_page', 30))
+        page = int(query.get('page', 1))
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        response_headers = {'ETag': etag}
+        if last > 1:
+            base = url.split('?')[0]
+            response_headers['Link'] = (
+                f'<{base}?per_page={per_page}&page={min(page + 1, last)}>; rel="next", '
+                f'<{base}?per_page={per_page}&page={last}>; rel="last"'
+            )
+        return 200, response_headers, items[(page - 1) * per_page:page * per_page]
+
+    def _github_graphql(self, request):
+        """
+        The collector's USER_QUERY and REPOS_QUERY
+
+        Commit contributions are the REST feed's push events summed per
+        repository and day, so both API modes report the same commits.
+        """
+        variables = request.get('variables', {})
+        username = variables.get('login', '')
+        repos = self._github_repos(username)
+        offset = int(variables.get('cursor') or 0)
+        page = repos[offset:offset + 100]
+        repositories = {
+            'totalCount': len(repos),
+            'pageInfo': {
+                'hasNextPage': offset + 100 < len(repos),
+                'endCursor': str(offset + 100) if page else None
+            },
+            'nodes': [{'stargazerCount': repo['stargazers_count'], 'forkCount': repo['forks_count']} for repo in page]
+        }
+        if 'contributionsCollection' not in request.get('query', ''):
+            return 200, {}, {'data': {'user': {'repositories': repositories}}}
+
+        start = variables.get('from', '')
+        end = variables.get('to', '9999')
+        by_repo = {}
+        for event in self._github_events(username):
+            if event['type'] != 'PushEvent' or not start <= event['created_at'] <= end:
+                continue
+            days = by_repo.setdefault(event['repo']['name'], Counter())
+            days[event['created_at'][:10]] += len(event['payload']['commits'])
+        contributions = [
+            {
+                'repository': {'nameWithOwner': repo},
+                'contributions': {'nodes': [
+                    {'occurredAt': f'{day}T00:00:00Z', 'commitCount': count}
+                    for day, count in sorted(days.items(), reverse=True)
+                ]}
+            }
+            for repo, days in by_repo.items()
+        ]
+        return 200, {}, {'data': {'user': {
+            'followers': {'totalCount': 120},
+            'following': {'totalCount': 30},
+            'repositories': repositories,
+            'contributionsCollection': {
+                'totalCommitContributions': sum(sum(days.values()) for days in by_repo.values()),
+                'commitContributionsByRepository': contributions[:100]
+            }
+        }}}
+
+    # YouTube Data API
+
+    def _youtube_videos(self, channel_id):
+        return [
+            {
+                'id': f'{channel_id[-4:]}v{i}',
+                'publishedAt': _iso(self._spread(i, self.videos)),
+                'title': f'Video {i}',
+                'description': self.filler
+            }
+            for i in range(self.videos)
+        ]
+
+    def _youtube(self, path, query):
+        resource = path.rstrip('/').rsplit('/', 1)[-1]
+        page_size = int(query.get('maxResults', 5))
+        offset = int(query.get('pageToken') or 0)
+
+        def paged(items):
+            body = {'items': items[offset:offset + page_size], 'pageInfo': {'totalResults': len(items)}}
+            if offset + page_size < len(items):
+                body['nextPageToken'] = str(offset + page_size)
+            return 200, {}, body
+
+        if resource == 'channels':
+            channel_id = query.get('id') or 'UC' + query.get('forHandle', 'handle').lstrip('@')
+            return 200, {}, {'items': [{
+                'id': channel_id,
+                'statistics': {'subscriberCount': '1500', 'videoCount': str(self.videos), 'viewCount': '250000'},
+                'contentDetails': {'relatedPlaylists': {'uploads': 'UU' + channel_id[2:]}}
+            }]}
+        if resource == 'playlistItems':
+            channel_id = 'UC' + query.get('playlistId', 'UU')[2:]
+            return paged([
+                {
+                    'snippet': {'publishedAt': video['publishedAt'], 'title': video['title'], 'description': video['description']},
+                    'contentDetails': {'videoId': video['id'], 'videoPublishedAt': video['publishedAt']}
+                }
+                for video in self._youtube_videos(channel_id)
+            ])
+        if resource == 'search':
+            after = query.get('publishedAfter', '')[:19]
+            before = query.get('publishedBefore', '9999')[:19]
+            return paged([
+                {
+                    'id': {'kind': 'youtube#video', 'videoId': video['id']},
+                    'snippet': {'publishedAt': video['publishedAt'], 'title': video['title'], 'description': video['description']}
+                }
+                for video in self._youtube_videos(query.get('channelId', 'UC'))
+                if after <= video['publishedAt'][:19] <= before
+            ])
+        if resource == 'videos':
+            return 200, {}, {'items': [
+                {
+                    'id': video_id,
+                    'statistics': {
+                        'viewCount': str(100 + len(video_id) * 17),
+                        'likeCount': str(5 + len(video_id)),
+                        'commentCount': '3'
+                    }
+                }
+                for video_id in query.get('id', '').split(',') if video_id
+            ]}
+        return 404, {}, {'error': {'code': 404, 'message': 'Not Found'}}
+
+    # Search Console
+
+    def _search_console(self, request):
+        dimensions = request.get('dimensions', [])
+        start = datetime.strptime(request.get('startDate', '2000-01-01'), '%Y-%m-%d')
+        end = datetime.strptime(request.get('endDate', '2000-01-01'), '%Y-%m-%d')
+        countries = ['usa', 'ind', 'gbr', 'deu', 'fra', 'can', 'bra', 'aus', 'jpn', 'esp']
+        countries += [f'c{i:02d}' for i in range(max(self.countries - len(countries), 0))]
+        countries = countries[:self.countries]
+
+        totals = {}
+        day = start
+        while day <= end:
+            for i, country in enumerate(countries):
+                values = {'date': day.strftime('%Y-%m-%d'), 'country': country}
+                key = tuple(values.get(dimension, '') for dimension in dimensions)
+                clicks = 5 + (day.day * (i + 1)) % 40
+                entry = totals.setdefault(key, {'clicks': 0, 'impressions': 0})
+                entry['clicks'] += clicks
+                entry['impressions'] += clicks * 20
+            day += timedelta(days=1)
+
+        rows = [
+            {
+                'keys': list(key),
+                'clicks': values['clicks'],
+                'impressions': values['impressions'],
+                'ctr': values['clicks'] / values['impressions'],
+                'position': 8.5
+            }
+            for key, values in totals.items()
+        ]
+        return 200, {}, {'rows': rows[:request.get('rowLimit', 1000)], 'responseAggregationType': 'byProperty'}
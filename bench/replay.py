@@ -0,0 +1,86 @@
+"""Transport-level replay: serve collector HTTP calls from SyntheticAPIs"""
+
+import asyncio
+import json
+from contextlib import contextmanager
+
+import httplib2
+import httpx
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from collectors import async_transport, google_clients, transport
+
+
+class ReplayAdapter(BaseAdapter):
+    """requests adapter answering from the fixtures instead of the network"""
+
+    def __init__(self, apis):
+        super().__init__()
+        self.apis = apis
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        status, headers, body = self.apis.handle(request.method, request.url, request.headers, request.body)
+        response = Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(dict(headers, **{'Content-Type': 'application/json'}))
+        response._content = json.dumps(body).encode() if body is not None else b''
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+class ReplayHttp:
+    """httplib2.Http stand-in for googleapiclient services"""
+
+    def __init__(self, apis):
+        self.apis = apis
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=5, connection_type=None):
+        status, response_headers, payload = self.apis.handle(method, uri, headers, body)
+        info = dict(response_headers, status=str(status))
+        info['content-type'] = 'application/json'
+        return httplib2.Response(info), json.dumps(payload).encode() if payload is not None else b''
+
+
+def replay_transport(apis):
+    """httpx transport for the asyncio collectors; latency is slept on the event loop"""
+    async def handler(request):
+        await asyncio.sleep(apis.latency)
+        status, headers, body = apis.handle(
+            request.method, str(request.url), dict(request.headers), request.content, wait=False
+        )
+        return httpx.Response(status, headers=headers, json=body if body is not None else None)
+
+    return httpx.MockTransport(handler)
+
+
+@contextmanager
+def replay(apis):
+    """
+    Route every collector request to apis for the duration of the block
+
+    Covers the shared requests session (Reddit, GitHub, Twitter, LinkedIn),
+    the asyncio transport's httpx clients and googleapiclient services
+    (YouTube, Search Console).
+    """
+    session = transport.get_session()
+    adapters = dict(session.adapters)
+    adapter = ReplayAdapter(apis)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    google_clients.set_http_factory(lambda: ReplayHttp(apis))
+    async_transport.set_transport_factory(lambda: replay_transport(apis))
+    try:
+        yield apis
+    finally:
+        async_transport.set_transport_factory(None)
+        google_clients.set_http_factory(None)
+        for prefix, original in adapters.items():
+            session.mount(prefix, original)
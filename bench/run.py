@@ -0,0 +1,238 @@
+"""
+Offline collector benchmarks
+
+Times collect_stats, each collector's collect() (GitHub in both API modes) and
+WeeklyStatsCurator.collect_all_stats against SyntheticAPIs, reporting wall
+time, HTTP call count and peak Python memory per case.
+
+Usage:
+    python -m bench.run [--latency 0.05] [--scale 1] [--repeat 3] [--cases reddit,github]
+                        [--warm] [--json results.json]
+                        [--baseline results.json] [--tolerance 0.25]
+
+With --baseline the run exits non-zero if any case got slower or used more
+memory than the baseline by more than the tolerance, or made more calls.
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from .fixtures import SyntheticAPIs
+
+CASES = ['collect_stats', 'reddit', 'github', 'github_graphql', 'youtube', 'gsc', 'curator']
+
+REDDIT_USERS = ['bench_user_a', 'bench_user_b', 'bench_user_c']
+GITHUB_USER = 'bench-user'
+YOUTUBE_CHANNEL = 'UCbenchchannel0001'
+GSC_PROPERTY = 'https://bench.example.com/'
+
+
+def write_service_account(path):
+    """Service account key file with a throwaway RSA key (never sent anywhere)"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'type': 'service_account',
+            'project_id': 'bench',
+            'private_key_id': 'bench',
+            'private_key': pem,
+            'client_email': 'bench@bench.iam.gserviceaccount.com',
+            'client_id': '0',
+            'token_uri': 'https://oauth2.googleapis.com/token'
+        }, f)
+
+
+def configure_environment(workdir, keep_rate_limits=False):
+    """Point every setting the app reads at the fixtures and a scratch directory"""
+    credentials_file = os.path.join(workdir, 'service-account.json')
+    write_service_account(credentials_file)
+
+    env = {
+        'REFRESH_SCHEDULER': 'false',
+        'STATS_DB_PATH': os.path.join(workdir, 'stats.db'),
+        'COLLECT_LEASE_DIR': os.path.join(workdir, 'leases'),
+        'STATS_CACHE_PATH': os.path.join(workdir, 'cache.db'),
+        'STATS_SNAPSHOT_DIR': os.path.join(workdir, 'snapshots'),
+        'GITHUB_ETAG_CACHE': os.path.join(workdir, 'github_etags.db'),
+        'GITHUB_USERNAME': GITHUB_USER,
+        'GITHUB_API_MODE': 'rest',
+        'YOUTUBE_API_KEY': 'bench-key',
+        'YOUTUBE_CHANNEL_ID': YOUTUBE_CHANNEL,
+        'YOUTUBE_DAILY_QUOTA': str(10 ** 9),
+        'GSC_CREDENTIALS_FILE': credentials_file,
+        'GSC_PROPERTY_URL': GSC_PROPERTY,
+        'REDDIT_USERNAME': REDDIT_USERS[0]
+    }
+    for i, username in enumerate(REDDIT_USERS, 1):
+        env[f'REDDIT_USERNAME_{i}'] = username
+    if not keep_rate_limits:
+        # Measure the collectors, not the pacing of the token buckets
+        for platform in ('REDDIT', 'GITHUB', 'TWITTER'):
+            env[f'RATE_LIMIT_{platform}'] = '100000'
+    os.environ.update(env)
+
+
+def reset_state(workdir, iteration):
+    """Forget everything cached between runs, so each run is a cold collection"""
+    import stats
+    from collectors import etag_cache, youtube_collector
+    from dashboard import MetricsStore
+
+    stats.stats_cache.clear()
+    stats.metrics_store = MetricsStore(os.path.join(workdir, f'stats-{iteration}.db'))
+    os.environ['GITHUB_ETAG_CACHE'] = os.path.join(workdir, f'github_etags-{iteration}.db')
+    etag_cache._default = None
+    youtube_collector._uploads_playlists.clear()
+
+
+def case_functions():
+    """Callable per benchmark case (imported after the environment is set)"""
+    import stats
+    from collectors import RedditCollector, GitHubCollector, YouTubeCollector, GSCCollector
+    from weekly_stats_curator import WeeklyStatsCurator
+
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    start = end - timedelta(days=7)
+    return {
+        'collect_stats': lambda: stats.collect_stats(days=7),
+        'reddit': lambda: RedditCollector(REDDIT_USERS[0]).collect(start, end),
+        'github': lambda: GitHubCollector(GITHUB_USER).collect(start, end),
+        'github_graphql': lambda: GitHubCollector(GITHUB_USER, 'bench-token', mode='graphql').collect(start, end),
+        'youtube': lambda: YouTubeCollector('bench-key', YOUTUBE_CHANNEL).collect(start, end),
+        'gsc': lambda: GSCCollector(os.environ['GSC_CREDENTIALS_FILE'], GSC_PROPERTY).collect(start, end),
+        'curator': lambda: WeeklyStatsCurator().collect_all_stats()
+    }
+
+
+def run_case(func, apis, workdir, repeat, warm):
+    """
+    Time one case
+
+    Returns:
+        dict with wall_seconds (median), wall_min, calls (per run) and
+        peak_kib (from an extra run under tracemalloc)
+    """
+    walls = []
+    calls = 0
+    for i in range(repeat + 1):
+        if not warm:
+            reset_state(workdir, f'{id(func)}-{i}')
+        apis.reset_calls()
+
+        # The last run only measures memory; tracing slows it down
+        if i == repeat:
+            tracemalloc.start()
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            break
+
+        started = time.perf_counter()
+        func()
+        walls.append(time.perf_counter() - started)
+        calls = sum(apis.calls.values())
+
+    return {
+        'wall_seconds': round(statistics.median(walls), 4),
+        'wall_min': round(min(walls), 4),
+        'calls': calls,
+        'peak_kib': round(peak / 1024, 1)
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against a baseline, as readable strings"""
+    problems = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result['wall_seconds'] > before['wall_seconds'] * (1 + tolerance):
+            problems.append(f"{name}: wall {result['wall_seconds']}s vs {before['wall_seconds']}s")
+        if result['calls'] > before['calls']:
+            problems.append(f"{name}: {result['calls']} HTTP calls vs {before['calls']}")
+        if result['peak_kib'] > before['peak_kib'] * (1 + tolerance):
+            problems.append(f"{name}: peak {result['peak_kib']} KiB vs {before['peak_kib']} KiB")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline collector benchmarks')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every API call')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier for fixture sizes')
+    parser.add_argument('--padding', type=int, default=200, help='filler characters per item')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case')
+    parser.add_argument('--cases', default=','.join(CASES), help='comma-separated cases to run')
+    parser.add_argument('--warm', action='store_true', help='keep caches and the store between runs')
+    parser.add_argument('--keep-rate-limits', action='store_true', help='leave token-bucket pacing on')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='fail on regressions against this results file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed wall/memory growth')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix='stats-bench-')
+    configure_environment(workdir, args.keep_rate_limits)
+
+    # Imported late: these modules read the environment at import time
+    from .replay import replay
+
+    apis = SyntheticAPIs(
+        posts=int(200 * args.scale),
+        repos=int(150 * args.scale),
+        events=int(300 * args.scale),
+        videos=int(120 * args.scale),
+        countries=max(int(20 * args.scale), 1),
+        latency=args.latency,
+        padding=args.padding
+    )
+
+    functions = case_functions()
+    selected = [name for name in args.cases.split(',') if name]
+    unknown = [name for name in selected if name not in functions]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    results = {}
+    with replay(apis):
+        for name in selected:
+            results[name] = run_case(functions[name], apis, workdir, args.repeat, args.warm)
+
+    print(f"{'case':<14}{'wall (s)':>10}{'min (s)':>10}{'calls':>8}{'peak KiB':>11}")
+    for name, result in results.items():
+        print(f"{name:<14}{result['wall_seconds']:>10}{result['wall_min']:>10}{result['calls']:>8}{result['peak_kib']:>11}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'settings': {key: value for key, value in vars(args).items() if key not in ('json', 'baseline')},
+                'results': results
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            problems = compare(results, json.load(f)['results'], args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
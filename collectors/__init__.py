@@ -2,13 +2,14 @@
 Platform collectors for social media stats
 """
 
-from .reddit_collector import RedditCollector
+from .reddit_collector import RedditCollector, RedditScoreRefresher
 from .youtube_collector import YouTubeCollector
 from .gsc_collector import GSCCollector
 from .github_collector import GitHubCollector
 
 __all__ = [
     'RedditCollector',
+    'RedditScoreRefresher',
     'YouTubeCollector',
     'GSCCollector',
     'GitHubCollector'
@@ -0,0 +1,131 @@
+"""Asyncio counterpart of collectors.transport, on a shared httpx.AsyncClient"""
+
+import asyncio
+import logging
+import time
+import weakref
+from urllib.parse import urlparse
+
+import httpx
+
+from . import metrics, ratelimit, tracing, transport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = httpx.Timeout(transport.DEFAULT_TIMEOUT[1], connect=transport.DEFAULT_TIMEOUT[0])
+
+# One client per event loop: httpx connections can't be shared between loops
+_clients = weakref.WeakKeyDictionary()
+_transport_factory = None
+
+
+def set_transport_factory(factory):
+    """
+    Build clients on transports from factory() (e.g. httpx.MockTransport)
+    instead of the network; None restores the default
+    
+    Clients already created keep their transport.
+    """
+    global _transport_factory
+    _transport_factory = factory
+    _clients.clear()
+
+
+def get_client():
+    """
+    httpx.AsyncClient of the running event loop
+    
+    Like the requests session behind transport, it keeps connections to
+    each API open between requests.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=transport.POOL_SIZE * 2),
+            follow_redirects=True,
+            transport=_transport_factory() if _transport_factory else None
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close():
+    """Close the running loop's client (e.g. on ASGI shutdown)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def request(method, url, retries=None, **kwargs):
+    """
+    Send a request through the loop's shared client
+    
+    Same retry, Retry-After, rate-limit, tracing and metrics behaviour as
+    transport.request, but every wait is an asyncio.sleep, so other
+    requests on the loop keep running.
+    
+    Args:
+        method: HTTP method
+        url: request URL
+        retries: maximum number of retries (defaults to HTTP_MAX_RETRIES)
+        **kwargs: passed to httpx.AsyncClient.request; a requests-style
+            (connect, read) timeout tuple is accepted
+    
+    Returns:
+        httpx.Response of the last attempt
+    
+    Raises:
+        ratelimit.RateLimited: if the host's request budget is exhausted
+    """
+    retries = transport.MAX_RETRIES if retries is None else retries
+    if isinstance(kwargs.get('timeout'), tuple):
+        connect, read = kwargs['timeout']
+        kwargs['timeout'] = httpx.Timeout(read, connect=connect)
+    host = urlparse(url).netloc
+    bucket = ratelimit.bucket_for(url)
+    client = get_client()
+    
+    for attempt in range(retries + 1):
+        if bucket:
+            started = time.perf_counter()
+            if await bucket.acquire_async():
+                tracing.record('rate limit wait', 'wait', started, time.perf_counter(), platform=bucket.name)
+        try:
+            with tracing.span(f'{method} {host}', 'http', url=url, attempt=attempt) as span:
+                response = await client.request(method, url, **kwargs)
+                span['status'] = response.status_code
+                span['bytes'] = len(response.content)
+        except httpx.TransportError as e:
+            metrics.HTTP_REQUESTS.inc(host=host, status='error')
+            if attempt == retries:
+                raise
+            delay = transport.backoff(attempt)
+            logger.warning(f"{method} {host} failed ({e}), retrying in {delay:.1f}s")
+        else:
+            metrics.HTTP_REQUESTS.inc(host=host, status=response.status_code)
+            if bucket:
+                await bucket.update_async(response.headers)
+            if response.status_code not in transport.RETRY_STATUSES or attempt == retries:
+                return response
+            delay = transport.retry_after(response)
+            if delay is None:
+                delay = transport.backoff(attempt)
+            elif delay > transport.BACKOFF_MAX:
+                logger.warning(f"{host} asked to retry after {delay:.0f}s, giving up")
+                return response
+            logger.warning(f"{method} {host} returned {response.status_code}, retrying in {delay:.1f}s")
+        
+        transport.count_retry(host)
+        await asyncio.sleep(delay)
+
+
+async def get(url, **kwargs):
+    """GET through the shared client (see request)"""
+    return await request('GET', url, **kwargs)
+
+
+async def post(url, **kwargs):
+    """POST through the shared client (see request)"""
+    return await request('POST', url, **kwargs)
@@ -0,0 +1,185 @@
+"""Conditional-request (ETag / Last-Modified) cache persisted in SQLite"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from requests.structures import CaseInsensitiveDict
+
+from . import async_transport, transport
+
+logger = logging.getLogger(__name__)
+
+# Response headers worth replaying on a 304 (which may omit them)
+KEPT_HEADERS = ('Link',)
+
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_AGE = 7 * 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS http_validators (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    data TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS http_validators_used ON http_validators (used_at);
+"""
+
+
+class ConditionalCache:
+    """
+    Remembers validators and parsed bodies of JSON GET responses
+    
+    Requests for a cached URL are sent with If-None-Match/If-Modified-Since.
+    A 304 answer returns the stored (already parsed) body; for GitHub, 304s
+    don't count against the rate limit. Each URL is one row of a SQLite
+    table (by default in the metrics store's file), so an update writes one
+    row and all gunicorn workers share the entries. Entries unused for
+    max_age seconds are dropped, and beyond max_entries the least recently
+    used ones are evicted.
+    """
+    
+    def __init__(self, path, max_entries=None, max_age=None):
+        """
+        Args:
+            path: SQLite file (GITHUB_ETAG_CACHE)
+            max_entries: URLs to keep (GITHUB_ETAG_CACHE_MAX_ENTRIES)
+            max_age: seconds an unused entry is kept (GITHUB_ETAG_CACHE_MAX_AGE)
+        """
+        self.path = path
+        self.max_entries = max_entries or int(os.getenv('GITHUB_ETAG_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        self.max_age = max_age or float(os.getenv('GITHUB_ETAG_CACHE_MAX_AGE', DEFAULT_MAX_AGE))
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        with self._lock, self._connection() as conn:
+            conn.executescript(SCHEMA)
+    
+    def _connection(self):
+        """This process's connection (reopened after a fork; caller holds the lock)"""
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            # Shared with the metrics store and other workers: readers never block the writer
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._pid = os.getpid()
+        return self._conn
+    
+    def get_json(self, url, headers=None, timeout=10, cache_key=None):
+        """
+        GET a JSON resource, revalidating any cached copy
+        
+        Args:
+            url: resource URL
+            headers: request headers
+            timeout: request timeout in seconds
+            cache_key: key to store the entry under (defaults to url)
+        
+        Returns:
+            tuple (status_code, parsed body or None, headers); a 304 is
+            reported as 200 with the cached body and headers
+        """
+        key = cache_key or url
+        entry, headers = self._conditional(key, headers)
+        response = transport.get(url, headers=headers, timeout=timeout)
+        return self._handle(key, entry, response)
+    
+    async def get_json_async(self, url, headers=None, timeout=10, cache_key=None):
+        """get_json() through the asyncio transport (SQLite access runs in a worker thread)"""
+        key = cache_key or url
+        entry, headers = await asyncio.to_thread(self._conditional, key, headers)
+        response = await async_transport.get(url, headers=headers, timeout=timeout)
+        return await asyncio.to_thread(self._handle, key, entry, response)
+    
+    def _get(self, key):
+        """The validators of key as a dict (body still encoded), or None"""
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT etag, last_modified, headers, data FROM http_validators WHERE key = ? AND used_at >= ?',
+                (key, time.time() - self.max_age)
+            ).fetchone()
+        return dict(row) if row else None
+    
+    def _conditional(self, key, headers):
+        """Cached entry for key (or None) and headers with its validators added"""
+        headers = dict(headers or {})
+        entry = self._get(key)
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return entry, headers
+    
+    def _handle(self, key, entry, response):
+        """get_json() result for a response, storing its validators and body"""
+        if response.status_code == 304 and entry:
+            self._touch(key)
+            cached_headers = CaseInsensitiveDict(json.loads(entry['headers']))
+            cached_headers.update(response.headers)
+            return 200, json.loads(entry['data']), cached_headers
+        if response.status_code != 200:
+            return response.status_code, None, response.headers
+        
+        data = response.json()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            kept = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+            self._put(key, etag, last_modified, kept, data)
+        return 200, data, response.headers
+    
+    def _touch(self, key):
+        """Mark an entry as just used (it was revalidated)"""
+        try:
+            with self._lock, self._connection() as conn:
+                conn.execute('UPDATE http_validators SET used_at = ? WHERE key = ?', (time.time(), key))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not update ETag cache entry: {e}")
+    
+    def _put(self, key, etag, last_modified, headers, data):
+        """Store one entry, dropping expired and least recently used ones beyond the bounds"""
+        now = time.time()
+        try:
+            with self._lock, self._connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO http_validators '
+                    '(key, etag, last_modified, headers, data, stored_at, used_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (key, etag, last_modified, json.dumps(headers), json.dumps(data), now, now)
+                )
+                conn.execute('DELETE FROM http_validators WHERE used_at < ?', (now - self.max_age,))
+                conn.execute(
+                    'DELETE FROM http_validators WHERE key IN '
+                    '(SELECT key FROM http_validators ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not persist ETag cache entry: {e}")
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """Process-wide cache stored at GITHUB_ETAG_CACHE (default: the metrics store, STATS_DB_PATH)"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            path = os.getenv('GITHUB_ETAG_CACHE') or os.getenv('STATS_DB_PATH', os.path.join('data', 'stats.db'))
+            _default = ConditionalCache(path)
+        return _default
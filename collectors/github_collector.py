@@ -1,20 +1,97 @@
 """GitHub stats collector"""
 
-import requests
-from datetime import datetime
+import asyncio
+from collections import deque
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 import logging
 import os
+from urllib.parse import parse_qs, urlparse
+
+from requests.utils import parse_header_links
+
+from . import async_transport, tracing, transport
+from .ratelimit import RateLimited
+from .etag_cache import default_cache
+from .utils import day_bounds
 
 logger = logging.getLogger(__name__)
 
+PER_PAGE = 100
+MAX_PAGES = 30  # 3000 repos; the events feed itself stops after 300 events
+PAGE_WORKERS = 4
+
+
+# Profile counts, star/fork totals and exact commit counts in one request.
+# Users with more than 100 repositories need follow-up REPOS_QUERY pages.
+USER_QUERY = """
+query($login: String!, $from: DateTime!, $to: DateTime!) {
+  user(login: $login) {
+    followers { totalCount }
+    following { totalCount }
+    repositories(first: 100, privacy: PUBLIC, ownerAffiliations: OWNER) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      nodes { stargazerCount forkCount }
+    }
+    contributionsCollection(from: $from, to: $to) {
+      totalCommitContributions
+      commitContributionsByRepository(maxRepositories: 100) {
+        repository { nameWithOwner }
+        contributions(first: 100, orderBy: {field: OCCURRED_AT, direction: DESC}) {
+          nodes { occurredAt commitCount }
+        }
+      }
+    }
+  }
+}
+"""
+
+REPOS_QUERY = """
+query($login: String!, $cursor: String) {
+  user(login: $login) {
+    repositories(first: 100, after: $cursor, privacy: PUBLIC, ownerAffiliations: OWNER) {
+      pageInfo { hasNextPage endCursor }
+      nodes { stargazerCount forkCount }
+    }
+  }
+}
+"""
+
+
+def graphql_time(value):
+    """Naive local datetime -> GraphQL DateTime string (UTC)"""
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def parse_time(timestamp):
+    """Parse a GitHub ISO-8601 UTC timestamp"""
+    return datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%SZ')
+
+
+def last_page(link_header):
+    """Page number of the rel="last" link in a Link header (1 if absent)"""
+    for link in parse_header_links(link_header or ''):
+        if link.get('rel') == 'last':
+            page = parse_qs(urlparse(link['url']).query).get('page')
+            if page:
+                return int(page[0])
+    return 1
+
 
 class GitHubCollector:
     """Collects GitHub statistics"""
     
-    def __init__(self, username, token=None):
+    def __init__(self, username, token=None, store=None, etag_cache=None, mode=None):
         self.username = username
         self.token = token
+        self.store = store  # Optional MetricsStore for raw events
+        self.etag_cache = etag_cache or default_cache()
         self.base_url = "https://api.github.com"
+        # 'rest' (events feed, works without a token) or 'graphql' (exact commit counts)
+        self.mode = (mode or os.getenv('GITHUB_API_MODE', 'rest')).lower()
+        self.graphql_url = os.getenv('GITHUB_GRAPHQL_URL', f'{self.base_url}/graphql')
     
     def collect(self, start_date, end_date):
         """
@@ -29,108 +106,487 @@ class GitHubCollector:
         """
         logger.info(f"Collecting GitHub stats for {self.username}")
         
+        if self.store and not self.store.needs_sync('github', self.username, start_date):
+            with tracing.span('github.from_store'):
+                return self._stats_from_store(start_date, end_date)
+        
+        if self.mode == 'graphql':
+            try:
+                with tracing.span('github.graphql'):
+                    return self._collect_via_graphql(start_date, end_date)
+            except RateLimited as e:
+                logger.warning(f"GitHub collection skipped: {e}")
+                return self._rate_limited_stats(e)
+            except Exception as e:
+                logger.error(f"Error collecting GitHub stats via GraphQL: {e}")
+                return self._empty_stats()
+        
         try:
-            headers = {
-                'User-Agent': 'SocialMediaStatsDashboard/1.0',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
-            if self.token:
-                headers['Authorization'] = f'token {self.token}'
+            headers = self._rest_headers()
             
             # Get user profile info
-            profile = self._get_user_profile(headers)
+            with tracing.span('github.profile'):
+                profile = self._get_user_profile(headers)
             
             # Get repository stats
-            repo_stats = self._get_repository_stats(headers)
+            with tracing.span('github.repos'):
+                repo_stats = self._get_repository_stats(headers)
             
-            # Get commit activity (approximate)
-            commit_stats = self._get_commit_stats(headers, start_date, end_date)
+            if self.store:
+                sync_start = self.store.sync_start(start_date)
+                with tracing.span('github.events'):
+                    self._get_commit_stats(headers, sync_start, end_date)
+                return self._finish_sync(profile, repo_stats, sync_start, start_date, end_date)
             
-            return {
-                'username': self.username,
-                'public_repos': profile.get('public_repos', 0),
-                'followers': profile.get('followers', 0),
-                'following': profile.get('following', 0),
-                'total_stars': repo_stats.get('total_stars', 0),
-                'total_forks': repo_stats.get('total_forks', 0),
-                'commits_count': commit_stats.get('commits_count', 0),
-                'recent_activity': commit_stats.get('recent_activity', [])
-            }
+            # Get commit activity (approximate), over the same whole days as the store
+            with tracing.span('github.events'):
+                commit_stats = self._get_commit_stats(headers, *day_bounds(start_date, end_date))
+            return self._rest_stats(profile, repo_stats, commit_stats)
             
+        except RateLimited as e:
+            logger.warning(f"GitHub collection skipped: {e}")
+            return self._rate_limited_stats(e)
         except Exception as e:
             logger.error(f"Error collecting GitHub stats: {e}")
             return self._empty_stats()
     
-    def _get_user_profile(self, headers):
-        """Get user profile information"""
-        response = requests.get(
-            f'{self.base_url}/users/{self.username}',
-            headers=headers,
-            timeout=10
+    async def collect_async(self, start_date, end_date):
+        """
+        collect() on the asyncio transport (same arguments and result)
+        
+        Store and ETag cache reads and writes run in a worker thread, off
+        the event loop.
+        """
+        logger.info(f"Collecting GitHub stats for {self.username}")
+        
+        if self.store and not await asyncio.to_thread(self.store.needs_sync, 'github', self.username, start_date):
+            with tracing.span('github.from_store'):
+                return await asyncio.to_thread(self._stats_from_store, start_date, end_date)
+        
+        if self.mode == 'graphql':
+            try:
+                with tracing.span('github.graphql'):
+                    return await self._collect_via_graphql_async(start_date, end_date)
+            except RateLimited as e:
+                logger.warning(f"GitHub collection skipped: {e}")
+                return self._rate_limited_stats(e)
+            except Exception as e:
+                logger.error(f"Error collecting GitHub stats via GraphQL: {e}")
+                return self._empty_stats()
+        
+        try:
+            headers = self._rest_headers()
+            window_start, window_end = (self.store.sync_start(start_date), end_date) if self.store else day_bounds(start_date, end_date)
+            
+            # Profile, repositories and events don't depend on each other
+            async def profile():
+                with tracing.span('github.profile'):
+                    return await self._get_user_profile_async(headers)
+            
+            async def repos():
+                with tracing.span('github.repos'):
+                    return await self._get_repository_stats_async(headers)
+            
+            async def events():
+                with tracing.span('github.events'):
+                    return await self._get_commit_stats_async(headers, window_start, window_end)
+            
+            profile, repo_stats, commit_stats = await asyncio.gather(profile(), repos(), events())
+            
+            if self.store:
+                return await asyncio.to_thread(self._finish_sync, profile, repo_stats, window_start, start_date, end_date)
+            return self._rest_stats(profile, repo_stats, commit_stats)
+            
+        except RateLimited as e:
+            logger.warning(f"GitHub collection skipped: {e}")
+            return self._rate_limited_stats(e)
+        except Exception as e:
+            logger.error(f"Error collecting GitHub stats: {e}")
+            return self._empty_stats()
+    
+    def _rest_headers(self):
+        """Headers for REST API requests"""
+        headers = {
+            'User-Agent': 'SocialMediaStatsDashboard/1.0',
+            'Accept': 'application/vnd.github.v3+json'
+        }
+        
+        if self.token:
+            headers['Authorization'] = f'token {self.token}'
+        return headers
+    
+    def _finish_sync(self, profile, repo_stats, sync_start, start_date, end_date):
+        """Store the profile counts, mark the sync done and answer from the store"""
+        self.store.record_profile('github', self.username, {
+            'public_repos': profile.get('public_repos', 0),
+            'followers': profile.get('followers', 0),
+            'following': profile.get('following', 0),
+            'total_stars': repo_stats.get('total_stars', 0),
+            'total_forks': repo_stats.get('total_forks', 0)
+        })
+        self.store.mark_synced('github', self.username, sync_start)
+        return self._stats_from_store(start_date, end_date)
+    
+    def _rest_stats(self, profile, repo_stats, commit_stats):
+        """Stats dict from the REST profile, repository and event summaries"""
+        return {
+            'username': self.username,
+            'public_repos': profile.get('public_repos', 0),
+            'followers': profile.get('followers', 0),
+            'following': profile.get('following', 0),
+            'total_stars': repo_stats.get('total_stars', 0),
+            'total_forks': repo_stats.get('total_forks', 0),
+            'commits_count': commit_stats.get('commits_count', 0),
+            'recent_activity': commit_stats.get('recent_activity', [])
+        }
+    
+    def _stats_from_store(self, start_date, end_date):
+        """Build stats from the stored profile, daily rollup (commits) and events"""
+        profile = self.store.get_profile('github', self.username)
+        totals = self.store.rollup('github', self.username).between(start_date, end_date)
+        events = self.store.github_events(self.username, *day_bounds(start_date, end_date))
+        
+        return {
+            'username': self.username,
+            'public_repos': profile.get('public_repos', 0),
+            'followers': profile.get('followers', 0),
+            'following': profile.get('following', 0),
+            'total_stars': profile.get('total_stars', 0),
+            'total_forks': profile.get('total_forks', 0),
+            'commits_count': totals['commits'],
+            'recent_activity': [
+                {'type': event['type'], 'repo': event['repo'], 'created_at': event['created_at']}
+                for event in events
+            ],
+            'synced_at': self.store.synced_at('github', self.username)
+        }
+    
+    def _collect_via_graphql(self, start_date, end_date):
+        """Collect profile, repository and commit stats with one GraphQL query"""
+        window_start = self.store.sync_start(start_date) if self.store else day_bounds(start_date, end_date)[0]
+        user = self._graphql(USER_QUERY, self._user_variables(window_start, end_date))['user']
+        
+        repositories = user['repositories']
+        repos = list(repositories['nodes'])
+        page_info = repositories['pageInfo']
+        while page_info['hasNextPage']:
+            page = self._graphql(REPOS_QUERY, {
+                'login': self.username,
+                'cursor': page_info['endCursor']
+            })['user']['repositories']
+            repos.extend(page['nodes'])
+            page_info = page['pageInfo']
+        
+        return self._graphql_stats(user, repos, window_start, start_date, end_date)
+    
+    async def _collect_via_graphql_async(self, start_date, end_date):
+        """_collect_via_graphql() on the asyncio transport"""
+        window_start = self.store.sync_start(start_date) if self.store else day_bounds(start_date, end_date)[0]
+        user = (await self._graphql_async(USER_QUERY, self._user_variables(window_start, end_date)))['user']
+        
+        repositories = user['repositories']
+        repos = list(repositories['nodes'])
+        page_info = repositories['pageInfo']
+        while page_info['hasNextPage']:
+            page = (await self._graphql_async(REPOS_QUERY, {
+                'login': self.username,
+                'cursor': page_info['endCursor']
+            }))['user']['repositories']
+            repos.extend(page['nodes'])
+            page_info = page['pageInfo']
+        
+        return await asyncio.to_thread(self._graphql_stats, user, repos, window_start, start_date, end_date)
+    
+    def _user_variables(self, window_start, end_date):
+        return {
+            'login': self.username,
+            'from': graphql_time(window_start),
+            'to': graphql_time(end_date)
+        }
+    
+    def _graphql_stats(self, user, repos, window_start, start_date, end_date):
+        """Stats from a USER_QUERY result and all of the user's repositories"""
+        repositories = user['repositories']
+        profile = {
+            'public_repos': repositories['totalCount'],
+            'followers': user['followers']['totalCount'],
+            'following': user['following']['totalCount'],
+            'total_stars': sum(repo['stargazerCount'] for repo in repos),
+            'total_forks': sum(repo['forkCount'] for repo in repos)
+        }
+        
+        # One record per repository and day with commits (the store keys them like REST push events)
+        collection = user['contributionsCollection']
+        contributions = sorted(
+            (
+                {
+                    'type': 'CommitContribution',
+                    'repo': {'name': by_repo['repository']['nameWithOwner']},
+                    'created_at': node['occurredAt'],
+                    'commits': node['commitCount']
+                }
+                for by_repo in collection['commitContributionsByRepository']
+                for node in by_repo['contributions']['nodes']
+            ),
+            key=lambda contribution: contribution['created_at'],
+            reverse=True
+        )
+        
+        if self.store:
+            self.store.record_github_events(self.username, contributions)
+            self.store.record_profile('github', self.username, profile)
+            self.store.mark_synced('github', self.username, window_start)
+            return self._stats_from_store(start_date, end_date)
+        
+        return dict(
+            profile,
+            username=self.username,
+            commits_count=collection['totalCommitContributions'],
+            recent_activity=[
+                {'type': contribution['type'], 'repo': contribution['repo']['name'], 'created_at': contribution['created_at']}
+                for contribution in contributions
+            ]
         )
+    
+    def _graphql(self, query, variables):
+        """
+        Run a GraphQL query against GITHUB_GRAPHQL_URL
         
-        if response.status_code == 200:
-            return response.json()
-        else:
-            logger.warning(f"Failed to fetch GitHub profile: {response.status_code}")
-            return {}
+        Returns:
+            the response's data object
+        
+        Raises:
+            RuntimeError: on HTTP or GraphQL errors
+        """
+        response = transport.post(self.graphql_url, **self._graphql_request(query, variables))
+        return self._graphql_data(response)
     
-    def _get_repository_stats(self, headers):
-        """Get repository statistics"""
-        response = requests.get(
-            f'{self.base_url}/users/{self.username}/repos?per_page=100',
+    async def _graphql_async(self, query, variables):
+        """_graphql() on the asyncio transport"""
+        response = await async_transport.post(self.graphql_url, **self._graphql_request(query, variables))
+        return self._graphql_data(response)
+    
+    def _graphql_request(self, query, variables):
+        headers = {'User-Agent': 'SocialMediaStatsDashboard/1.0'}
+        if self.token:
+            headers['Authorization'] = f'bearer {self.token}'
+        return {'json': {'query': query, 'variables': variables}, 'headers': headers, 'timeout': 10}
+    
+    def _graphql_data(self, response):
+        """data object of a GraphQL response (RuntimeError on HTTP or GraphQL errors)"""
+        if response.status_code != 200:
+            raise RuntimeError(f"GraphQL request failed: {response.status_code}")
+        
+        payload = response.json()
+        if payload.get('errors'):
+            raise RuntimeError(f"GraphQL errors: {payload['errors'][0].get('message')}")
+        if not payload.get('data', {}).get('user'):
+            raise RuntimeError(f"GitHub user {self.username} not found")
+        return payload['data']
+    
+    def _get(self, path, headers):
+        """
+        Conditional GET against the GitHub API
+        
+        Unchanged resources come back as 304 (free of rate limit) and are
+        served from the ETag cache, already parsed.
+        
+        Returns:
+            tuple (status_code, parsed JSON or None, response headers)
+        """
+        status, data, response_headers = self.etag_cache.get_json(
+            f'{self.base_url}{path}',
+            headers=headers,
+            timeout=10,
+            cache_key=self._cache_key(path)
+        )
+        return status, data, response_headers
+    
+    async def _get_async(self, path, headers):
+        """_get() on the asyncio transport"""
+        return await self.etag_cache.get_json_async(
+            f'{self.base_url}{path}',
             headers=headers,
-            timeout=10
+            timeout=10,
+            cache_key=self._cache_key(path)
         )
+    
+    def _cache_key(self, path):
+        # Responses differ with authentication, so keep separate validators
+        return f"{'token' if self.token else 'anonymous'} {path}"
+    
+    def _get_pages(self, path, headers, done=None):
+        """
+        Fetch every page of a list endpoint
+        
+        The first page's Link header gives the last page number. The
+        remaining pages are requested in order, at most PAGE_WORKERS at a
+        time: each page that comes back makes room for the next one, and no
+        further page is requested once done() says the rest isn't needed.
+        
+        Args:
+            path: API path without paging parameters
+            headers: request headers
+            done: optional callable(page_items) -> True when no further
+                pages are needed (checked in page order)
+        
+        Returns:
+            tuple (status_code of the first failed page, or 200, and the
+            list of items; empty if any page failed)
+        """
+        status, items, response_headers = self._get(f'{path}?per_page={PER_PAGE}', headers)
+        if status != 200:
+            return status, []
+        
+        items = list(items)
+        pages = min(last_page(response_headers.get('Link')), MAX_PAGES)
+        if pages <= 1 or (done and done(items)):
+            return status, items
         
-        if response.status_code == 200:
-            repos = response.json()
-            total_stars = sum(repo.get('stargazers_count', 0) for repo in repos)
-            total_forks = sum(repo.get('forks_count', 0) for repo in repos)
+        with ThreadPoolExecutor(max_workers=min(PAGE_WORKERS, pages - 1)) as pool:
+            def submit(page):
+                # Each page runs in a copy of this context so it keeps the request priority
+                return pool.submit(contextvars.copy_context().run, self._get, f'{path}?per_page={PER_PAGE}&page={page}', headers)
             
-            return {
-                'total_stars': total_stars,
-                'total_forks': total_forks,
-                'repos_count': len(repos)
-            }
-        else:
-            logger.warning(f"Failed to fetch GitHub repositories: {response.status_code}")
-            return {'total_stars': 0, 'total_forks': 0, 'repos_count': 0}
+            window = deque(submit(page) for page in range(2, min(2 + PAGE_WORKERS, pages + 1)))
+            next_page = 2 + len(window)
+            while window:
+                page_status, page_items, _ = window.popleft().result()
+                if page_status != 200:
+                    # A partial list would undercount: fail like the first page
+                    status, items = page_status, []
+                    break
+                items.extend(page_items)
+                if done and done(page_items):
+                    break
+                if next_page <= pages:
+                    window.append(submit(next_page))
+                    next_page += 1
+            for future in window:
+                future.cancel()
+        return status, items
+    
+    async def _get_pages_async(self, path, headers, done=None):
+        """_get_pages() on the asyncio transport (at most PAGE_WORKERS pages in flight)"""
+        status, items, response_headers = await self._get_async(f'{path}?per_page={PER_PAGE}', headers)
+        if status != 200:
+            return status, []
+        
+        items = list(items)
+        pages = min(last_page(response_headers.get('Link')), MAX_PAGES)
+        if pages <= 1 or (done and done(items)):
+            return status, items
+        
+        def fetch(page):
+            return asyncio.ensure_future(self._get_async(f'{path}?per_page={PER_PAGE}&page={page}', headers))
+        
+        window = deque(fetch(page) for page in range(2, min(2 + PAGE_WORKERS, pages + 1)))
+        next_page = 2 + len(window)
+        try:
+            while window:
+                page_status, page_items, _ = await window.popleft()
+                if page_status != 200:
+                    # A partial list would undercount: fail like the first page
+                    status, items = page_status, []
+                    break
+                items.extend(page_items)
+                if done and done(page_items):
+                    break
+                if next_page <= pages:
+                    window.append(fetch(next_page))
+                    next_page += 1
+        finally:
+            for task in window:
+                task.cancel()
+        return status, items
+    
+    def _get_user_profile(self, headers):
+        """Get user profile information"""
+        status, profile, _ = self._get(f'/users/{self.username}', headers)
+        return self._profile(status, profile)
+    
+    async def _get_user_profile_async(self, headers):
+        status, profile, _ = await self._get_async(f'/users/{self.username}', headers)
+        return self._profile(status, profile)
+    
+    @staticmethod
+    def _profile(status, profile):
+        if status != 200:
+            raise RuntimeError(f"Failed to fetch GitHub profile: {status}")
+        return profile
+    
+    def _get_repository_stats(self, headers):
+        """Get repository statistics"""
+        status, repos = self._get_pages(f'/users/{self.username}/repos', headers)
+        return self._repository_totals(status, repos)
+    
+    async def _get_repository_stats_async(self, headers):
+        status, repos = await self._get_pages_async(f'/users/{self.username}/repos', headers)
+        return self._repository_totals(status, repos)
+    
+    @staticmethod
+    def _repository_totals(status, repos):
+        """Star/fork totals of the listed repositories"""
+        if status != 200:
+            raise RuntimeError(f"Failed to fetch GitHub repositories: {status}")
+        
+        total_stars = sum(repo.get('stargazers_count', 0) for repo in repos)
+        total_forks = sum(repo.get('forks_count', 0) for repo in repos)
+        
+        return {
+            'total_stars': total_stars,
+            'total_forks': total_forks,
+            'repos_count': len(repos)
+        }
     
     def _get_commit_stats(self, headers, start_date, end_date):
         """Get commit statistics (approximate using events API)"""
         # This is an approximation since GitHub's commit API is complex
         # We'll use the events API to get recent activity
-        response = requests.get(
-            f'{self.base_url}/users/{self.username}/events?per_page=100',
-            headers=headers,
-            timeout=10
+        # Events are newest first, so stop at the first page reaching past start_date
+        status, events = self._get_pages(
+            f'/users/{self.username}/events',
+            headers,
+            done=lambda page: not page or parse_time(page[-1]['created_at']) < start_date
         )
+        return self._commit_summary(status, events, start_date, end_date)
+    
+    async def _get_commit_stats_async(self, headers, start_date, end_date):
+        status, events = await self._get_pages_async(
+            f'/users/{self.username}/events',
+            headers,
+            done=lambda page: not page or parse_time(page[-1]['created_at']) < start_date
+        )
+        return await asyncio.to_thread(self._commit_summary, status, events, start_date, end_date)
+    
+    def _commit_summary(self, status, events, start_date, end_date):
+        """Record events in the store (if any) and count commits within the range"""
+        if status != 200:
+            raise RuntimeError(f"Failed to fetch GitHub events: {status}")
         
-        if response.status_code == 200:
-            events = response.json()
-            commits_count = 0
-            recent_activity = []
-            
-            for event in events:
-                event_date = datetime.strptime(event['created_at'], '%Y-%m-%dT%H:%M:%SZ')
-                if start_date <= event_date <= end_date:
-                    if event['type'] == 'PushEvent':
-                        commits_count += len(event.get('payload', {}).get('commits', []))
-                    recent_activity.append({
-                        'type': event['type'],
-                        'repo': event['repo']['name'],
-                        'created_at': event['created_at']
-                    })
-            
-            return {
-                'commits_count': commits_count,
-                'recent_activity': recent_activity
-            }
-        else:
-            logger.warning(f"Failed to fetch GitHub events: {response.status_code}")
-            return {'commits_count': 0, 'recent_activity': []}
+        if self.store:
+            self.store.record_github_events(self.username, [
+                event for event in events
+                if start_date <= parse_time(event['created_at']) <= end_date
+            ])
+        commits_count = 0
+        recent_activity = []
+        
+        for event in events:
+            event_date = parse_time(event['created_at'])
+            if start_date <= event_date <= end_date:
+                if event['type'] == 'PushEvent':
+                    commits_count += len(event.get('payload', {}).get('commits', []))
+                recent_activity.append({
+                    'type': event['type'],
+                    'repo': event['repo']['name'],
+                    'created_at': event['created_at']
+                })
+        
+        return {
+            'commits_count': commits_count,
+            'recent_activity': recent_activity
+        }
     
     def _empty_stats(self):
         """Return empty stats structure"""
@@ -145,4 +601,7 @@ class GitHubCollector:
             'recent_activity': [],
             'error': 'API not configured or failed'
         }
-
+    
+    def _rate_limited_stats(self, error):
+        """Empty stats flagged so the dashboard keeps its last good data"""
+        return dict(self._empty_stats(), error=str(error), rate_limited=True)
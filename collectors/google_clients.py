@@ -0,0 +1,127 @@
+"""Process-wide registry of googleapiclient service objects and credentials"""
+
+import logging
+import threading
+from urllib.parse import urlparse
+
+from . import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_discovery_docs = {}
+_credentials = {}
+
+# Service objects wrap an httplib2.Http, which is not thread-safe, so each
+# thread gets its own; they are still built only once per thread and key.
+_local = threading.local()
+
+# Optional callable returning an httplib2.Http-compatible object for new
+# services (see set_http_factory)
+_http_factory = None
+
+
+class TracedHttp:
+    """httplib2.Http wrapper that records requests as trace spans and in /metrics"""
+    
+    def __init__(self, http):
+        self.http = http
+    
+    def request(self, uri, method='GET', *args, **kwargs):
+        host = urlparse(uri).netloc
+        # The query string carries the API key, so only the path is recorded
+        with tracing.span(f'{method} {host}', 'http', url=uri.split('?')[0]) as span:
+            try:
+                response, content = self.http.request(uri, method, *args, **kwargs)
+            except Exception:
+                metrics.HTTP_REQUESTS.inc(host=host, status='error')
+                raise
+            span['status'] = response.status
+            span['bytes'] = len(content or b'')
+        metrics.HTTP_REQUESTS.inc(host=host, status=response.status)
+        return response, content
+    
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+
+def get_discovery_doc(service_name, version):
+    """Discovery document bundled with google-api-python-client (no network fetch)"""
+    key = (service_name, version)
+    with _lock:
+        if key not in _discovery_docs:
+            from googleapiclient.discovery_cache import get_static_doc
+            
+            doc = get_static_doc(service_name, version)
+            if doc is None:
+                raise ValueError(f"No bundled discovery document for {service_name} {version}")
+            _discovery_docs[key] = doc
+        return _discovery_docs[key]
+
+
+def get_service_account_credentials(credentials_file, scopes):
+    """
+    Service account credentials, loaded from disk once per process
+    
+    The same Credentials object is reused by every service built with it,
+    so its access token is only refreshed when it has expired.
+    """
+    key = (credentials_file, tuple(scopes))
+    with _lock:
+        if key not in _credentials:
+            from google.oauth2 import service_account
+            
+            _credentials[key] = service_account.Credentials.from_service_account_file(
+                credentials_file,
+                scopes=list(scopes)
+            )
+        return _credentials[key]
+
+
+def set_http_factory(factory):
+    """
+    Build services on http objects from factory() instead of the default
+    
+    Used by the offline replay harness in bench/; credentials are not
+    applied to such services. Pass None to go back to the network.
+    """
+    global _http_factory
+    _http_factory = factory
+
+
+def get_service(service_name, version, developer_key=None, credentials=None):
+    """
+    Cached equivalent of googleapiclient.discovery.build
+    
+    Args:
+        service_name: API name, e.g. 'youtube' or 'searchconsole'
+        version: API version, e.g. 'v3'
+        developer_key: optional API key
+        credentials: optional google.auth credentials
+    
+    Returns:
+        googleapiclient Resource for the service
+    """
+    services = getattr(_local, 'services', None)
+    if services is None:
+        services = _local.services = {}
+    
+    factory = _http_factory
+    # The factory itself, not its id: a discarded factory's id can be reused by the next one
+    key = (service_name, version, developer_key, id(credentials) if credentials else None, factory)
+    if key not in services:
+        from googleapiclient.discovery import build_from_document
+        from googleapiclient.http import build_http
+        
+        http = TracedHttp(factory() if factory is not None else build_http())
+        if credentials is not None and factory is None:
+            from google_auth_httplib2 import AuthorizedHttp
+            
+            http = AuthorizedHttp(credentials, http=http)
+        
+        services[key] = build_from_document(
+            get_discovery_doc(service_name, version),
+            developerKey=developer_key,
+            http=http
+        )
+    return services[key]
@@ -3,15 +3,19 @@
 from datetime import timedelta
 import logging
 
+from . import tracing
+from .google_clients import get_service, get_service_account_credentials
+
 logger = logging.getLogger(__name__)
 
 
 class GSCCollector:
     """Collects Google Search Console statistics"""
     
-    def __init__(self, credentials_file, property_url):
+    def __init__(self, credentials_file, property_url, store=None):
         self.credentials_file = credentials_file
         self.property_url = property_url
+        self.store = store  # Optional MetricsStore for daily rows
     
     def collect(self, start_date, end_date):
         """
@@ -30,63 +34,102 @@ class GSCCollector:
             logger.warning("Google Search Console credentials not configured")
             return self._empty_stats()
         
+        if self.store and not self.store.needs_sync('gsc', self.property_url, start_date):
+            with tracing.span('gsc.from_store'):
+                return self._stats_from_store(start_date, end_date)
+        
         try:
-            from google.oauth2 import service_account
-            from googleapiclient.discovery import build
+            # Credentials and service are loaded once per process
+            with tracing.span('gsc.credentials'):
+                credentials = get_service_account_credentials(
+                    self.credentials_file,
+                    scopes=['https://www.googleapis.com/auth/webmasters.readonly']
+                )
             
-            # Load credentials
-            credentials = service_account.Credentials.from_service_account_file(
-                self.credentials_file,
-                scopes=['https://www.googleapis.com/auth/webmasters.readonly']
-            )
+            with tracing.span('gsc.service'):
+                service = get_service('searchconsole', 'v1', credentials=credentials)
             
-            service = build('searchconsole', 'v1', credentials=credentials)
+            query_start = self.store.sync_start(start_date) if self.store else start_date
             
-            # Get search analytics
+            # Get daily search analytics per country
             request = {
-                'startDate': start_date.strftime('%Y-%m-%d'),
+                'startDate': query_start.strftime('%Y-%m-%d'),
                 'endDate': (end_date - timedelta(days=1)).strftime('%Y-%m-%d'),
-                'dimensions': ['country'],
-                'rowLimit': 1000
+                'dimensions': ['date', 'country'],
+                'rowLimit': 25000
             }
             
-            response = service.searchanalytics().query(
-                siteUrl=self.property_url,
-                body=request
-            ).execute()
+            with tracing.span('gsc.query') as span:
+                response = service.searchanalytics().query(
+                    siteUrl=self.property_url,
+                    body=request
+                ).execute()
+                span['rows'] = len(response.get('rows', []))
             
             rows = response.get('rows', [])
             
-            # Calculate metrics
-            us_clicks = 0
-            total_impressions = 0
-            total_clicks = 0
-            
-            for row in rows:
-                if row['keys'][0] == 'usa':
-                    us_clicks = row['clicks']
-                total_impressions += row['impressions']
-                total_clicks += row['clicks']
+            if self.store:
+                with tracing.span('gsc.store'):
+                    self.store.record_gsc_rows(self.property_url, rows)
+                self.store.mark_synced('gsc', self.property_url, query_start)
+                return self._stats_from_store(start_date, end_date)
             
-            ctr = (total_clicks / total_impressions * 100) if total_impressions > 0 else 0
-            
-            return {
-                'clicks': total_clicks,
-                'impressions': total_impressions,
-                'ctr': round(ctr, 2),
-                'clicks_us': us_clicks
-            }
+            return self.summarize(rows)
             
         except Exception as e:
             logger.error(f"Error collecting GSC stats: {e}")
             return self._empty_stats()
     
+    def _stats_from_store(self, start_date, end_date):
+        """Build stats from the daily rollup of stored rows"""
+        # Same range as the API query: the last day is end_date - 1 day
+        totals = self.store.rollup('gsc', self.property_url).window(
+            start_date.date(), (end_date - timedelta(days=1)).date()
+        )
+        ctr = (totals['clicks'] / totals['impressions'] * 100) if totals['impressions'] > 0 else 0
+        
+        return {
+            'clicks': totals['clicks'],
+            'impressions': totals['impressions'],
+            'ctr': round(ctr, 2),
+            'clicks_us': totals['clicks_us'],
+            'synced_at': self.store.synced_at('gsc', self.property_url)
+        }
+    
+    @staticmethod
+    def summarize(rows):
+        """
+        Aggregate search analytics rows whose last key is the country
+        
+        Returns:
+            dict with stats: clicks, impressions, ctr, clicks_us
+        """
+        us_clicks = 0
+        total_impressions = 0
+        total_clicks = 0
+        
+        for row in rows:
+            if row['keys'][-1] == 'usa':
+                us_clicks += row['clicks']
+            total_impressions += row['impressions']
+            total_clicks += row['clicks']
+        
+        ctr = (total_clicks / total_impressions * 100) if total_impressions > 0 else 0
+        
+        return {
+            'clicks': total_clicks,
+            'impressions': total_impressions,
+            'ctr': round(ctr, 2),
+            'clicks_us': us_clicks
+        }
+    
     def _empty_stats(self):
         """Return empty stats structure"""
         return {
             'clicks': 0,
             'impressions': 0,
             'ctr': 0,
-            'clicks_us': 0
+            'clicks_us': 0,
+            'error': 'API not configured or failed'
         }
 
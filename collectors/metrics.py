@@ -0,0 +1,378 @@
+"""Minimal Prometheus-style metrics registry (text exposition format)"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .shared_state import SharedState
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Seconds between a worker's writes of its metrics to the shared totals
+FLUSH_INTERVAL = 5
+
+METRICS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_values (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels, field)
+);
+"""
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class: a named family of labelled samples"""
+    
+    kind = 'untyped'
+    # Values from several processes add up (counters, histograms); otherwise the last write wins
+    additive = True
+    
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self._values = {}
+        # label key -> fields as last written to the shared totals
+        self._flushed = {}
+        self._lock = threading.Lock()
+        self.registry.register(self)
+    
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def _fields(self, value):
+        """A value as a dict of numbers, the form stored in the shared totals"""
+        return {'': value}
+    
+    def _from_fields(self, fields):
+        return fields.get('', 0)
+    
+    def values(self):
+        """
+        Current values by label key: the totals of every process when the
+        registry is shared, else this process's own
+        """
+        shared = self.registry.shared_values(self.name)
+        if shared is not None:
+            return {key: self._from_fields(fields) for key, fields in shared.items()}
+        with self._lock:
+            return {key: self._from_fields(self._fields(value)) for key, value in self._values.items()}
+    
+    def pending(self):
+        """
+        Changes since the last flush
+        
+        Returns:
+            tuple (rows, snapshot): rows of (label key, field, value), where
+            value is a delta for additive metrics; pass snapshot to flushed()
+            once the rows are written
+        """
+        with self._lock:
+            snapshot = {key: self._fields(value) for key, value in self._values.items()}
+        rows = []
+        for key, fields in snapshot.items():
+            previous = self._flushed.get(key, {})
+            for field, value in fields.items():
+                if self.additive and value != previous.get(field, 0):
+                    rows.append((key, field, value - previous.get(field, 0)))
+                elif not self.additive and value != previous.get(field):
+                    rows.append((key, field, value))
+        return rows, snapshot
+    
+    def flushed(self, snapshot):
+        self._flushed = snapshot
+    
+    def samples(self):
+        """Iterable of (suffix, label values, extra label pairs, value)"""
+        return [('', key, (), value) for key, value in sorted(self.values().items())]
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, key, extra, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+    
+    kind = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down
+    
+    A gauge built with function= is computed at scrape time: function()
+    returns a dict of label-value tuples to values.
+    """
+    
+    kind = 'gauge'
+    additive = False
+    
+    def __init__(self, name, documentation, labelnames=(), registry=None, function=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.function = function
+    
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def samples(self):
+        if self.function is None:
+            return super().samples()
+        return [('', tuple(str(v) for v in key), (), value) for key, value in sorted(self.function().items())]
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, plus their sum and count"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+    
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+    
+    def _fields(self, value):
+        counts, total = value
+        fields = {str(i): count for i, count in enumerate(counts)}
+        fields['sum'] = total
+        return fields
+    
+    def _from_fields(self, fields):
+        return [fields.get(str(i), 0) for i in range(len(self.buckets))], fields.get('sum', 0.0)
+    
+    def samples(self):
+        samples = []
+        for key, (counts, total) in sorted(self.values().items()):
+            for bound, count in zip(self.buckets, counts):
+                samples.append(('_bucket', key, [('le', _format_value(bound))], count))
+            samples.append(('_sum', key, (), total))
+            samples.append(('_count', key, (), counts[-1]))
+        return samples
+
+
+class Registry:
+    """
+    Collection of metrics rendered together
+    
+    Each process counts in memory. Once share() is called, every process
+    adds its changes to totals in a SQLite file (every FLUSH_INTERVAL
+    seconds and before rendering), and /metrics in any worker reports the
+    totals of all of them instead of jumping between per-worker counts.
+    """
+    
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+        self.state = None
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self._flusher_pid = None
+        self._stop = threading.Event()
+    
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+    
+    def share(self, path):
+        """Aggregate the metrics of every process using the same SQLite file"""
+        self.state = SharedState(path, METRICS_SCHEMA)
+    
+    def start_flushing(self):
+        """Write this process's changes to the shared totals in a background thread"""
+        if self.state is None or (self._flusher_pid == os.getpid() and self._flusher.is_alive()):
+            return
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+        self._flusher_pid = os.getpid()
+        self._flusher.start()
+    
+    def stop_flushing(self):
+        """Stop the flush thread (it writes the remaining changes as it exits)"""
+        self._stop.set()
+        if self._flusher and self._flusher_pid == os.getpid():
+            self._flusher.join(timeout=5)
+    
+    def _flush_loop(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            self.flush()
+        self.flush()
+    
+    def flush(self):
+        """Add this process's changes since the last flush to the shared totals"""
+        if self.state is None:
+            return
+        with self._lock:
+            metrics = list(self._metrics)
+        with self._flush_lock:
+            pending = [(metric, *metric.pending()) for metric in metrics]
+            try:
+                with self.state.transaction() as conn:
+                    for metric, rows, snapshot in pending:
+                        for key, field, value in rows:
+                            if metric.additive:
+                                conn.execute(
+                                    'INSERT INTO metric_values (name, labels, field, value) VALUES (?, ?, ?, ?) '
+                                    'ON CONFLICT (name, labels, field) DO UPDATE SET value = value + excluded.value',
+                                    (metric.name, json.dumps(key), field, value)
+                                )
+                            else:
+                                conn.execute(
+                                    'INSERT OR REPLACE INTO metric_values (name, labels, field, value) VALUES (?, ?, ?, ?)',
+                                    (metric.name, json.dumps(key), field, value)
+                                )
+            except sqlite3.Error as e:
+                logger.warning(f"Could not write shared metrics: {e}")
+                return
+            for metric, rows, snapshot in pending:
+                metric.flushed(snapshot)
+    
+    def shared_values(self, name):
+        """
+        Totals of one metric across processes
+        
+        Returns:
+            dict of label key -> fields, or None when the registry is not
+            shared (or the file can't be read)
+        """
+        if self.state is None:
+            return None
+        try:
+            rows = self.state.query('SELECT labels, field, value FROM metric_values WHERE name = ?', (name,))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read shared metrics: {e}")
+            return None
+        values = {}
+        for row in rows:
+            values.setdefault(tuple(json.loads(row['labels'])), {})[row['field']] = row['value']
+        return values
+    
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        self.flush()
+        with self._lock:
+            metrics = list(self._metrics)
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+# Collection
+
+COLLECTION_SECONDS = Histogram(
+    'stats_collection_duration_seconds',
+    'Time taken by one collection task (a platform or Reddit account)',
+    ['platform']
+)
+COLLECTIONS = Counter(
+    'stats_collections_total',
+    'Finished collection tasks by outcome (ok, error)',
+    ['platform', 'outcome']
+)
+TIMEOUTS = Counter(
+    'stats_collection_timeouts_total',
+    'Collection tasks that missed their deadline',
+    ['platform']
+)
+LAST_SUCCESS = Gauge(
+    'stats_last_success_timestamp_seconds',
+    'Unix time of the last collection without an error',
+    ['platform']
+)
+Gauge(
+    'stats_seconds_since_last_success',
+    'Seconds since the last collection without an error',
+    ['platform'],
+    function=lambda: {key: time.time() - value for key, value in LAST_SUCCESS.values().items()}
+)
+COALESCED = Counter(
+    'stats_coalesced_collections_total',
+    'Collection tasks answered by an identical collection already in flight',
+    ['platform']
+)
+CIRCUIT_OPEN = Gauge(
+    'stats_circuit_open',
+    '1 while a collection circuit breaker is open or half-open',
+    ['breaker']
+)
+CIRCUIT_REJECTIONS = Counter(
+    'stats_circuit_rejections_total',
+    'Collections skipped because their circuit breaker was open',
+    ['platform']
+)
+FALLBACKS = Counter(
+    'stats_collector_fallbacks_total',
+    'Times a collector fell back to a degraded source',
+    ['platform', 'fallback']
+)
+
+# Dashboard cache
+
+CACHE_LOOKUPS = Counter(
+    'stats_cache_lookups_total',
+    'Stats cache lookups by result (fresh, stale, miss)',
+    ['platform', 'result']
+)
+
+# HTTP
+
+HTTP_REQUESTS = Counter(
+    'stats_http_requests_total',
+    'HTTP responses received by collectors, by host and status code',
+    ['host', 'status']
+)
+
+
+def record_collection(platform, seconds, result):
+    """Record the duration and outcome of a finished collection task"""
+    COLLECTION_SECONDS.observe(seconds, platform=platform)
+    if isinstance(result, dict) and result.get('error'):
+        COLLECTIONS.inc(platform=platform, outcome='error')
+    else:
+        COLLECTIONS.inc(platform=platform, outcome='ok')
+        LAST_SUCCESS.set(time.time(), platform=platform)
@@ -0,0 +1,332 @@
+"""Per-platform token buckets paced by the APIs' rate-limit headers"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from .shared_state import SharedState
+
+logger = logging.getLogger(__name__)
+
+# Request priorities; lower values are served first
+INTERACTIVE = 0  # a dashboard request is waiting for the result
+BACKGROUND = 1  # scheduled or stale-while-revalidate refreshes
+
+_priority = contextvars.ContextVar('request_priority', default=INTERACTIVE)
+
+# Requests per second (and burst size) until the API reports its own budget
+DEFAULT_RATES = {
+    'reddit': 1.0,
+    'github': 1.0,
+    'twitter': 0.5
+}
+BURST = 10
+
+# Hosts whose requests draw from each platform's bucket
+HOSTS = {
+    'reddit.com': 'reddit',
+    'api.github.com': 'github',
+    'api.twitter.com': 'twitter'
+}
+
+REMAINING_HEADERS = ('X-RateLimit-Remaining', 'X-Rate-Limit-Remaining')
+RESET_HEADERS = ('X-RateLimit-Reset', 'X-Rate-Limit-Reset')
+
+# Waiting longer than this for budget fails the request instead
+MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', 20))
+
+BUCKET_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    name TEXT PRIMARY KEY,
+    rate REAL NOT NULL,
+    tokens REAL NOT NULL,
+    remaining REAL,
+    reset_at REAL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class RateLimited(Exception):
+    """The platform's request budget is exhausted for longer than MAX_WAIT"""
+
+
+@contextmanager
+def priority(level):
+    """Run the enclosed requests (and tasks submitted with their context) at a priority"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _header(headers, names):
+    """First parseable numeric value among header names"""
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket for one platform
+    
+    Tokens refill at `rate` per second up to `capacity`. Whenever a response
+    reports the remaining budget and its reset time, the rate is set so the
+    remaining requests are spread over the rest of the window, and once the
+    budget drops to `reserve` requests wait for the reset. Waiting
+    interactive requests always go before background ones.
+    
+    With a SharedState the tokens and the reported budget live in SQLite,
+    so all worker processes draw from one bucket per platform; the priority
+    queue stays per process.
+    """
+    
+    def __init__(self, name, rate, capacity=BURST, reserve=1, state=None):
+        """
+        Args:
+            name: platform name
+            rate: tokens per second while no rate-limit headers have been seen
+            capacity: maximum burst size
+            reserve: budget kept back for interactive requests
+            state: optional SharedState holding the bucket for every process
+        """
+        self.name = name
+        self.default_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.reserve = reserve
+        self.tokens = float(capacity)
+        self.remaining = None
+        self.reset_at = None
+        self.waits = 0
+        self.state = state
+        # Wall-clock time, so other processes can refill from it
+        self._updated = time.time()
+        self._waiting = [0, 0]
+        self._cond = threading.Condition()
+    
+    @contextmanager
+    def _shared(self):
+        """
+        Load the shared bucket, run the block, then save it, in one SQLite
+        transaction (caller holds the lock; no-op without a SharedState)
+        """
+        if self.state is None:
+            yield
+            return
+        with self.state.transaction() as conn:
+            row = conn.execute('SELECT * FROM rate_limit_buckets WHERE name = ?', (self.name,)).fetchone()
+            if row:
+                self.rate = row['rate']
+                self.tokens = row['tokens']
+                self.remaining = row['remaining']
+                self.reset_at = row['reset_at']
+                self._updated = row['updated_at']
+            yield
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_limit_buckets (name, rate, tokens, remaining, reset_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (self.name, self.rate, self.tokens, self.remaining, self.reset_at, self._updated)
+            )
+    
+    def _refill(self, now):
+        """Add tokens for the time elapsed; forget the budget once it has reset"""
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.reset_at is not None and now >= self.reset_at:
+            self.remaining = None
+            self.reset_at = None
+            self.rate = self.default_rate
+    
+    def _delay(self, now, level):
+        """Seconds until a request at this priority may be sent (0 = now)"""
+        if self.remaining is not None:
+            floor = 0 if level == INTERACTIVE else self.reserve
+            if self.remaining <= floor:
+                return self.reset_at - now
+        if self.tokens >= 1:
+            return 0
+        if self.rate > 0:
+            return (1 - self.tokens) / self.rate
+        return self.reset_at - now if self.reset_at is not None else MAX_WAIT + 1
+    
+    def _try_take(self, level):
+        """
+        Take a token if a request at this priority may be sent now (caller
+        holds the lock)
+        
+        Returns:
+            None if a token was taken, else seconds to wait before trying again
+        
+        Raises:
+            RateLimited: if the wait would be longer than MAX_WAIT
+        """
+        with self._shared():
+            now = time.time()
+            self._refill(now)
+            delay = self._delay(now, level)
+            if delay > MAX_WAIT:
+                raise RateLimited(f"{self.name} rate limit exhausted, resets in {delay:.0f}s")
+            
+            ahead = any(self._waiting[:level])
+            if delay <= 0 and not ahead:
+                self.tokens -= 1
+                if self.remaining is not None:
+                    self.remaining -= 1
+                return None
+            return delay if delay > 0 else 0.05
+    
+    def acquire(self, level=None):
+        """
+        Block until a request may be sent
+        
+        Args:
+            level: INTERACTIVE or BACKGROUND (defaults to the current priority())
+        
+        Returns:
+            True if the request had to wait
+        
+        Raises:
+            RateLimited: if the wait would be longer than MAX_WAIT
+        """
+        level = _priority.get() if level is None else level
+        with self._cond:
+            self._waiting[level] += 1
+            try:
+                waited = False
+                while True:
+                    delay = self._try_take(level)
+                    if delay is None:
+                        self.waits += waited
+                        return waited
+                    waited = True
+                    self._cond.wait(timeout=delay)
+            finally:
+                self._waiting[level] -= 1
+                self._cond.notify_all()
+    
+    async def acquire_async(self, level=None):
+        """
+        acquire() for coroutines: sleeps on the event loop instead of blocking
+        the thread (a shared bucket is read and written from a worker thread)
+        """
+        level = _priority.get() if level is None else level
+        with self._cond:
+            self._waiting[level] += 1
+        try:
+            waited = False
+            while True:
+                if self.state is None:
+                    delay = self._take(level)
+                else:
+                    delay = await asyncio.to_thread(self._take, level)
+                if delay is None:
+                    with self._cond:
+                        self.waits += waited
+                    return waited
+                waited = True
+                await asyncio.sleep(delay)
+        finally:
+            with self._cond:
+                self._waiting[level] -= 1
+                self._cond.notify_all()
+    
+    def _take(self, level):
+        """_try_take() under the lock"""
+        with self._cond:
+            return self._try_take(level)
+    
+    def update(self, headers):
+        """Re-pace from a response's rate-limit headers, if it has any"""
+        remaining = _header(headers, REMAINING_HEADERS)
+        reset = _header(headers, RESET_HEADERS)
+        if remaining is None or reset is None:
+            return
+        
+        # GitHub and Twitter send an epoch timestamp, Reddit seconds until reset
+        reset_in = max(reset - time.time() if reset > 1e9 else reset, 0)
+        with self._cond:
+            with self._shared():
+                now = time.time()
+                self._refill(now)
+                self.remaining = remaining
+                self.reset_at = now + reset_in
+                if reset_in > 0:
+                    self.rate = max(remaining - self.reserve, 0) / reset_in
+            self._cond.notify_all()
+    
+    async def update_async(self, headers):
+        """update() for coroutines (a shared bucket is written from a worker thread)"""
+        if self.state is None:
+            self.update(headers)
+        else:
+            await asyncio.to_thread(self.update, headers)
+    
+    def snapshot(self):
+        """Current state for diagnostics"""
+        with self._cond:
+            if self.state is not None:
+                rows = self.state.query('SELECT * FROM rate_limit_buckets WHERE name = ?', (self.name,))
+                if rows:
+                    self.rate, self.tokens = rows[0]['rate'], rows[0]['tokens']
+                    self.remaining, self.reset_at = rows[0]['remaining'], rows[0]['reset_at']
+            return {
+                'rate': round(self.rate, 3),
+                'tokens': round(self.tokens, 2),
+                'remaining': self.remaining,
+                'reset_in': round(self.reset_at - time.time()) if self.reset_at else None,
+                'waiting': sum(self._waiting),
+                'waits': self.waits
+            }
+
+
+_lock = threading.Lock()
+_buckets = {}
+_state = None
+
+
+def share(path):
+    """Keep every platform's bucket in a SQLite file, so all worker processes draw from it"""
+    global _state
+    with _lock:
+        _state = SharedState(path, BUCKET_SCHEMA)
+        for b in _buckets.values():
+            with b._cond:
+                b.state = _state
+
+
+def bucket(name):
+    """Shared bucket for a platform (RATE_LIMIT_<PLATFORM> overrides its default rate)"""
+    with _lock:
+        if name not in _buckets:
+            rate = float(os.getenv(f'RATE_LIMIT_{name.upper()}', DEFAULT_RATES.get(name, 1.0)))
+            _buckets[name] = TokenBucket(name, rate, state=_state)
+        return _buckets[name]
+
+
+def bucket_for(url):
+    """Bucket governing requests to url, or None for hosts without one"""
+    host = urlparse(url).hostname or ''
+    for suffix, name in HOSTS.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return bucket(name)
+    return None
+
+
+def snapshot():
+    """State of every bucket in use, keyed by platform"""
+    with _lock:
+        buckets = dict(_buckets)
+    return {name: b.snapshot() for name, b in buckets.items()}
@@ -1,17 +1,34 @@
 """Reddit stats collector"""
 
-import requests
+import asyncio
 from datetime import datetime
 import logging
+import threading
+
+from . import async_transport, tracing, transport
+from .ratelimit import RateLimited
+from .utils import day_bounds
 
 logger = logging.getLogger(__name__)
 
+# Reddit listings stop at ~1000 items, i.e. 10 pages of 100
+MAX_PAGES = 10
+
+# /api/info accepts up to 100 fullnames per call
+INFO_BATCH_SIZE = 100
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+
 
 class RedditCollector:
     """Collects Reddit statistics"""
     
-    def __init__(self, username):
+    def __init__(self, username, store=None, score_refresher=None):
         self.username = username
+        self.store = store  # Optional MetricsStore for raw posts
+        self.score_refresher = score_refresher  # Optional RedditScoreRefresher shared by all accounts
     
     def collect(self, start_date, end_date):
         """
@@ -26,74 +43,268 @@ class RedditCollector:
         """
         logger.info(f"Collecting Reddit stats for u/{self.username}")
         
+        if self.store and not self.store.needs_sync('reddit', self.username, start_date):
+            with tracing.span('reddit.from_store', user=self.username):
+                return self._stats_from_store(start_date, end_date)
+        
         try:
-            # Use public API with browser-like headers
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(
-                f'https://www.reddit.com/user/{self.username}/submitted.json?limit=100',
-                headers=headers,
-                timeout=10
-            )
+            if self.store:
+                sync_start, since = self._sync_window(start_date)
+                with tracing.span('reddit.listing', user=self.username, incremental=since is not None) as span:
+                    posts = self._fetch_submissions(sync_start, since)
+                    span['posts'] = len(posts or [])
+                if posts is None:
+                    return self._empty_stats()
+                
+                self._record(posts, sync_start)
+                
+                # Posts older than the first listing page keep changing score
+                if since is not None and self.score_refresher:
+                    with tracing.span('reddit.refresh_scores'):
+                        self.score_refresher.refresh(sync_start)
+                self.store.mark_synced('reddit', self.username, sync_start)
+                return self._stats_from_store(start_date, end_date)
             
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch Reddit posts: {response.status_code}")
+            with tracing.span('reddit.listing', user=self.username) as span:
+                posts = self._fetch_submissions(start_date)
+                span['posts'] = len(posts or [])
+            if posts is None:
                 return self._empty_stats()
+            return self._summarize_window(posts, start_date, end_date)
             
-            data = response.json()
-            posts = data.get('data', {}).get('children', [])
-            
-            # Filter posts from date range
-            week_posts = []
-            total_karma = 0
-            total_comments = 0
-            subreddit_stats = {}
-            
-            for post in posts:
-                post_data = post.get('data', {})
-                post_date = datetime.fromtimestamp(post_data.get('created_utc', 0))
+        except RateLimited as e:
+            logger.warning(f"Reddit collection for u/{self.username} skipped: {e}")
+            return self._rate_limited_stats(e)
+        except Exception as e:
+            logger.error(f"Error collecting Reddit stats: {e}")
+            return self._empty_stats()
+    
+    async def collect_async(self, start_date, end_date):
+        """
+        collect() on the asyncio transport (same arguments and result)
+        
+        Store reads and writes run in a worker thread, off the event loop.
+        """
+        logger.info(f"Collecting Reddit stats for u/{self.username}")
+        
+        if self.store and not await asyncio.to_thread(self.store.needs_sync, 'reddit', self.username, start_date):
+            with tracing.span('reddit.from_store', user=self.username):
+                return await asyncio.to_thread(self._stats_from_store, start_date, end_date)
+        
+        try:
+            if self.store:
+                sync_start, since = await asyncio.to_thread(self._sync_window, start_date)
+                with tracing.span('reddit.listing', user=self.username, incremental=since is not None) as span:
+                    posts = await self._fetch_submissions_async(sync_start, since)
+                    span['posts'] = len(posts or [])
+                if posts is None:
+                    return self._empty_stats()
                 
-                if start_date <= post_date <= end_date:
-                    week_posts.append(post_data)
-                    karma = post_data.get('score', 0)
-                    comments = post_data.get('num_comments', 0)
-                    
-                    total_karma += karma
-                    total_comments += comments
-                    
-                    # Track by subreddit
-                    subreddit = post_data.get('subreddit', 'unknown')
-                    if subreddit not in subreddit_stats:
-                        subreddit_stats[subreddit] = {'posts': 0, 'karma': 0}
-                    subreddit_stats[subreddit]['posts'] += 1
-                    subreddit_stats[subreddit]['karma'] += karma
-            
-            # Find top post
-            top_post = None
-            if week_posts:
-                top_post = max(week_posts, key=lambda x: x.get('score', 0))
+                await asyncio.to_thread(self._record, posts, sync_start)
+                
+                if since is not None and self.score_refresher:
+                    with tracing.span('reddit.refresh_scores'):
+                        await self.score_refresher.refresh_async(sync_start)
+                await asyncio.to_thread(self.store.mark_synced, 'reddit', self.username, sync_start)
+                return await asyncio.to_thread(self._stats_from_store, start_date, end_date)
             
-            return {
-                'posts_count': len(week_posts),
-                'karma': total_karma,
-                'comments': total_comments,
-                'avg_karma': total_karma / len(week_posts) if week_posts else 0,
-                'avg_comments': total_comments / len(week_posts) if week_posts else 0,
-                'top_post': {
-                    'title': top_post.get('title', '') if top_post else '',
-                    'score': top_post.get('score', 0) if top_post else 0,
-                    'subreddit': top_post.get('subreddit', '') if top_post else '',
-                    'url': f"https://reddit.com{top_post.get('permalink', '')}" if top_post else ''
-                } if top_post else None,
-                'subreddits': subreddit_stats
-            }
+            with tracing.span('reddit.listing', user=self.username) as span:
+                posts = await self._fetch_submissions_async(start_date)
+                span['posts'] = len(posts or [])
+            if posts is None:
+                return self._empty_stats()
+            return self._summarize_window(posts, start_date, end_date)
             
+        except RateLimited as e:
+            logger.warning(f"Reddit collection for u/{self.username} skipped: {e}")
+            return self._rate_limited_stats(e)
         except Exception as e:
             logger.error(f"Error collecting Reddit stats: {e}")
             return self._empty_stats()
     
+    def _sync_window(self, start_date):
+        """
+        Where the next sync starts, and the newest created_utc already
+        stored if only newer submissions are needed (else None)
+        """
+        sync_start = self.store.sync_start(start_date)
+        # Only new submissions are needed if the last sync already reached back this far
+        since = None
+        if self.store.synced_window_start('reddit', self.username) <= sync_start.timestamp():
+            since = self.store.reddit_high_water(self.username)
+        return sync_start, since
+    
+    def _record(self, posts, sync_start):
+        """Store the fetched submissions that fall inside the sync window"""
+        with tracing.span('reddit.store', user=self.username):
+            self.store.record_reddit_posts(
+                self.username,
+                [p for p in posts if datetime.fromtimestamp(p.get('created_utc', 0)) >= sync_start]
+            )
+    
+    def _summarize_window(self, posts, start_date, end_date):
+        """Stats of the fetched posts created within the range's whole days (like the store)"""
+        # Filter posts from date range
+        first_day, last_day = day_bounds(start_date, end_date)
+        week_posts = [
+            p for p in posts
+            if first_day <= datetime.fromtimestamp(p.get('created_utc', 0)) <= last_day
+        ]
+        return self.summarize(week_posts)
+    
+    def _fetch_submissions(self, oldest, since=None):
+        """
+        Page through the submitted listing with Reddit's after cursor
+        
+        Paging stops at the last page, at the first page that lies entirely
+        before oldest, or once a page reaches the high-water mark (the
+        newest submission already stored).
+        
+        Args:
+            oldest: datetime; submissions older than this are not needed
+            since: optional created_utc of the newest submission already seen
+            
+        Returns:
+            list of submission dicts (newest first), or None if the first page failed
+        """
+        posts = []
+        after = None
+        for page in range(MAX_PAGES):
+            # Use public API with browser-like headers
+            response = transport.get(self._listing_url(), **self._page_request(after))
+            ok, after = self._read_page(response, posts, oldest, since)
+            if not ok:
+                return posts if page else None
+            if not after:
+                break
+        
+        return posts
+    
+    async def _fetch_submissions_async(self, oldest, since=None):
+        """_fetch_submissions() on the asyncio transport"""
+        posts = []
+        after = None
+        for page in range(MAX_PAGES):
+            response = await async_transport.get(self._listing_url(), **self._page_request(after))
+            ok, after = self._read_page(response, posts, oldest, since)
+            if not ok:
+                return posts if page else None
+            if not after:
+                break
+        
+        return posts
+    
+    def _listing_url(self):
+        return f'https://www.reddit.com/user/{self.username}/submitted.json'
+    
+    @staticmethod
+    def _page_request(after):
+        """Request arguments for the listing page following the after cursor"""
+        params = {'limit': 100}
+        if after:
+            params['after'] = after
+        return {'headers': HEADERS, 'params': params, 'timeout': 10}
+    
+    @staticmethod
+    def _read_page(response, posts, oldest, since):
+        """
+        Add a listing page's submissions to posts
+        
+        Returns:
+            tuple (ok, after): ok is False if the request failed; after is
+            the cursor of the next page, or None when paging should stop
+        """
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch Reddit posts: {response.status_code}")
+            return False, None
+        
+        listing = response.json().get('data', {})
+        page_posts = [child.get('data', {}) for child in listing.get('children', [])]
+        posts.extend(page_posts)
+        
+        after = listing.get('after')
+        if not after or not page_posts:
+            return True, None
+        
+        oldest_on_page = min(p.get('created_utc', 0) for p in page_posts)
+        if datetime.fromtimestamp(oldest_on_page) < oldest:
+            return True, None
+        if since is not None and oldest_on_page <= since:
+            return True, None
+        return True, after
+    
+    def _stats_from_store(self, start_date, end_date):
+        """Build stats from the daily rollup (totals) and stored posts (top post, subreddits)"""
+        totals = self.store.rollup('reddit', self.username).between(start_date, end_date)
+        first_day, last_day = day_bounds(start_date, end_date)
+        top_post = self.store.reddit_top_post(self.username, first_day, last_day)
+        posts_count = totals['posts']
+        
+        return {
+            'posts_count': posts_count,
+            'karma': totals['karma'],
+            'comments': totals['comments'],
+            'avg_karma': totals['karma'] / posts_count if posts_count else 0,
+            'avg_comments': totals['comments'] / posts_count if posts_count else 0,
+            'top_post': {
+                'title': top_post['title'],
+                'score': top_post['score'],
+                'subreddit': top_post['subreddit'],
+                'url': f"https://reddit.com{top_post['permalink']}"
+            } if top_post else None,
+            'subreddits': self.store.reddit_subreddits(self.username, first_day, last_day),
+            'synced_at': self.store.synced_at('reddit', self.username)
+        }
+    
+    @staticmethod
+    def summarize(week_posts):
+        """
+        Aggregate a list of submissions (already filtered to the window)
+        
+        Args:
+            week_posts: list of submission dicts (score, num_comments, subreddit, title, permalink)
+            
+        Returns:
+            dict with stats: posts_count, karma, comments, top_post, subreddits
+        """
+        total_karma = 0
+        total_comments = 0
+        subreddit_stats = {}
+        
+        for post_data in week_posts:
+            karma = post_data.get('score', 0)
+            comments = post_data.get('num_comments', 0)
+            
+            total_karma += karma
+            total_comments += comments
+            
+            # Track by subreddit
+            subreddit = post_data.get('subreddit', 'unknown')
+            if subreddit not in subreddit_stats:
+                subreddit_stats[subreddit] = {'posts': 0, 'karma': 0}
+            subreddit_stats[subreddit]['posts'] += 1
+            subreddit_stats[subreddit]['karma'] += karma
+        
+        # Find top post
+        top_post = None
+        if week_posts:
+            top_post = max(week_posts, key=lambda x: x.get('score', 0))
+        
+        return {
+            'posts_count': len(week_posts),
+            'karma': total_karma,
+            'comments': total_comments,
+            'avg_karma': total_karma / len(week_posts) if week_posts else 0,
+            'avg_comments': total_comments / len(week_posts) if week_posts else 0,
+            'top_post': {
+                'title': top_post.get('title', '') if top_post else '',
+                'score': top_post.get('score', 0) if top_post else 0,
+                'subreddit': top_post.get('subreddit', '') if top_post else '',
+                'url': f"https://reddit.com{top_post.get('permalink', '')}" if top_post else ''
+            } if top_post else None,
+            'subreddits': subreddit_stats
+        }
+    
     def _empty_stats(self):
         """Return empty stats structure"""
         return {
@@ -103,6 +314,103 @@ class RedditCollector:
             'avg_karma': 0,
             'avg_comments': 0,
             'top_post': None,
-            'subreddits': {}
+            'subreddits': {},
+            'error': 'API request failed'
         }
+    
+    def _rate_limited_stats(self, error):
+        """Empty stats marked rate_limited, which the dashboard never caches"""
+        return dict(self._empty_stats(), error=str(error), rate_limited=True)
+
 
+class RedditScoreRefresher:
+    """
+    Refreshes scores of already stored submissions via /api/info
+    
+    One instance is shared by the collectors of every configured account,
+    so a refresh costs ceil(known posts / 100) requests in total rather
+    than a listing per account. Each caller claims the stored posts nobody
+    has claimed yet and fetches them; the lock is only held to claim and to
+    merge the results, so a collector never waits on another's requests
+    (it finds the posts already claimed and goes on with the stored scores).
+    """
+    
+    def __init__(self, store, usernames):
+        self.store = store
+        self.usernames = list(usernames)
+        self._lock = threading.Lock()
+        self._claimed = set()
+    
+    def refresh(self, oldest):
+        """
+        Re-fetch score and comment counts of stored posts newer than oldest
+        
+        Returns:
+            number of posts whose counts changed
+        """
+        fullnames = self._claim(oldest)
+        changed = 0
+        for batch in self._batches(fullnames):
+            try:
+                response = transport.get('https://www.reddit.com/api/info.json', **self._info_request(batch))
+            except Exception as e:
+                logger.warning(f"Reddit score refresh failed: {e}")
+                break
+            
+            batch_changed = self._merge(response)
+            if batch_changed is None:
+                break
+            changed += batch_changed
+        
+        if fullnames:
+            logger.info(f"Refreshed {len(fullnames)} Reddit posts, {changed} changed")
+        return changed
+    
+    async def refresh_async(self, oldest):
+        """refresh() on the asyncio transport (store access runs in a worker thread)"""
+        fullnames = await asyncio.to_thread(self._claim, oldest)
+        changed = 0
+        for batch in self._batches(fullnames):
+            try:
+                response = await async_transport.get('https://www.reddit.com/api/info.json', **self._info_request(batch))
+            except Exception as e:
+                logger.warning(f"Reddit score refresh failed: {e}")
+                break
+            
+            batch_changed = await asyncio.to_thread(self._merge, response)
+            if batch_changed is None:
+                break
+            changed += batch_changed
+        
+        if fullnames:
+            logger.info(f"Refreshed {len(fullnames)} Reddit posts, {changed} changed")
+        return changed
+    
+    def _claim(self, oldest):
+        """Fullnames of stored posts newer than oldest that no caller has claimed yet, now claimed"""
+        with self._lock:
+            fullnames = [
+                fullname for fullname in self.store.reddit_post_ids(self.usernames, oldest)
+                if fullname not in self._claimed
+            ]
+            self._claimed.update(fullnames)
+        return fullnames
+    
+    @staticmethod
+    def _batches(fullnames):
+        for i in range(0, len(fullnames), INFO_BATCH_SIZE):
+            yield fullnames[i:i + INFO_BATCH_SIZE]
+    
+    @staticmethod
+    def _info_request(batch):
+        return {'headers': HEADERS, 'params': {'id': ','.join(batch)}, 'timeout': 10}
+    
+    def _merge(self, response):
+        """Store the counts from an /api/info response; number changed, or None if it failed"""
+        if response.status_code != 200:
+            logger.warning(f"Reddit score refresh failed: {response.status_code}")
+            return None
+        
+        children = response.json().get('data', {}).get('children', [])
+        with self._lock:
+            return self.store.update_reddit_scores([child.get('data', {}) for child in children])
@@ -0,0 +1,63 @@
+"""SQLite file holding state that every worker process must agree on"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SharedState:
+    """
+    A SQLite file (WAL mode) with one connection per process
+    
+    Used for budgets that several gunicorn workers draw from (rate-limit
+    buckets, the YouTube quota) and for the /metrics totals. transaction()
+    takes SQLite's write lock up front, so a read-modify-write is atomic
+    across processes.
+    """
+    
+    def __init__(self, path, schema):
+        """
+        Args:
+            path: SQLite file (usually the shared stats cache, STATS_CACHE_PATH)
+            schema: CREATE ... IF NOT EXISTS statements for the tables used
+        """
+        self.path = path
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        with self._lock:
+            self._connection().executescript(schema)
+    
+    def _connection(self):
+        """This process's connection (reopened after a fork; caller holds the lock)"""
+        if self._pid != os.getpid():
+            # Autocommit: transaction() issues BEGIN IMMEDIATE / COMMIT itself
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._pid = os.getpid()
+        return self._conn
+    
+    @contextmanager
+    def transaction(self):
+        """Connection inside a write transaction, committed unless the block raises"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+    
+    def query(self, sql, parameters=()):
+        """Rows of a read-only statement"""
+        with self._lock:
+            return self._connection().execute(sql, parameters).fetchall()
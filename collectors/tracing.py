@@ -0,0 +1,143 @@
+"""Opt-in span tracing, exported as Chrome trace-event JSON"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+TRACE_DIR = os.getenv('TRACE_DIR', os.path.join('data', 'traces'))
+TRACE_MAX_FILES = int(os.getenv('TRACE_MAX_FILES', 50))
+
+_current = contextvars.ContextVar('trace', default=None)
+
+
+def always_on():
+    """True when STATS_TRACE asks for every dashboard request to be traced"""
+    return os.getenv('STATS_TRACE', 'false').lower() == 'true'
+
+
+class Trace:
+    """
+    Spans recorded during one dashboard request
+    
+    Spans from worker threads are collected as long as the threads run in a
+    copy of the request's context (the collection engine takes care of that).
+    """
+    
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now()
+        self.path = None
+        self._origin = time.perf_counter()
+        self._events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+    
+    def add(self, name, category, start, end, args):
+        """Record a finished span (start/end are time.perf_counter() values)"""
+        thread = threading.current_thread()
+        with self._lock:
+            self._threads[thread.ident] = thread.name
+            self._events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': round((start - self._origin) * 1e6, 1),
+                'dur': round((end - start) * 1e6, 1),
+                'pid': os.getpid(),
+                'tid': thread.ident,
+                'args': args
+            })
+    
+    def to_chrome(self):
+        """Trace-event JSON object (chrome://tracing, Perfetto, speedscope)"""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+            for tid, name in threads.items()
+        ]
+        return {
+            'traceEvents': metadata + sorted(events, key=lambda event: event['ts']),
+            'displayTimeUnit': 'ms',
+            'otherData': {'name': self.name, 'started_at': self.started_at.isoformat(timespec='seconds')}
+        }
+    
+    def write(self, directory=None, max_files=None):
+        """
+        Save the trace and drop the oldest files beyond max_files
+        
+        Returns:
+            path of the written file
+        """
+        directory = directory or TRACE_DIR
+        max_files = max_files or TRACE_MAX_FILES
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"trace-{self.started_at.strftime('%Y%m%d-%H%M%S-%f')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome(), f)
+        self.path = path
+        
+        traces = sorted(name for name in os.listdir(directory) if name.startswith('trace-') and name.endswith('.json'))
+        for name in traces[:-max_files]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+        return path
+
+
+@contextmanager
+def trace(name):
+    """Trace everything run in the enclosed block, writing the file on exit"""
+    current = Trace(name)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        try:
+            current.write()
+        except OSError as e:
+            logger.warning(f"Could not write trace: {e}")
+
+
+def request_trace(name, requested):
+    """trace(name) if this request asked for it (or STATS_TRACE is on), else a no-op"""
+    if requested or always_on():
+        return trace(name)
+    return nullcontext()
+
+
+def record(name, category, start, end, **args):
+    """Add an already measured span (perf_counter start/end) to the active trace"""
+    current = _current.get()
+    if current is not None:
+        current.add(name, category, start, end, args)
+
+
+@contextmanager
+def span(name, category='collector', **args):
+    """
+    Time the enclosed block as a span of the active trace
+    
+    Yields the span's args dict, so results known only at the end (status
+    codes, payload sizes, item counts) can be added to it. Without an
+    active trace this costs next to nothing.
+    """
+    current = _current.get()
+    if current is None:
+        yield args
+        return
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        current.add(name, category, start, time.perf_counter(), args)
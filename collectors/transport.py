@@ -0,0 +1,177 @@
+"""Shared HTTP transport: pooled keep-alive connections, timeouts and retries"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import metrics, ratelimit, tracing
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeout applied to every request that doesn't pass its own
+DEFAULT_TIMEOUT = (
+    float(os.getenv('HTTP_CONNECT_TIMEOUT', 5)),
+    float(os.getenv('HTTP_READ_TIMEOUT', 15))
+)
+MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+BACKOFF_BASE = 0.5  # seconds; doubled on every attempt
+BACKOFF_MAX = 30  # longest wait before a retry, including Retry-After
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))  # keep-alive connections per host
+
+_lock = threading.Lock()
+_session = None
+_retries = defaultdict(int)
+
+
+def get_session():
+    """
+    Process-wide requests.Session
+    
+    urllib3 keeps one connection pool per host behind the session, so
+    consecutive requests to the same API reuse an open TCP+TLS connection.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=20, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def retry_after(response):
+    """Seconds to wait according to a Retry-After header (None if absent)"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt):
+    """Jittered exponential backoff delay for a 0-based retry attempt"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def request(method, url, retries=None, **kwargs):
+    """
+    Send a request through the shared session
+    
+    Connection errors, timeouts and 429/5xx answers are retried with
+    jittered exponential backoff; Retry-After is honoured when the server
+    sends it. A Retry-After longer than BACKOFF_MAX is not waited for and
+    the response is returned as is. Requests to hosts with a rate-limit
+    bucket wait for a token first (see collectors.ratelimit).
+    
+    Args:
+        method: HTTP method
+        url: request URL
+        retries: maximum number of retries (defaults to HTTP_MAX_RETRIES)
+        **kwargs: passed to requests.Session.request
+    
+    Returns:
+        requests.Response of the last attempt
+    
+    Raises:
+        ratelimit.RateLimited: if the host's request budget is exhausted
+    """
+    retries = MAX_RETRIES if retries is None else retries
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    host = urlparse(url).netloc
+    bucket = ratelimit.bucket_for(url)
+    
+    for attempt in range(retries + 1):
+        if bucket:
+            started = time.perf_counter()
+            if bucket.acquire():
+                tracing.record('rate limit wait', 'wait', started, time.perf_counter(), platform=bucket.name)
+        try:
+            with tracing.span(f'{method} {host}', 'http', url=url, attempt=attempt) as span:
+                response = get_session().request(method, url, **kwargs)
+                span['status'] = response.status_code
+                span['bytes'] = len(response.content)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            metrics.HTTP_REQUESTS.inc(host=host, status='error')
+            if attempt == retries:
+                raise
+            delay = backoff(attempt)
+            logger.warning(f"{method} {host} failed ({e}), retrying in {delay:.1f}s")
+        else:
+            metrics.HTTP_REQUESTS.inc(host=host, status=response.status_code)
+            if bucket:
+                bucket.update(response.headers)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            delay = retry_after(response)
+            if delay is None:
+                delay = backoff(attempt)
+            elif delay > BACKOFF_MAX:
+                logger.warning(f"{host} asked to retry after {delay:.0f}s, giving up")
+                return response
+            logger.warning(f"{method} {host} returned {response.status_code}, retrying in {delay:.1f}s")
+        
+        count_retry(host)
+        time.sleep(delay)
+
+
+def count_retry(host):
+    """Count a retried request in host_stats()"""
+    with _lock:
+        _retries[host] += 1
+
+
+def get(url, **kwargs):
+    """GET through the shared session (see request)"""
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    """POST through the shared session (see request)"""
+    return request('POST', url, **kwargs)
+
+
+def host_stats():
+    """
+    Connection reuse per host
+    
+    Returns:
+        dict of host -> {requests, connections, reused, retries}, where
+        connections counts newly opened connections
+    """
+    stats = {}
+    session = get_session()
+    for adapter in set(session.adapters.values()):
+        if not hasattr(adapter, 'poolmanager'):
+            continue  # e.g. the replay adapter in bench/
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in (None, 80, 443) else f'{pool.host}:{pool.port}'
+            entry = stats.setdefault(host, {'requests': 0, 'connections': 0, 'reused': 0, 'retries': 0})
+            entry['requests'] += pool.num_requests
+            entry['connections'] += pool.num_connections
+            entry['reused'] = entry['requests'] - entry['connections']
+    with _lock:
+        for host, count in _retries.items():
+            stats.setdefault(host, {'requests': 0, 'connections': 0, 'reused': 0, 'retries': 0})['retries'] = count
+    return stats
@@ -0,0 +1,35 @@
+"""Shared helpers for collectors"""
+
+from datetime import datetime, time, timedelta
+
+
+def window_days(start_date, end_date):
+    """
+    The whole days a datetime range is counted over: as many days as the
+    range spans (rounded up), ending with the day of its last instant
+    
+    A 7-day range ending now is today and the 6 days before it, whatever
+    the time of day, so every way of computing a window counts the same
+    days.
+    
+    Args:
+        start_date: datetime object for start of period
+        end_date: datetime object for end of period (exclusive)
+        
+    Returns:
+        tuple (first day, last day) of dates, both inclusive
+    """
+    last_day = (end_date - timedelta(microseconds=1)).date()
+    days = max(-((start_date - end_date) // timedelta(days=1)), 1)
+    return last_day - timedelta(days=days - 1), last_day
+
+
+def day_bounds(start_date, end_date):
+    """
+    The window_days() of a datetime range as datetimes
+    
+    Returns:
+        tuple (first instant of the first day, last instant of the last day)
+    """
+    first_day, last_day = window_days(start_date, end_date)
+    return datetime.combine(first_day, time.min), datetime.combine(last_day, time.max)
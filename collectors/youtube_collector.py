@@ -1,19 +1,128 @@
 """YouTube stats collector with API and scraping fallback"""
 
-import requests
 from bs4 import BeautifulSoup
 import re
 import logging
+import os
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from . import metrics, tracing, transport
+from .google_clients import get_service
+from .shared_state import SharedState
+from .utils import day_bounds
 
 logger = logging.getLogger(__name__)
 
+# The API quota resets at midnight Pacific time
+PACIFIC = ZoneInfo('America/Los_Angeles')
+
+# videos.list accepts up to 50 comma-separated ids per call
+VIDEOS_BATCH_SIZE = 50
+
+# search.list returns at most 50 results per page
+MAX_SEARCH_PAGES = 10
+MAX_PLAYLIST_PAGES = 20
+
+# Data API quota cost per call (https://developers.google.com/youtube/v3/determine_quota_cost)
+QUOTA_COSTS = {
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'videos.list': 1,
+    'search.list': 100
+}
+
+# channel id / @handle -> uploads playlist id, resolved once per process
+_uploads_playlists = {}
+
+
+class QuotaExceeded(Exception):
+    """Raised when a call would exceed the daily YouTube API quota budget"""
+
+
+QUOTA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS youtube_quota (
+    day TEXT PRIMARY KEY,
+    spent INTEGER NOT NULL
+);
+"""
+
+
+class QuotaLedger:
+    """
+    Tracks YouTube API quota units spent per day (resets at midnight Pacific, like the API)
+    
+    Counted per process until share() moves the count into a SQLite file,
+    after which every worker (and the curator) draws from one daily budget.
+    """
+    
+    def __init__(self, daily_limit=None):
+        self.daily_limit = daily_limit or int(os.getenv('YOUTUBE_DAILY_QUOTA', 10000))
+        self.state = None
+        self._day = None
+        self._spent = 0
+        self._lock = threading.Lock()
+    
+    def share(self, path):
+        """Keep the daily count in a SQLite file shared by all processes"""
+        self.state = SharedState(path, QUOTA_SCHEMA)
+    
+    def _today(self):
+        return datetime.now(PACIFIC).date()
+    
+    def spend(self, units):
+        """Charge units against today's budget, raising QuotaExceeded if it would run out"""
+        if self.state is None:
+            with self._lock:
+                if self._day != self._today():
+                    self._day = self._today()
+                    self._spent = 0
+                self._check(self._spent, units)
+                self._spent += units
+            return
+        
+        day = self._today().isoformat()
+        with self.state.transaction() as conn:
+            row = conn.execute('SELECT spent FROM youtube_quota WHERE day = ?', (day,)).fetchone()
+            spent = row['spent'] if row else 0
+            self._check(spent, units)
+            conn.execute('INSERT OR REPLACE INTO youtube_quota (day, spent) VALUES (?, ?)', (day, spent + units))
+            conn.execute('DELETE FROM youtube_quota WHERE day < ?', (day,))
+    
+    def _check(self, spent, units):
+        if spent + units > self.daily_limit:
+            raise QuotaExceeded(f"YouTube quota budget reached ({spent}/{self.daily_limit} units today)")
+    
+    def spent_today(self):
+        """Units spent since the last daily reset"""
+        if self.state is None:
+            with self._lock:
+                return self._spent if self._day == self._today() else 0
+        rows = self.state.query('SELECT spent FROM youtube_quota WHERE day = ?', (self._today().isoformat(),))
+        return rows[0]['spent'] if rows else 0
+    
+    def usage(self, units):
+        """Quota summary included in collector output"""
+        return {
+            'units': units,
+            'spent_today': self.spent_today(),
+            'daily_limit': self.daily_limit
+        }
+
+
+# Shared by every YouTubeCollector in the process (and across processes once shared)
+quota = QuotaLedger()
+
 
 class YouTubeCollector:
     """Collects YouTube statistics (tries API first, falls back to scraping)"""
     
-    def __init__(self, api_key, channel_id):
+    def __init__(self, api_key, channel_id, store=None):
         self.api_key = api_key
         self.channel_id = channel_id  # Can be channel ID or @username
+        self.store = store  # Optional MetricsStore for per-video stats
+        self._units_spent = 0
     
     def collect(self, start_date, end_date):
         """
@@ -33,88 +142,246 @@ class YouTubeCollector:
             return self._empty_stats()
         
         # Try API first if we have a key
+        api_failed = False
         if self.api_key and self.api_key != 'your_youtube_api_key_here':
+            if self.store and not self.store.needs_sync('youtube', self.channel_id, start_date):
+                with tracing.span('youtube.from_store'):
+                    return self._stats_from_store(start_date, end_date)
             try:
-                return self._collect_via_api(start_date, end_date)
+                if self.store:
+                    sync_start = self.store.sync_start(start_date)
+                    self._collect_via_api(sync_start, end_date)
+                    self.store.mark_synced('youtube', self.channel_id, sync_start)
+                    return self._stats_from_store(start_date, end_date)
+                # Same whole days as a window computed from the store
+                return self._collect_via_api(*day_bounds(start_date, end_date))
             except Exception as e:
                 logger.warning(f"YouTube API failed: {e}, falling back to scraping")
+                metrics.FALLBACKS.inc(platform='youtube', fallback='scraping')
+                api_failed = True
         
         # Fallback to scraping
-        return self._collect_via_scraping()
+        with tracing.span('youtube.scraping'):
+            stats = self._collect_via_scraping()
+        # Scraped numbers are partial: marked so the dashboard prefers the last API result
+        return dict(stats, api_failed=True) if api_failed else stats
     
     def _collect_via_api(self, start_date, end_date):
-        """Collect stats using YouTube API"""
-        from googleapiclient.discovery import build
+        """
+        Collect stats using YouTube API
         
-        youtube = build('youtube', 'v3', developerKey=self.api_key)
+        The cheapest path is used: the channel's uploads playlist (1 unit
+        per 50 videos) is paged backwards until it passes start_date. The
+        search endpoint (100 units per page) is only used if the playlist
+        can't be resolved, and a QuotaExceeded error sends collect() to
+        the scraping fallback once the daily budget would be exceeded.
+        """
+        with tracing.span('youtube.service'):
+            youtube = get_service('youtube', 'v3', developer_key=self.api_key)
+        spent_before = self._units_spent
         
         # Get channel statistics (subscribers, total videos, total views)
-        channel_stats = self._get_channel_stats(youtube)
+        with tracing.span('youtube.channel_stats'):
+            channel_stats = self._get_channel_stats(youtube)
         
         # Get channel videos for the date range
-        request = youtube.search().list(
-            part='snippet',
-            channelId=self.channel_id,
-            publishedAfter=start_date.isoformat() + 'Z',
-            publishedBefore=end_date.isoformat() + 'Z',
-            type='video',
-            maxResults=50
-        )
-        
-        response = request.execute()
-        videos = response.get('items', [])
+        playlist_id = _uploads_playlists.get(self.channel_id)
+        if playlist_id:
+            source = 'playlist'
+            with tracing.span('youtube.list_uploads') as span:
+                videos = self._list_uploads(youtube, playlist_id, start_date, end_date)
+                span['videos'] = len(videos)
+        else:
+            source = 'search'
+            metrics.FALLBACKS.inc(platform='youtube', fallback='search')
+            with tracing.span('youtube.search') as span:
+                videos = self._search_videos(youtube, start_date, end_date)
+                span['videos'] = len(videos)
+        with tracing.span('youtube.video_stats', videos=len(videos)):
+            video_stats = self._get_video_stats(youtube, videos)
         
-        total_views = 0
-        total_likes = 0
-        total_comments = 0
+        if self.store:
+            with tracing.span('youtube.store'):
+                self.store.record_youtube_videos(self.channel_id, video_stats)
+                self.store.record_profile('youtube', self.channel_id, channel_stats)
         
-        for video in videos:
-            video_id = video['id']['videoId']
+        stats = self.summarize(video_stats, channel_stats, videos_count=len(videos))
+        stats['source'] = f'api-{source}'
+        stats['quota'] = quota.usage(self._units_spent - spent_before)
+        return stats
+    
+    def _spend(self, units):
+        """Charge quota units for the next API call, or raise QuotaExceeded"""
+        quota.spend(units)
+        self._units_spent += units
+    
+    def _list_uploads(self, youtube, playlist_id, start_date, end_date):
+        """Page the uploads playlist (newest first) until it passes start_date"""
+        videos = []
+        page_token = None
+        for _ in range(MAX_PLAYLIST_PAGES):
+            self._spend(QUOTA_COSTS['playlistItems.list'])
+            response = youtube.playlistItems().list(
+                part='snippet,contentDetails',
+                playlistId=playlist_id,
+                maxResults=50,
+                pageToken=page_token
+            ).execute()
+            
+            items = response.get('items', [])
+            oldest = None
+            for item in items:
+                published_at = item['contentDetails'].get('videoPublishedAt') or item['snippet']['publishedAt']
+                published = datetime.strptime(published_at, '%Y-%m-%dT%H:%M:%SZ')
+                oldest = published if oldest is None else min(oldest, published)
+                if start_date <= published <= end_date:
+                    videos.append({
+                        'id': {'videoId': item['contentDetails']['videoId']},
+                        'snippet': {'publishedAt': published_at, 'title': item['snippet'].get('title', '')}
+                    })
             
-            # Get video statistics
-            stats_request = youtube.videos().list(
+            page_token = response.get('nextPageToken')
+            if not page_token or oldest is None or oldest < start_date:
+                break
+        return videos
+    
+    def _search_videos(self, youtube, start_date, end_date):
+        """Search the channel's videos in the date range, following nextPageToken"""
+        videos = []
+        page_token = None
+        for _ in range(MAX_SEARCH_PAGES):
+            self._spend(QUOTA_COSTS['search.list'])
+            response = youtube.search().list(
+                part='snippet',
+                channelId=self.channel_id,
+                publishedAfter=start_date.isoformat() + 'Z',
+                publishedBefore=end_date.isoformat() + 'Z',
+                type='video',
+                maxResults=50,
+                pageToken=page_token
+            ).execute()
+            
+            videos.extend(response.get('items', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+        return videos
+    
+    def _get_video_stats(self, youtube, videos):
+        """Get statistics for listed videos, 50 video ids per videos.list call"""
+        snippets = {video['id']['videoId']: video['snippet'] for video in videos}
+        video_ids = list(snippets)
+        
+        video_stats = []
+        for i in range(0, len(video_ids), VIDEOS_BATCH_SIZE):
+            self._spend(QUOTA_COSTS['videos.list'])
+            response = youtube.videos().list(
                 part='statistics',
-                id=video_id
-            )
-            stats_response = stats_request.execute()
+                id=','.join(video_ids[i:i + VIDEOS_BATCH_SIZE])
+            ).execute()
             
-            if stats_response['items']:
-                stats = stats_response['items'][0]['statistics']
-                total_views += int(stats.get('viewCount', 0))
-                total_likes += int(stats.get('likeCount', 0))
-                total_comments += int(stats.get('commentCount', 0))
+            for item in response.get('items', []):
+                stats = item['statistics']
+                snippet = snippets[item['id']]
+                video_stats.append({
+                    'video_id': item['id'],
+                    'published_at': datetime.strptime(snippet['publishedAt'], '%Y-%m-%dT%H:%M:%SZ'),
+                    'title': snippet.get('title', ''),
+                    'views': int(stats.get('viewCount', 0)),
+                    'likes': int(stats.get('likeCount', 0)),
+                    'comments': int(stats.get('commentCount', 0))
+                })
+        return video_stats
+    
+    def _stats_from_store(self, start_date, end_date):
+        """Build stats from the daily rollup of stored video statistics"""
+        totals = self.store.rollup('youtube', self.channel_id).between(start_date, end_date)
+        channel_stats = self.store.get_profile('youtube', self.channel_id)
+        videos_count = totals['videos']
         
         return {
-            'videos_count': len(videos),
+            'videos_count': videos_count,
+            'views': totals['views'],
+            'likes': totals['likes'],
+            'comments': totals['comments'],
+            'avg_views': totals['views'] / videos_count if videos_count else 0,
+            'subscribers': channel_stats.get('subscribers', 0),
+            'total_videos': channel_stats.get('total_videos', 0),
+            'total_channel_views': channel_stats.get('total_views', 0),
+            'source': 'store',
+            'quota': quota.usage(0),
+            'synced_at': self.store.synced_at('youtube', self.channel_id)
+        }
+    
+    @staticmethod
+    def summarize(videos, channel_stats, videos_count=None):
+        """
+        Aggregate per-video statistics
+        
+        Args:
+            videos: list of dicts with views, likes, comments
+            channel_stats: dict with subscribers, total_videos, total_views
+            videos_count: number of videos published (defaults to len(videos))
+            
+        Returns:
+            dict with stats: videos_count, views, likes, comments
+        """
+        if videos_count is None:
+            videos_count = len(videos)
+        total_views = sum(v['views'] for v in videos)
+        total_likes = sum(v['likes'] for v in videos)
+        total_comments = sum(v['comments'] for v in videos)
+        
+        return {
+            'videos_count': videos_count,
             'views': total_views,
             'likes': total_likes,
             'comments': total_comments,
-            'avg_views': total_views / len(videos) if videos else 0,
+            'avg_views': total_views / videos_count if videos_count else 0,
             'subscribers': channel_stats.get('subscribers', 0),
             'total_videos': channel_stats.get('total_videos', 0),
             'total_channel_views': channel_stats.get('total_views', 0)
         }
     
     def _get_channel_stats(self, youtube):
-        """Get overall channel statistics"""
-        try:
-            request = youtube.channels().list(
-                part='statistics',
-                id=self.channel_id
-            )
-            response = request.execute()
-            
-            if response.get('items'):
-                stats = response['items'][0]['statistics']
-                return {
-                    'subscribers': int(stats.get('subscriberCount', 0)),
-                    'total_videos': int(stats.get('videoCount', 0)),
-                    'total_views': int(stats.get('viewCount', 0))
-                }
-        except Exception as e:
-            logger.warning(f"Could not fetch channel stats: {e}")
+        """
+        Get overall channel statistics
+        
+        The first call per channel also asks for contentDetails to resolve
+        (and cache) the uploads playlist; @handles are looked up via forHandle.
+        
+        Raises:
+            RuntimeError: if the channel is not found (API errors propagate too),
+                so a failed call never stores zero counts as the channel's profile
+        """
+        resolved = self.channel_id in _uploads_playlists
+        if self.channel_id.startswith('@'):
+            channel_filter = {'forHandle': self.channel_id}
+        else:
+            channel_filter = {'id': self.channel_id}
+        
+        self._spend(QUOTA_COSTS['channels.list'])
+        request = youtube.channels().list(
+            part='statistics' if resolved else 'statistics,contentDetails',
+            **channel_filter
+        )
+        response = request.execute()
         
-        return {'subscribers': 0, 'total_videos': 0, 'total_views': 0}
+        if not response.get('items'):
+            raise RuntimeError(f"YouTube channel {self.channel_id} not found")
+        
+        channel = response['items'][0]
+        if not resolved:
+            uploads = channel.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
+            if uploads:
+                _uploads_playlists[self.channel_id] = uploads
+        
+        stats = channel['statistics']
+        return {
+            'subscribers': int(stats.get('subscriberCount', 0)),
+            'total_videos': int(stats.get('videoCount', 0)),
+            'total_views': int(stats.get('viewCount', 0))
+        }
     
     def _collect_via_scraping(self):
         """Collect basic stats by scraping YouTube channel page (no API needed)"""
@@ -130,7 +397,7 @@ class YouTubeCollector:
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             }
             
-            response = requests.get(url, headers=headers, timeout=15)
+            response = transport.get(url, headers=headers, timeout=15)
             
             if response.status_code != 200:
                 logger.warning(f"Failed to fetch YouTube page: {response.status_code}")
@@ -164,7 +431,8 @@ class YouTubeCollector:
                 'avg_views': 0,
                 'subscribers': subscribers,
                 'total_videos': 0,  # Requires API
-                'total_channel_views': 0  # Requires API
+                'total_channel_views': 0,  # Requires API
+                'source': 'scraping'
             }
             
         except Exception as e:
@@ -0,0 +1,28 @@
+"""
+Dashboard infrastructure: concurrent collection, coalescing, caching and scheduling
+"""
+
+from .engine import CollectionEngine, CollectionTask
+from .cache import StatsCache, FRESH, STALE, MISS, data_time
+from .shared_cache import SharedStatsCache
+from .snapshots import SnapshotStore
+from .scheduler import RefreshScheduler
+from .store import MetricsStore
+from .singleflight import SingleFlight
+from .breaker import CircuitBreakers
+
+__all__ = [
+    'CollectionEngine',
+    'CollectionTask',
+    'StatsCache',
+    'SharedStatsCache',
+    'SnapshotStore',
+    'FRESH',
+    'STALE',
+    'MISS',
+    'data_time',
+    'RefreshScheduler',
+    'MetricsStore',
+    'SingleFlight',
+    'CircuitBreakers'
+]
@@ -0,0 +1,154 @@
+"""Circuit breakers per platform (and Reddit account), with last-known-good results"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from collectors import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_FAILURES = 3
+DEFAULT_COOLDOWN = 60.0
+MAX_RESULTS = 64
+
+# State name prefix of last good results kept in a shared cache
+RESULT_PREFIX = 'last_good:'
+
+# Result flags that mean the collector did not get real data
+FAILURE_FLAGS = ('error', 'timed_out', 'rate_limited', 'api_failed')
+
+
+def is_failure(result):
+    """True for a collector result that counts against its breaker"""
+    return not isinstance(result, dict) or any(result.get(flag) for flag in FAILURE_FLAGS)
+
+
+class CircuitBreakers:
+    """
+    One circuit breaker per collection task key
+    
+    A breaker opens after `failures` failed collections in a row; while it
+    is open, calls are skipped without touching the network. After
+    `cooldown` seconds a single call is let through as a probe (half-open):
+    success closes the breaker, failure opens it for another cooldown.
+    
+    The last good result of every flight key (task key and window) is kept,
+    so a failed or skipped collection can be answered with real, if older,
+    numbers instead of zeros. They are kept in memory, or in the state of a
+    SharedStatsCache, where every worker sees them and they survive a
+    restart.
+    """
+    
+    def __init__(self, failures=None, cooldown=None, results=None):
+        """
+        Args:
+            failures: consecutive failures that open a breaker (BREAKER_FAILURES)
+            cooldown: seconds before an open breaker lets a probe through (BREAKER_COOLDOWN)
+            results: optional SharedStatsCache to keep the last good results in
+        """
+        self.failures = failures or int(os.getenv('BREAKER_FAILURES', DEFAULT_FAILURES))
+        self.cooldown = cooldown or float(os.getenv('BREAKER_COOLDOWN', DEFAULT_COOLDOWN))
+        self.results = results
+        # key -> {'state', 'failures', 'opened_at'}; opened_at is also when the last probe started
+        self._breakers = {}
+        # result key -> (result, collected_at), least recently stored first
+        self._last_good = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def allow(self, key):
+        """True if a collection for key may run now (half-open lets one probe through)"""
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None or breaker['state'] == CLOSED:
+                return True
+            # Open, or half-open with a probe that has not reported back within a cooldown
+            if time.time() - breaker['opened_at'] < self.cooldown:
+                return False
+            breaker['state'] = HALF_OPEN
+            breaker['opened_at'] = time.time()
+        logger.info(f"Circuit for {key} half-open, sending a probe")
+        return True
+    
+    def record(self, key, failed):
+        """Count the outcome of a collection that was allowed to run"""
+        with self._lock:
+            breaker = self._breakers.setdefault(key, {'state': CLOSED, 'failures': 0, 'opened_at': 0})
+            previous = breaker['state']
+            if not failed:
+                breaker.update(state=CLOSED, failures=0)
+            else:
+                breaker['failures'] += 1
+                if previous == HALF_OPEN or breaker['failures'] >= self.failures:
+                    breaker.update(state=OPEN, opened_at=time.time())
+            state, failures = breaker['state'], breaker['failures']
+        
+        if state == previous:
+            return
+        metrics.CIRCUIT_OPEN.set(0 if state == CLOSED else 1, breaker=key)
+        if state == OPEN:
+            logger.warning(f"Circuit for {key} open after {failures} failed collections, retrying in {self.cooldown:.0f}s")
+        else:
+            logger.info(f"Circuit for {key} closed")
+    
+    def remember(self, result_key, result):
+        """Keep a good result as the fallback for result_key"""
+        if self.results is not None:
+            try:
+                self.results.set_state(self._state_name(result_key), [result, time.time()])
+                self.results.prune_state(RESULT_PREFIX, MAX_RESULTS)
+            except Exception as e:
+                logger.warning(f"Could not keep last good result for {result_key}: {e}")
+            return
+        with self._lock:
+            self._last_good[result_key] = (copy.deepcopy(result), time.time())
+            self._last_good.move_to_end(result_key)
+            while len(self._last_good) > MAX_RESULTS:
+                self._last_good.popitem(last=False)
+    
+    @staticmethod
+    def _state_name(result_key):
+        return RESULT_PREFIX + json.dumps(result_key)
+    
+    def fallback(self, result_key, reason):
+        """
+        The last good result for result_key, flagged as such
+        
+        Returns:
+            copy of the result with last_good=True, last_good_at (unix time)
+            and unavailable=reason, or None if there never was a good result
+        """
+        if self.results is not None:
+            try:
+                entry = self.results.get_state(self._state_name(result_key))
+            except Exception as e:
+                logger.warning(f"Could not read last good result for {result_key}: {e}")
+                entry = None
+        else:
+            with self._lock:
+                entry = self._last_good.get(result_key)
+        if entry is None:
+            return None
+        result, collected_at = entry
+        return dict(copy.deepcopy(result), last_good=True, last_good_at=collected_at, unavailable=reason)
+    
+    def snapshot(self):
+        """State of every breaker that is not closed, for /health"""
+        now = time.time()
+        with self._lock:
+            return {
+                key: {
+                    'state': breaker['state'],
+                    'failures': breaker['failures'],
+                    'retry_in': max(round(breaker['opened_at'] + self.cooldown - now, 1), 0)
+                }
+                for key, breaker in self._breakers.items() if breaker['state'] != CLOSED
+            }
@@ -0,0 +1,197 @@
+"""In-process TTL + LRU cache with stale-while-revalidate"""
+
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FRESH = 'fresh'
+STALE = 'stale'
+MISS = 'miss'
+
+
+def data_time(value, default=None):
+    """
+    When a collected value's data was fetched from the APIs
+    
+    Results computed from the metrics store carry its last sync time as
+    synced_at (Reddit per account); the oldest one counts. Values without
+    one were just fetched: default (now).
+    """
+    synced = []
+    if isinstance(value, dict):
+        synced = [
+            stats['synced_at'] for stats in [value, *value.get('accounts', [])]
+            if isinstance(stats, dict) and stats.get('synced_at')
+        ]
+    if synced:
+        return min(synced)
+    return default or time.time()
+
+
+class StatsCache:
+    """
+    Caches collected stats per key
+    
+    Entries younger than ttl are fresh. Entries older than ttl but younger
+    than ttl + stale_ttl are served as stale while a background thread
+    reloads them. Anything older is a miss. The least recently used entry
+    is evicted once max_entries is reached.
+    
+    With a SnapshotStore, every stored value is also written to disk, and
+    warm_start() seeds a new process with the last known values.
+    """
+    
+    def __init__(self, ttl=None, stale_ttl=None, max_entries=None, snapshots=None):
+        self.ttl = ttl if ttl is not None else float(os.getenv('STATS_CACHE_TTL', 300))
+        self.stale_ttl = stale_ttl if stale_ttl is not None else float(os.getenv('STATS_CACHE_STALE_TTL', 3600))
+        self.max_entries = max_entries or int(os.getenv('STATS_CACHE_MAX_ENTRIES', 64))
+        self.snapshots = snapshots
+        self._entries = OrderedDict()
+        self._state = {}
+        self._revalidating = set()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """
+        Look up a key
+        
+        Returns:
+            tuple (value, state, stored_at) where state is FRESH, STALE or MISS
+            and stored_at is a unix timestamp (None on a miss)
+        """
+        return self.lookup(key)[:3]
+    
+    def lookup(self, key):
+        """
+        get() plus the entry's own ttl (entries can be stored with different ones)
+        
+        Returns:
+            tuple (value, state, stored_at, ttl); ttl is None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, MISS, None, None
+            
+            value, stored_at, ttl = entry
+            age = time.time() - stored_at
+            if age > ttl + self.stale_ttl:
+                del self._entries[key]
+                return None, MISS, None, None
+            
+            self._entries.move_to_end(key)
+            return value, FRESH if age <= ttl else STALE, stored_at, ttl
+    
+    def put(self, key, value, stored_at=None, ttl=None):
+        """
+        Store a value (and snapshot it), evicting entries if full
+        
+        Args:
+            key: cache key
+            value: value to store
+            stored_at: unix timestamp the value was collected at (default
+                       its data_time)
+            ttl: freshness for this entry in seconds (default self.ttl)
+        """
+        stored_at = stored_at or data_time(value)
+        ttl = ttl or self.ttl
+        self._put(key, value, stored_at, ttl)
+        if self.snapshots:
+            self.snapshots.save(key, value, stored_at, ttl)
+    
+    def _put(self, key, value, stored_at, ttl):
+        """Store an entry, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (value, stored_at, ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def warm_start(self):
+        """Serve the values of an earlier process right away (see load_snapshots)"""
+        return self.load_snapshots()
+    
+    def load_snapshots(self):
+        """
+        Seed the cache with the values snapshotted by an earlier process
+        
+        Snapshots keep their collection time and ttl, so they show their
+        real age: one older than its ttl is served as stale (which starts a
+        background refresh), and one older than ttl + stale_ttl is not
+        loaded at all. Entries that are already newer in the cache are left
+        alone.
+        
+        Returns:
+            number of entries loaded
+        """
+        if not self.snapshots:
+            return 0
+        now = time.time()
+        loaded = 0
+        for key, value, stored_at, ttl in self.snapshots.load():
+            if now - stored_at > ttl + self.stale_ttl:
+                continue
+            _, state, current = self.get(key)
+            if state != MISS and current >= stored_at:
+                continue
+            self._put(key, value, stored_at, ttl)
+            loaded += 1
+        if loaded:
+            logger.info(f"Loaded {loaded} stats snapshots")
+        return loaded
+    
+    def revalidate(self, key, loader):
+        """
+        Reload a key in a background thread
+        
+        Args:
+            key: cache key
+            loader: callable returning the new value, or None to keep the old one
+        
+        Returns:
+            True if a reload was started, False if one is already running
+        """
+        with self._lock:
+            if key in self._revalidating:
+                return False
+            self._revalidating.add(key)
+        
+        thread = threading.Thread(
+            target=self._reload,
+            args=(key, loader),
+            name=f'revalidate-{key}',
+            daemon=True
+        )
+        thread.start()
+        return True
+    
+    def _reload(self, key, loader):
+        """Run a loader and store its result"""
+        try:
+            value = loader()
+            if value is not None:
+                self.put(key, value)
+        except Exception as e:
+            logger.error(f"Background refresh of {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+    
+    def clear(self):
+        """Drop all entries (state is kept)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_state(self, name, default=None):
+        """A named value kept alongside the cache (default if never set)"""
+        with self._lock:
+            return self._state.get(name, default)
+    
+    def set_state(self, name, value):
+        """Replace a named value"""
+        with self._lock:
+            self._state[name] = value
@@ -0,0 +1,301 @@
+"""Concurrent collection engine with per-platform deadlines"""
+
+import asyncio
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from collectors import metrics, tracing
+
+from .breaker import CircuitBreakers, is_failure
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_DEADLINE = 30.0
+
+
+@dataclass
+class CollectionTask:
+    """A single unit of collection work (one platform or one account)"""
+    key: str
+    platform: str
+    func: Callable[[], Dict[str, Any]]
+    placeholder: Dict[str, Any] = field(default_factory=dict)
+    # Coroutine version of func, used by run_iter_async (func runs in a thread otherwise)
+    async_func: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None
+    # Concurrent tasks with the same flight_key share one collection (e.g. (key, window))
+    flight_key: Optional[Hashable] = None
+
+
+class Outcome:
+    """
+    Reported once per task run: by the run when it finishes, or by the
+    deadline when it passes first
+    
+    A thread that misses its deadline can't be stopped. Its failure is
+    counted when the deadline passes, so when it finishes later it must not
+    be counted again.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reported = False
+    
+    def claim(self):
+        """True for the first caller only"""
+        with self._lock:
+            if self._reported:
+                return False
+            self._reported = True
+            return True
+
+
+class CollectionEngine:
+    """Runs collection tasks in a bounded worker pool with per-platform deadlines"""
+    
+    def __init__(self, max_workers=None, deadlines=None, default_deadline=None, flights=None, breakers=None):
+        self.max_workers = max_workers or int(os.getenv('COLLECT_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+        self.default_deadline = default_deadline or float(os.getenv('COLLECT_DEADLINE', DEFAULT_DEADLINE))
+        self.deadlines = deadlines or {}
+        # Shared across requests so the total number of collector threads stays bounded
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='collector'
+        )
+        # Coalesces identical collections across requests (and worker processes)
+        self.flights = flights or SingleFlight()
+        # Skip platforms (or accounts) that keep failing; failures are answered with the last good result
+        self.breakers = breakers or CircuitBreakers()
+    
+    def deadline_for(self, platform):
+        """Deadline in seconds for a platform (COLLECT_DEADLINE_<PLATFORM> overrides the default)"""
+        if platform in self.deadlines:
+            return self.deadlines[platform]
+        
+        value = os.getenv(f'COLLECT_DEADLINE_{platform.upper()}')
+        if value and value.strip():
+            return float(value)
+        return self.default_deadline
+    
+    def run(self, tasks: List[CollectionTask]) -> Dict[str, Dict[str, Any]]:
+        """
+        Run all tasks concurrently and wait for each up to its platform deadline
+        
+        Args:
+            tasks: list of CollectionTask
+        
+        Returns:
+            dict mapping task key to the collector result, or to the task's
+            placeholder marked with timed_out/error if it missed its deadline
+        """
+        return {task.key: result for task, result in self.run_iter(tasks)}
+    
+    def run_iter(self, tasks: List[CollectionTask]) -> Iterator[Tuple[CollectionTask, Dict[str, Any]]]:
+        """
+        Run all tasks concurrently, yielding (task, result) as each one finishes
+        
+        Results come in completion order, so a caller can use the fastest
+        platforms while the slow ones are still running. Tasks that miss
+        their deadline are yielded as timed-out placeholders when it passes.
+        """
+        started = time.monotonic()
+        # Per task, not per key: tasks for several windows share keys
+        outcomes = {id(task): Outcome() for task in tasks}
+        # Tasks run in a copy of the caller's context (e.g. its request priority)
+        pending = {
+            self._executor.submit(contextvars.copy_context().run, self._instrumented(task, outcomes[id(task)])): task
+            for task in tasks
+        }
+        
+        while pending:
+            expires = {future: started + self.deadline_for(task.platform) for future, task in pending.items()}
+            done, _ = wait(pending, timeout=max(0.0, min(expires.values()) - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                task = pending.pop(future)
+                try:
+                    yield task, future.result()
+                except Exception as e:
+                    logger.error(f"{task.key} collection failed: {e}")
+                    yield task, self._failed(task, str(e))
+            
+            now = time.monotonic()
+            for future in [f for f in pending if expires[f] <= now]:
+                task = pending.pop(future)
+                deadline = self.deadline_for(task.platform)
+                logger.warning(f"{task.key} collection missed its {deadline:.0f}s deadline")
+                metrics.TIMEOUTS.inc(platform=task.platform)
+                yield task, self._timed_out(task, deadline, outcomes[id(task)])
+    
+    async def run_iter_async(self, tasks: List[CollectionTask]) -> AsyncIterator[Tuple[CollectionTask, Dict[str, Any]]]:
+        """
+        run_iter() on the running event loop
+        
+        Tasks with an async_func run as coroutines on the loop; the others
+        run func in the loop's default thread pool. A coroutine that misses
+        its deadline is cancelled (a thread is left to finish in the
+        background, as with run_iter). Last good results are read and written
+        in worker threads, since they may live in the shared SQLite cache.
+        """
+        started = time.monotonic()
+        outcomes = {id(task): Outcome() for task in tasks}
+        pending = {}
+        for task in tasks:
+            if task.async_func is not None:
+                future = asyncio.ensure_future(self._instrumented_async(task, outcomes[id(task)]))
+            else:
+                future = asyncio.ensure_future(asyncio.to_thread(self._instrumented(task, outcomes[id(task)])))
+            pending[future] = task
+        
+        try:
+            while pending:
+                expires = {future: started + self.deadline_for(task.platform) for future, task in pending.items()}
+                done, _ = await asyncio.wait(pending, timeout=max(0.0, min(expires.values()) - time.monotonic()),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    task = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"{task.key} collection failed: {e}")
+                        result = await asyncio.to_thread(self._failed, task, str(e))
+                    yield task, result
+                
+                now = time.monotonic()
+                for future in [f for f in pending if expires[f] <= now]:
+                    task = pending.pop(future)
+                    future.cancel()
+                    deadline = self.deadline_for(task.platform)
+                    logger.warning(f"{task.key} collection missed its {deadline:.0f}s deadline")
+                    metrics.TIMEOUTS.inc(platform=task.platform)
+                    yield task, await asyncio.to_thread(self._timed_out, task, deadline, outcomes[id(task)])
+        finally:
+            # The consumer stopped early (e.g. the client disconnected)
+            for future in pending:
+                future.cancel()
+    
+    async def run_async(self, tasks: List[CollectionTask]) -> Dict[str, Dict[str, Any]]:
+        """run() on the running event loop (see run_iter_async)"""
+        return {task.key: result async for task, result in self.run_iter_async(tasks)}
+    
+    async def _instrumented_async(self, task, outcome):
+        """
+        Run a task's async_func, recording its duration and outcome
+        
+        Nothing is recorded when it is cancelled: at its deadline, which
+        counted it already, or because the consumer went away.
+        """
+        if not self.breakers.allow(task.key):
+            return await asyncio.to_thread(self._skipped, task)
+        started = time.monotonic()
+        # Until this caller leads the flight, its result (or error) is the leader's
+        shared = task.flight_key is not None
+        
+        async def lead():
+            nonlocal shared
+            shared = False
+            return await task.async_func()
+        
+        try:
+            with tracing.span(task.key, 'task', platform=task.platform):
+                if task.flight_key is None:
+                    result = await task.async_func()
+                else:
+                    result, shared = await self.flights.run_async(task.flight_key, lead)
+                    if shared:
+                        metrics.COALESCED.inc(platform=task.platform)
+        except Exception as e:
+            await asyncio.to_thread(self._finish, task, outcome, started, {'error': str(e)}, shared)
+            raise
+        await asyncio.to_thread(self._finish, task, outcome, started, result, shared)
+        return await asyncio.to_thread(self._checked, task, result)
+    
+    def _instrumented(self, task, outcome):
+        """Wrap a task's func to record its duration and outcome when it finishes (unless its deadline did)"""
+        def run():
+            if not self.breakers.allow(task.key):
+                return self._skipped(task)
+            started = time.monotonic()
+            result = None
+            # Until this caller leads the flight, its result (or error) is the leader's
+            shared = task.flight_key is not None
+            
+            def lead():
+                nonlocal shared
+                shared = False
+                return task.func()
+            
+            try:
+                with tracing.span(task.key, 'task', platform=task.platform):
+                    if task.flight_key is None:
+                        result = task.func()
+                    else:
+                        result, shared = self.flights.run(task.flight_key, lead)
+                        if shared:
+                            metrics.COALESCED.inc(platform=task.platform)
+            except Exception as e:
+                result = {'error': str(e)}
+                raise
+            finally:
+                self._finish(task, outcome, started, result, shared)
+            return self._checked(task, result)
+        return run
+    
+    def _finish(self, task, outcome, started, result, shared):
+        """Record a finished run, once: a run that outlived its deadline was counted as a timeout"""
+        counted = not outcome.claim()
+        if not counted:
+            metrics.record_collection(task.platform, time.monotonic() - started, result)
+        # Callers that shared another caller's collection (or its error) don't count its outcome again
+        if not shared:
+            self._record(task, result, counted)
+    
+    @staticmethod
+    def _result_key(task):
+        """Key of a task's last good result: its flight key (which includes the window), else its key"""
+        return task.key if task.flight_key is None else task.flight_key
+    
+    def _record(self, task, result, counted=False):
+        """
+        Count a finished collection against the task's breaker (unless it was
+        already counted at its deadline), keeping the result if it was good
+        """
+        failed = is_failure(result)
+        if not counted:
+            self.breakers.record(task.key, failed)
+        if not failed:
+            self.breakers.remember(self._result_key(task), result)
+    
+    def _checked(self, task, result):
+        """A failed result replaced by the last good one, if there is one"""
+        if not is_failure(result):
+            return result
+        return self.breakers.fallback(self._result_key(task), result.get('error') or 'Collection failed') or result
+    
+    def _skipped(self, task):
+        """Result for a task whose breaker is open: the last good one, or the placeholder"""
+        metrics.CIRCUIT_REJECTIONS.inc(platform=task.platform)
+        reason = 'Unavailable after repeated failures'
+        return self.breakers.fallback(self._result_key(task), reason) or dict(task.placeholder, error=reason)
+    
+    def _failed(self, task, error):
+        """Result for a task whose func raised: the last good one, or the placeholder"""
+        return self.breakers.fallback(self._result_key(task), error) or dict(task.placeholder, error=error)
+    
+    def _timed_out(self, task, deadline, outcome):
+        """Result for a task that missed its deadline: the last good one, or a timed-out placeholder"""
+        error = f'Timed out after {deadline:.0f}s'
+        if outcome.claim():
+            self.breakers.record(task.key, True)
+        return self.breakers.fallback(self._result_key(task), error) or dict(
+            task.placeholder,
+            timed_out=True,
+            error=error
+        )
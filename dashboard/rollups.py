@@ -0,0 +1,85 @@
+"""Per-day metric buckets with prefix sums for O(1) window totals"""
+
+from datetime import date
+
+from collectors.utils import window_days
+
+
+class DailyRollup:
+    """
+    Daily buckets of additive metrics for one platform account
+    
+    Alongside each metric's per-day values a cumulative (prefix-sum) array
+    is kept, so the total for any range of days is the difference of two
+    entries regardless of how long the range is.
+    """
+    
+    def __init__(self, first_day, last_day, metrics):
+        """
+        Args:
+            first_day: date of the first bucket
+            last_day: date of the last bucket (inclusive)
+            metrics: list of metric names
+        """
+        self.first_day = first_day
+        self.last_day = max(first_day, last_day)
+        self.metrics = list(metrics)
+        days = (self.last_day - self.first_day).days + 1
+        self.buckets = {metric: [0] * days for metric in self.metrics}
+        self.prefix = {metric: [0] * (days + 1) for metric in self.metrics}
+    
+    @classmethod
+    def from_rows(cls, rows, metrics, last_day=None):
+        """
+        Build a rollup from (day, values) rows
+        
+        Args:
+            rows: iterable of (date or 'YYYY-MM-DD', {metric: value}) pairs
+            metrics: list of metric names
+            last_day: last bucket (defaults to today)
+        """
+        parsed = [(date.fromisoformat(day) if isinstance(day, str) else day, values) for day, values in rows]
+        last_day = last_day or date.today()
+        first_day = min((day for day, _ in parsed), default=last_day)
+        
+        rollup = cls(first_day, max([last_day] + [day for day, _ in parsed]), metrics)
+        for day, values in parsed:
+            rollup.add(day, values)
+        rollup.finalize()
+        return rollup
+    
+    def add(self, day, values):
+        """Add values to a day's bucket (call finalize() afterwards)"""
+        index = (day - self.first_day).days
+        for metric, value in values.items():
+            if metric in self.buckets:
+                self.buckets[metric][index] += value or 0
+    
+    def finalize(self):
+        """Recompute the prefix sums from the buckets"""
+        for metric, values in self.buckets.items():
+            running = 0
+            prefix = self.prefix[metric]
+            for i, value in enumerate(values):
+                running += value
+                prefix[i + 1] = running
+    
+    def window(self, start_day, end_day):
+        """
+        Totals of every metric for start_day..end_day (inclusive)
+        
+        Days outside the rollup contribute nothing.
+        """
+        lo = min(max((start_day - self.first_day).days, 0), len(self.prefix[self.metrics[0]]) - 1)
+        hi = min(max((end_day - self.first_day).days + 1, 0), len(self.prefix[self.metrics[0]]) - 1)
+        if hi <= lo:
+            return {metric: 0 for metric in self.metrics}
+        return {metric: self.prefix[metric][hi] - self.prefix[metric][lo] for metric in self.metrics}
+    
+    def between(self, start_date, end_date):
+        """
+        Totals for a datetime range (end_date exclusive, as returned by
+        get_date_range) over its window_days(): an N-day range sums exactly
+        N buckets
+        """
+        return self.window(*window_days(start_date, end_date))
@@ -0,0 +1,165 @@
+"""Background scheduler that keeps the stats cache warm"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+
+from .cache import data_time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lease file, every process runs its scheduler
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# How often each platform's data is worth re-fetching, in seconds.
+# Reddit scores move by the minute; GSC data lags by days.
+DEFAULT_INTERVALS = {
+    'reddit': 120,
+    'github': 600,
+    'youtube': 1800,
+    'gsc': 6 * 3600
+}
+
+DEFAULT_WINDOWS = [7, 14, 30]
+
+# How often a standby worker checks whether the scheduler lease is free
+LEASE_RETRY = 30
+
+
+def refresh_interval(platform, intervals=None):
+    """Refresh interval in seconds for a platform (REFRESH_INTERVAL_<PLATFORM> overrides)"""
+    value = os.getenv(f'REFRESH_INTERVAL_{platform.upper()}')
+    if value and value.strip():
+        return float(value)
+    intervals = intervals or DEFAULT_INTERVALS
+    return intervals.get(platform, DEFAULT_INTERVALS['reddit'])
+
+
+class RefreshScheduler:
+    """
+    Refreshes each platform on its own interval and writes into the cache
+    
+    Every job re-collects one platform for each warmed window (days) and
+    stores the result with a TTL equal to the platform's interval, so
+    dashboard requests find fresh entries instead of calling the APIs.
+    
+    With a lease file, only the worker holding its flock runs jobs; the
+    others wait and take over when that worker exits (the kernel releases
+    the lock), so a shared cache is refreshed once rather than per worker.
+    """
+    
+    def __init__(self, cache, refresh, platforms, intervals=None, windows=None, lease=None):
+        """
+        Args:
+            cache: StatsCache the dashboard reads from
+            refresh: callable (platform, days) -> stats dict or None
+            platforms: callable returning the platforms to keep warm
+            intervals: dict of platform -> seconds (REFRESH_INTERVAL_<PLATFORM> overrides)
+            windows: list of day windows to warm (REFRESH_WINDOWS, e.g. "7,14,30")
+            lease: optional lock file path shared by the processes using cache
+        """
+        self.cache = cache
+        self.refresh = refresh
+        self.platforms = platforms
+        self.intervals = dict(DEFAULT_INTERVALS, **(intervals or {}))
+        if windows is None:
+            value = os.getenv('REFRESH_WINDOWS')
+            windows = [int(w) for w in value.split(',') if w.strip()] if value else DEFAULT_WINDOWS
+        self.windows = windows
+        self.lease = lease
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def interval_for(self, platform):
+        """Refresh interval in seconds for a platform"""
+        return refresh_interval(platform, self.intervals)
+    
+    def start(self):
+        """Start the scheduler thread (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='refresh-scheduler', daemon=True)
+        self._thread.start()
+        logger.info("Refresh scheduler started")
+    
+    def stop(self):
+        """Stop the scheduler thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+    
+    def run_job(self, platform):
+        """Refresh every warmed window for one platform"""
+        interval = self.interval_for(platform)
+        for days in self.windows:
+            if self._stop.is_set():
+                return
+            collected_at = time.time()
+            try:
+                value = self.refresh(platform, days)
+            except Exception as e:
+                logger.error(f"Scheduled refresh of {platform} ({days}d) failed: {e}")
+                continue
+            if value is not None:
+                self.cache.put((platform, days), value, data_time(value, collected_at), ttl=interval)
+    
+    def _acquire_lease(self):
+        """
+        Block until this process holds the lease
+        
+        Returns:
+            the open lease file (keep it open to hold the lock), None if there
+            is no lease to take, or False if the scheduler was stopped first
+        """
+        if not self.lease or fcntl is None:
+            return None
+        try:
+            directory = os.path.dirname(self.lease)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            f = open(self.lease, 'a')
+        except OSError as e:
+            logger.warning(f"Could not open scheduler lease {self.lease}, refreshing without it: {e}")
+            return None
+        
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return f
+            except OSError:
+                pass
+            if self._stop.wait(LEASE_RETRY):
+                f.close()
+                return False
+    
+    def _run(self):
+        """Run due jobs, then sleep until the next one is due"""
+        lease = self._acquire_lease()
+        if lease is False:
+            return
+        if lease:
+            logger.info("Refresh scheduler holds the lease, refreshing for all workers")
+        
+        try:
+            # (next_run, platform) - everything is due immediately to pre-warm the cache
+            queue = [(time.time(), platform) for platform in self.platforms()]
+            heapq.heapify(queue)
+            
+            while queue and not self._stop.is_set():
+                next_run, platform = queue[0]
+                delay = next_run - time.time()
+                if delay > 0:
+                    self._stop.wait(delay)
+                    continue
+                
+                heapq.heappop(queue)
+                self.run_job(platform)
+                heapq.heappush(queue, (time.time() + self.interval_for(platform), platform))
+        finally:
+            if lease:
+                lease.close()
@@ -0,0 +1,213 @@
+"""StatsCache backed by a SQLite file in WAL mode, shared by every worker process"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .cache import StatsCache, FRESH, STALE, MISS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    ttl REAL NOT NULL,
+    revalidating_until REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS cache_entries_stored ON cache_entries (stored_at);
+
+CREATE TABLE IF NOT EXISTS state (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# How long one worker's claim on revalidating an entry keeps the others off it
+REVALIDATE_CLAIM = 120
+
+
+def connect(path):
+    """SQLite connection set up for several processes reading and writing at once"""
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # Readers never block the writer (and vice versa); a commit is one WAL append
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class SharedStatsCache(StatsCache):
+    """
+    StatsCache whose entries and state live in a SQLite file
+    
+    Every gunicorn worker opening the same file sees the same entries, so a
+    platform collected (or refreshed by the scheduler) in one worker is
+    served by all of them. Writes are single transactions; reads are a
+    primary-key lookup, and a value is only decoded again after it changed.
+    When full, the entries stored longest ago are evicted.
+    
+    The file outlives the processes, so it is its own warm-start snapshot
+    (see warm_start()); no SnapshotStore is needed.
+    """
+    
+    def __init__(self, path=None, ttl=None, stale_ttl=None, max_entries=None):
+        super().__init__(ttl, stale_ttl, max_entries)
+        self.path = path or os.getenv('STATS_CACHE_PATH', os.path.join('data', 'cache.db'))
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # key -> (stored_at, value): decoded values, reused while the row is unchanged
+        self._decoded = {}
+        self._conn = None
+        self._pid = None
+        self._db_lock = threading.Lock()
+        with self._db_lock, self._connection() as conn:
+            conn.executescript(SCHEMA)
+    
+    def _connection(self):
+        """This process's connection (reopened after a fork, e.g. gunicorn --preload)"""
+        if self._pid != os.getpid():
+            self._conn = connect(self.path)
+            self._pid = os.getpid()
+            self._decoded = {}
+        return self._conn
+    
+    @staticmethod
+    def _encode_key(key):
+        return json.dumps(key)
+    
+    def lookup(self, key):
+        """
+        Look up a key with its entry's ttl
+        
+        Returns:
+            tuple (value, state, stored_at, ttl) where state is FRESH, STALE
+            or MISS; stored_at and ttl are None on a miss
+        """
+        encoded = self._encode_key(key)
+        with self._db_lock:
+            conn = self._connection()
+            row = conn.execute('SELECT stored_at, ttl FROM cache_entries WHERE key = ?', (encoded,)).fetchone()
+            if row is None:
+                self._decoded.pop(encoded, None)
+                return None, MISS, None, None
+            
+            stored_at, ttl = row['stored_at'], row['ttl']
+            age = time.time() - stored_at
+            if age > ttl + self.stale_ttl:
+                with conn:
+                    conn.execute('DELETE FROM cache_entries WHERE key = ? AND stored_at = ?', (encoded, stored_at))
+                self._decoded.pop(encoded, None)
+                return None, MISS, None, None
+            
+            decoded = self._decoded.get(encoded)
+            if decoded is None or decoded[0] != stored_at:
+                value_row = conn.execute('SELECT value FROM cache_entries WHERE key = ?', (encoded,)).fetchone()
+                if value_row is None:
+                    return None, MISS, None, None
+                decoded = self._decoded[encoded] = (stored_at, json.loads(value_row['value']))
+        return decoded[1], FRESH if age <= ttl else STALE, stored_at, ttl
+    
+    def _put(self, key, value, stored_at, ttl):
+        """Store an entry (key and value JSON-serializable), evicting the oldest entries if full"""
+        encoded = self._encode_key(key)
+        with self._db_lock:
+            with self._connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO cache_entries (key, value, stored_at, ttl) VALUES (?, ?, ?, ?)',
+                    (encoded, json.dumps(value), stored_at, ttl)
+                )
+                conn.execute(
+                    'DELETE FROM cache_entries WHERE key IN '
+                    '(SELECT key FROM cache_entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+            self._decoded[encoded] = (stored_at, value)
+    
+    def warm_start(self):
+        """
+        Decode the entries left by earlier processes that are still servable
+        
+        Like snapshots loaded by the memory backend, entries keep their
+        collection time and ttl (so they show their real age): one older
+        than its ttl is served as stale, which starts a background refresh,
+        and one older than ttl + stale_ttl is a miss. Nothing is written, so
+        a worker starting up never changes what the others serve.
+        
+        Returns:
+            number of entries ready to be served
+        """
+        with self._db_lock:
+            rows = self._connection().execute(
+                'SELECT key, value, stored_at FROM cache_entries WHERE ? - stored_at <= ttl + ?',
+                (time.time(), self.stale_ttl)
+            ).fetchall()
+            for row in rows:
+                self._decoded[row['key']] = (row['stored_at'], json.loads(row['value']))
+        if rows:
+            logger.info(f"Serving {len(rows)} cached stats entries from before the restart")
+        return len(rows)
+    
+    def revalidate(self, key, loader):
+        """
+        Reload a key in a background thread, unless any worker is already
+        reloading it
+        
+        Returns:
+            True if a reload was started, False if one is already running
+        """
+        now = time.time()
+        with self._db_lock, self._connection() as conn:
+            claimed = conn.execute(
+                'UPDATE cache_entries SET revalidating_until = ? WHERE key = ? AND revalidating_until < ?',
+                (now + REVALIDATE_CLAIM, self._encode_key(key), now)
+            ).rowcount
+        if not claimed:
+            return False
+        return super().revalidate(key, loader)
+    
+    def _reload(self, key, loader):
+        """Run a loader and store its result, then release the claim"""
+        try:
+            super()._reload(key, loader)
+        finally:
+            with self._db_lock, self._connection() as conn:
+                conn.execute('UPDATE cache_entries SET revalidating_until = 0 WHERE key = ?', (self._encode_key(key),))
+    
+    def clear(self):
+        """Drop all entries (state is kept)"""
+        with self._db_lock:
+            with self._connection() as conn:
+                conn.execute('DELETE FROM cache_entries')
+            self._decoded.clear()
+    
+    def get_state(self, name, default=None):
+        """A named JSON value shared by all workers (default if never set)"""
+        with self._db_lock:
+            row = self._connection().execute('SELECT value FROM state WHERE name = ?', (name,)).fetchone()
+        return json.loads(row['value']) if row else default
+    
+    def set_state(self, name, value):
+        """Replace a named JSON value atomically"""
+        with self._db_lock, self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO state (name, value, updated_at) VALUES (?, ?, ?)',
+                (name, json.dumps(value), time.time())
+            )
+    
+    def prune_state(self, prefix, keep):
+        """Drop all but the `keep` most recently set values whose names start with prefix"""
+        with self._db_lock, self._connection() as conn:
+            conn.execute(
+                'DELETE FROM state WHERE name IN (SELECT name FROM state WHERE substr(name, 1, ?) = ? '
+                'ORDER BY updated_at DESC LIMIT -1 OFFSET ?)',
+                (len(prefix), prefix, keep)
+            )
@@ -0,0 +1,258 @@
+"""Single-flight coalescing of identical collections, across threads and worker processes"""
+
+import asyncio
+import copy
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from collectors import tracing
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lease files, coalescing stays per process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_TIMEOUT = 30.0
+LEASE_POLL = 0.05
+
+
+class Flight:
+    """One in-flight collection that other callers can wait on"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self._waiters = []
+        self._lock = threading.Lock()
+    
+    def finish(self, result=None, error=None):
+        """Publish the outcome and wake every waiting thread and coroutine"""
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.done.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._resolve, future)
+    
+    def add_waiter(self, loop, future):
+        """Resolve future on loop when the flight lands; False if it already has"""
+        with self._lock:
+            if self.done.is_set():
+                return False
+            self._waiters.append((loop, future))
+            return True
+    
+    def outcome(self):
+        """A private copy of the result (or raise the leader's error)"""
+        if self.error is not None:
+            raise self.error
+        return copy.deepcopy(self.result)
+    
+    @staticmethod
+    def _resolve(future):
+        if not future.done():
+            future.set_result(None)
+
+
+class SingleFlight:
+    """
+    Lets concurrent callers asking for the same key share one call
+    
+    Within a process, the first caller for a key runs the function and
+    everyone arriving while it runs (threads or coroutines) waits and gets a
+    copy of its result. Across processes (gunicorn workers), the running
+    caller holds an flock lease file for the key: another worker's caller
+    waits for the lease before running the function itself, by which time
+    the shared SQLite store has just been synced and answers locally.
+    """
+    
+    def __init__(self, lease_dir=None, lease_timeout=None):
+        """
+        Args:
+            lease_dir: directory for lease files (COLLECT_LEASE_DIR; empty disables leases)
+            lease_timeout: seconds to wait for another worker's lease before
+                           running anyway (COLLECT_LEASE_TIMEOUT)
+        """
+        self.lease_dir = lease_dir if lease_dir is not None else os.getenv('COLLECT_LEASE_DIR', os.path.join('data', 'leases'))
+        self.lease_timeout = lease_timeout or float(os.getenv('COLLECT_LEASE_TIMEOUT', DEFAULT_LEASE_TIMEOUT))
+        self._flights = {}
+        self._lock = threading.Lock()
+    
+    def _join(self, key):
+        """(flight, leader) for a key, creating the flight if none is running"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = Flight()
+            return flight, True
+    
+    def _land(self, key, flight, result=None, error=None):
+        with self._lock:
+            self._flights.pop(key, None)
+        flight.finish(result, error)
+    
+    def run(self, key, func):
+        """
+        Run func() once for all concurrent callers with the same key
+        
+        Returns:
+            tuple (result, shared) where shared is True if the result came
+            from another caller's call
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            with tracing.span('coalesce.wait', 'dashboard', key=str(key)):
+                flight.done.wait()
+            return flight.outcome(), True
+        
+        try:
+            with self.lease(key):
+                result = func()
+        except Exception as e:
+            self._land(key, flight, error=e)
+            raise
+        except BaseException:
+            self._land(key, flight, error=RuntimeError(f'{key} collection was interrupted'))
+            raise
+        self._land(key, flight, result)
+        return result, False
+    
+    async def run_async(self, key, func):
+        """run() for a coroutine function, waiting on the running event loop"""
+        flight, leader = self._join(key)
+        if not leader:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            if flight.add_waiter(loop, future):
+                with tracing.span('coalesce.wait', 'dashboard', key=str(key)):
+                    await future
+            return flight.outcome(), True
+        
+        try:
+            async with self.lease_async(key):
+                result = await func()
+        except Exception as e:
+            self._land(key, flight, error=e)
+            raise
+        except BaseException:
+            # Cancelled (e.g. the deadline passed): callers sharing it see an error
+            self._land(key, flight, error=RuntimeError(f'{key} collection was cancelled'))
+            raise
+        self._land(key, flight, result)
+        return result, False
+    
+    def _lease_path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.lease_dir, f'{digest}.lock')
+    
+    def _open_lease(self, key):
+        """Open the key's lease file, or None if leases are off or unavailable"""
+        if not self.lease_dir or fcntl is None:
+            return None
+        try:
+            os.makedirs(self.lease_dir, exist_ok=True)
+            return open(self._lease_path(key), 'a')
+        except OSError as e:
+            logger.warning(f"Could not open lease file for {key}: {e}")
+            return None
+    
+    def _try_lease(self, key, f):
+        """
+        Try to lock the key's lease file f without waiting
+        
+        The holder unlinks the file before releasing it, so a lock won on a
+        file that is no longer at the key's path is dropped and the path
+        opened again.
+        
+        Returns:
+            tuple (file to hold or retry with, locked); a file of None
+            means leases became unavailable and the caller runs without one
+        """
+        if f is None:
+            return None, True
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return f, False
+        try:
+            if os.path.samestat(os.fstat(f.fileno()), os.stat(f.name)):
+                return f, True
+        except FileNotFoundError:
+            pass
+        f.close()
+        return self._open_lease(key), False
+    
+    @staticmethod
+    def _release(f, locked):
+        """Remove a held lease file, then unlock it by closing it"""
+        if f is None:
+            return
+        try:
+            if locked:
+                os.unlink(f.name)
+        except OSError as e:
+            logger.warning(f"Could not remove lease file {f.name}: {e}")
+        finally:
+            f.close()
+    
+    @contextmanager
+    def lease(self, key):
+        """
+        Hold the key's lease file while the block runs
+        
+        The lock is released by the kernel if the process dies, so a crashed
+        worker never leaves a key locked. After lease_timeout the block runs
+        without the lease. The file is removed when the block ends, so lease
+        files don't pile up for every key (and window) ever collected.
+        """
+        f = self._open_lease(key)
+        if f is None:
+            yield
+            return
+        locked = False
+        try:
+            f, locked = self._try_lease(key, f)
+            if not locked:
+                with tracing.span('lease.wait', 'dashboard', key=str(key)):
+                    deadline = time.monotonic() + self.lease_timeout
+                    while not locked:
+                        if time.monotonic() >= deadline:
+                            logger.warning(f"Lease for {key} still held after {self.lease_timeout:.0f}s, collecting anyway")
+                            break
+                        time.sleep(LEASE_POLL)
+                        f, locked = self._try_lease(key, f)
+            yield
+        finally:
+            self._release(f, locked)
+    
+    @asynccontextmanager
+    async def lease_async(self, key):
+        """lease() that waits on the running event loop"""
+        f = self._open_lease(key)
+        if f is None:
+            yield
+            return
+        locked = False
+        try:
+            f, locked = self._try_lease(key, f)
+            if not locked:
+                with tracing.span('lease.wait', 'dashboard', key=str(key)):
+                    deadline = time.monotonic() + self.lease_timeout
+                    while not locked:
+                        if time.monotonic() >= deadline:
+                            logger.warning(f"Lease for {key} still held after {self.lease_timeout:.0f}s, collecting anyway")
+                            break
+                        await asyncio.sleep(LEASE_POLL)
+                        f, locked = self._try_lease(key, f)
+            yield
+        finally:
+            self._release(f, locked)
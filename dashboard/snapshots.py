@@ -0,0 +1,90 @@
+"""On-disk snapshots of the latest collected stats, for warm starts"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """
+    The latest value of each cache key, one JSON file per key
+    
+    Files are replaced atomically, so a worker restarting mid-write (or
+    several workers saving the same key) never leaves a torn snapshot.
+    Only the newest max_files snapshots are kept.
+    """
+    
+    def __init__(self, directory=None, max_files=None):
+        """
+        Args:
+            directory: where snapshots live (STATS_SNAPSHOT_DIR; empty disables them)
+            max_files: snapshots to keep (default STATS_CACHE_MAX_ENTRIES)
+        """
+        self.directory = directory if directory is not None else os.getenv('STATS_SNAPSHOT_DIR', os.path.join('data', 'snapshots'))
+        self.max_files = max_files or int(os.getenv('STATS_CACHE_MAX_ENTRIES', 64))
+    
+    def _path(self, key):
+        digest = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+        return os.path.join(self.directory, f'{digest}.json')
+    
+    def save(self, key, value, stored_at, ttl):
+        """Write the snapshot of one key (failures are logged, never raised)"""
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'key': key, 'value': value, 'stored_at': stored_at, 'ttl': ttl}, f)
+                os.replace(tmp_path, self._path(key))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._prune()
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not save stats snapshot for {key}: {e}")
+    
+    def _prune(self):
+        """Drop the oldest snapshots beyond max_files"""
+        names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        if len(names) <= self.max_files:
+            return
+        paths = sorted((os.path.join(self.directory, name) for name in names), key=os.path.getmtime)
+        for path in paths[:-self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def load(self):
+        """
+        Every readable snapshot
+        
+        Returns:
+            list of (key, value, stored_at, ttl); keys come back as tuples
+        """
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        snapshots = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    data = json.load(f)
+                snapshots.append((as_key(data['key']), data['value'], data['stored_at'], data['ttl']))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable stats snapshot {name}: {e}")
+        return snapshots
+
+
+def as_key(value):
+    """A JSON-decoded cache key with its lists turned back into tuples"""
+    if isinstance(value, list):
+        return tuple(as_key(item) for item in value)
+    return value
@@ -0,0 +1,495 @@
+"""File-backed SQLite store of raw per-item platform metrics"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from .rollups import DailyRollup
+from .scheduler import refresh_interval
+from .shared_cache import connect
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reddit_posts (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    created_utc REAL NOT NULL,
+    subreddit TEXT,
+    title TEXT,
+    permalink TEXT,
+    score INTEGER NOT NULL DEFAULT 0,
+    num_comments INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reddit_posts_user_time ON reddit_posts (username, created_utc);
+
+CREATE TABLE IF NOT EXISTS reddit_snapshots (
+    post_id TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    score INTEGER NOT NULL,
+    num_comments INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reddit_snapshots_post ON reddit_snapshots (post_id, captured_at);
+
+CREATE TABLE IF NOT EXISTS youtube_videos (
+    video_id TEXT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    published_at REAL NOT NULL,
+    title TEXT,
+    views INTEGER NOT NULL DEFAULT 0,
+    likes INTEGER NOT NULL DEFAULT 0,
+    comments INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS youtube_videos_channel_time ON youtube_videos (channel_id, published_at);
+
+CREATE TABLE IF NOT EXISTS github_events (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    type TEXT NOT NULL,
+    repo TEXT,
+    created_at TEXT NOT NULL,
+    created_ts REAL NOT NULL,
+    commits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS github_events_user_time ON github_events (username, created_ts);
+
+CREATE TABLE IF NOT EXISTS gsc_daily (
+    property_url TEXT NOT NULL,
+    date TEXT NOT NULL,
+    country TEXT NOT NULL,
+    clicks INTEGER NOT NULL DEFAULT 0,
+    impressions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (property_url, date, country)
+);
+
+CREATE TABLE IF NOT EXISTS profiles (
+    platform TEXT NOT NULL,
+    account TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (platform, account)
+);
+
+CREATE TABLE IF NOT EXISTS syncs (
+    platform TEXT NOT NULL,
+    account TEXT NOT NULL,
+    window_start REAL NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (platform, account)
+);
+"""
+
+# Per-day sums of the additive metrics of each platform, for DailyRollup
+ROLLUP_QUERIES = {
+    'reddit': (
+        ['posts', 'karma', 'comments'],
+        "SELECT date(created_utc, 'unixepoch', 'localtime') AS day, COUNT(*), SUM(score), SUM(num_comments) "
+        "FROM reddit_posts WHERE username = ? GROUP BY day"
+    ),
+    'youtube': (
+        ['videos', 'views', 'likes', 'comments'],
+        "SELECT date(published_at, 'unixepoch', 'localtime') AS day, COUNT(*), SUM(views), SUM(likes), SUM(comments) "
+        "FROM youtube_videos WHERE channel_id = ? GROUP BY day"
+    ),
+    'github': (
+        ['events', 'commits'],
+        "SELECT date(created_ts, 'unixepoch', 'localtime') AS day, COUNT(*), SUM(commits) "
+        "FROM github_events WHERE username = ? GROUP BY day"
+    ),
+    'gsc': (
+        ['clicks', 'impressions', 'clicks_us'],
+        "SELECT date AS day, SUM(clicks), SUM(impressions), SUM(CASE WHEN country = 'usa' THEN clicks ELSE 0 END) "
+        "FROM gsc_daily WHERE property_url = ? GROUP BY day"
+    )
+}
+
+
+class MetricsStore:
+    """
+    Raw per-item metrics (posts, videos, events, daily search rows)
+    
+    Collectors record every item they fetch here and compute window
+    aggregates from the stored items. A sync covers the widest window
+    (STORE_SYNC_DAYS), so switching between narrower windows is a local
+    query until the sync is older than half the platform's refresh
+    interval (or STORE_SYNC_TTL seconds, if shorter). Results computed
+    from the store carry the sync time as synced_at.
+    """
+    
+    def __init__(self, path=None, sync_days=None, sync_ttl=None):
+        self.path = path or os.getenv('STATS_DB_PATH', os.path.join('data', 'stats.db'))
+        self.sync_days = sync_days or int(os.getenv('STORE_SYNC_DAYS', 30))
+        if sync_ttl is None and os.getenv('STORE_SYNC_TTL', '').strip():
+            sync_ttl = float(os.getenv('STORE_SYNC_TTL'))
+        self.sync_ttl = sync_ttl
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._rollups = {}
+        # Several workers may share the file: WAL lets them read while one writes
+        self._conn = connect(self.path)
+        self._data_version = None
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+    
+    # Sync bookkeeping
+    
+    def sync_ttl_for(self, platform):
+        """
+        Seconds a platform's sync is reused: half its refresh interval, so
+        every scheduled refresh fetches new data (STORE_SYNC_TTL caps it)
+        """
+        ttl = refresh_interval(platform) / 2
+        return ttl if self.sync_ttl is None else min(ttl, self.sync_ttl)
+    
+    def sync_start(self, start_date):
+        """Start of the window to fetch: the requested start or STORE_SYNC_DAYS back, whichever is earlier"""
+        widest = datetime.fromtimestamp(time.time() - self.sync_days * 86400)
+        return min(start_date, widest)
+    
+    def needs_sync(self, platform, account, start_date):
+        """True unless a recent sync already covers start_date"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT window_start, synced_at FROM syncs WHERE platform = ? AND account = ?',
+                (platform, account)
+            ).fetchone()
+        if row is None:
+            return True
+        if time.time() - row['synced_at'] > self.sync_ttl_for(platform):
+            return True
+        return start_date.timestamp() < row['window_start']
+    
+    def synced_window_start(self, platform, account):
+        """Earliest timestamp covered by the last sync (infinity if never synced)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT window_start FROM syncs WHERE platform = ? AND account = ?',
+                (platform, account)
+            ).fetchone()
+        return row['window_start'] if row else float('inf')
+    
+    def synced_at(self, platform, account):
+        """Unix time of the last sync (None if never synced)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT synced_at FROM syncs WHERE platform = ? AND account = ?',
+                (platform, account)
+            ).fetchone()
+        return row['synced_at'] if row else None
+    
+    def mark_synced(self, platform, account, window_start):
+        """Record a successful sync covering window_start..now"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO syncs (platform, account, window_start, synced_at) VALUES (?, ?, ?, ?)',
+                (platform, account, window_start.timestamp(), time.time())
+            )
+    
+    # Daily rollups
+    
+    def rollup(self, platform, account):
+        """
+        DailyRollup of a platform account's stored items
+        
+        Built once per change to the account's items, so repeated window
+        lookups are prefix-sum differences.
+        """
+        key = (platform, account)
+        with self._lock:
+            # Another process (worker) committed changes: every cached rollup may be outdated
+            data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                self._rollups.clear()
+                self._data_version = data_version
+            rollup = self._rollups.get(key)
+            if rollup is None:
+                metrics, query = ROLLUP_QUERIES[platform]
+                rows = self._conn.execute(query, (account,)).fetchall()
+                rollup = DailyRollup.from_rows(
+                    [(row[0], dict(zip(metrics, row[1:]))) for row in rows],
+                    metrics
+                )
+                self._rollups[key] = rollup
+        return rollup
+    
+    def _invalidate(self, platform, account):
+        """Drop a cached rollup after its items changed (caller holds the lock)"""
+        self._rollups.pop((platform, account), None)
+    
+    # Profiles (non-windowed totals such as followers or subscribers)
+    
+    def record_profile(self, platform, account, data):
+        """Store the latest profile-level stats for an account"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO profiles (platform, account, data, updated_at) VALUES (?, ?, ?, ?)',
+                (platform, account, json.dumps(data), time.time())
+            )
+    
+    def get_profile(self, platform, account):
+        """Latest profile-level stats for an account (empty dict if unknown)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM profiles WHERE platform = ? AND account = ?',
+                (platform, account)
+            ).fetchone()
+        return json.loads(row['data']) if row else {}
+    
+    # Reddit
+    
+    def record_reddit_posts(self, username, posts):
+        """
+        Upsert submissions and snapshot their score/comment counts
+        
+        Args:
+            username: Reddit username
+            posts: list of submission dicts as returned by the listing API
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            for post in posts:
+                post_id = post.get('name') or f"t3_{post.get('id')}"
+                score = post.get('score', 0)
+                num_comments = post.get('num_comments', 0)
+                previous = self._conn.execute(
+                    'SELECT score, num_comments FROM reddit_posts WHERE id = ?', (post_id,)
+                ).fetchone()
+                
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO reddit_posts '
+                    '(id, username, created_utc, subreddit, title, permalink, score, num_comments, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (post_id, username, post.get('created_utc', 0), post.get('subreddit', 'unknown'),
+                     post.get('title', ''), post.get('permalink', ''), score, num_comments, now)
+                )
+                if previous is None or (previous['score'], previous['num_comments']) != (score, num_comments):
+                    self._conn.execute(
+                        'INSERT INTO reddit_snapshots (post_id, captured_at, score, num_comments) VALUES (?, ?, ?, ?)',
+                        (post_id, now, score, num_comments)
+                    )
+            self._invalidate('reddit', username)
+    
+    def reddit_posts(self, username, start_date, end_date):
+        """Stored submissions for a user in the date range, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id AS name, created_utc, subreddit, title, permalink, score, num_comments '
+                'FROM reddit_posts WHERE username = ? AND created_utc BETWEEN ? AND ? '
+                'ORDER BY created_utc DESC',
+                (username, start_date.timestamp(), end_date.timestamp())
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def reddit_post_ids(self, usernames, start_date):
+        """Fullnames (t3_...) of stored submissions by any of the users since start_date"""
+        if not usernames:
+            return []
+        placeholders = ', '.join('?' for _ in usernames)
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT id FROM reddit_posts WHERE username IN ({placeholders}) AND created_utc >= ? '
+                'ORDER BY created_utc DESC',
+                (*usernames, start_date.timestamp())
+            ).fetchall()
+        return [row['id'] for row in rows]
+    
+    def update_reddit_scores(self, posts):
+        """
+        Update score/comment counts of known submissions
+        
+        Only posts whose counts changed are written (and snapshotted).
+        
+        Args:
+            posts: list of submission dicts with name, score, num_comments
+            
+        Returns:
+            number of posts that changed
+        """
+        now = time.time()
+        changed = 0
+        with self._lock, self._conn:
+            for post in posts:
+                row = self._conn.execute(
+                    'SELECT username, score, num_comments FROM reddit_posts WHERE id = ?',
+                    (post.get('name'),)
+                ).fetchone()
+                score = post.get('score', 0)
+                num_comments = post.get('num_comments', 0)
+                if row is None or (row['score'], row['num_comments']) == (score, num_comments):
+                    continue
+                
+                self._conn.execute(
+                    'UPDATE reddit_posts SET score = ?, num_comments = ?, updated_at = ? WHERE id = ?',
+                    (score, num_comments, now, post['name'])
+                )
+                self._conn.execute(
+                    'INSERT INTO reddit_snapshots (post_id, captured_at, score, num_comments) VALUES (?, ?, ?, ?)',
+                    (post['name'], now, score, num_comments)
+                )
+                self._invalidate('reddit', row['username'])
+                changed += 1
+        return changed
+    
+    def reddit_high_water(self, username):
+        """created_utc of the newest stored submission for a user, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MAX(created_utc) AS newest FROM reddit_posts WHERE username = ?',
+                (username,)
+            ).fetchone()
+        return row['newest']
+    
+    def reddit_top_post(self, username, start_date, end_date):
+        """Highest scoring stored submission in the date range, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT title, score, subreddit, permalink FROM reddit_posts '
+                'WHERE username = ? AND created_utc BETWEEN ? AND ? '
+                'ORDER BY score DESC, created_utc DESC LIMIT 1',
+                (username, start_date.timestamp(), end_date.timestamp())
+            ).fetchone()
+        return dict(row) if row else None
+    
+    def reddit_subreddits(self, username, start_date, end_date):
+        """Posts and karma per subreddit in the date range"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT subreddit, COUNT(*) AS posts, SUM(score) AS karma FROM reddit_posts '
+                'WHERE username = ? AND created_utc BETWEEN ? AND ? GROUP BY subreddit',
+                (username, start_date.timestamp(), end_date.timestamp())
+            ).fetchall()
+        return {row['subreddit']: {'posts': row['posts'], 'karma': row['karma']} for row in rows}
+    
+    # YouTube
+    
+    def record_youtube_videos(self, channel_id, videos):
+        """
+        Upsert video statistics
+        
+        Args:
+            channel_id: channel the videos belong to
+            videos: list of dicts with video_id, published_at (datetime), title,
+                    views, likes, comments
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO youtube_videos '
+                '(video_id, channel_id, published_at, title, views, likes, comments, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(v['video_id'], channel_id, v['published_at'].timestamp(), v.get('title', ''),
+                  v.get('views', 0), v.get('likes', 0), v.get('comments', 0), now) for v in videos]
+            )
+            self._invalidate('youtube', channel_id)
+    
+    def youtube_videos(self, channel_id, start_date, end_date):
+        """Stored videos for a channel published in the date range"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT video_id, published_at, title, views, likes, comments FROM youtube_videos '
+                'WHERE channel_id = ? AND published_at BETWEEN ? AND ? ORDER BY published_at DESC',
+                (channel_id, start_date.timestamp(), end_date.timestamp())
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    # GitHub
+    
+    def record_github_events(self, username, events):
+        """
+        Upsert public events
+        
+        Commits are recorded per repository and UTC day under the id
+        commits:<repo>:<date>, whichever API mode fetched them: push events
+        of the same repository and day are summed into one row, and a
+        stored row keeps the larger of its count and the new one, so
+        switching GITHUB_API_MODE never counts a commit twice and a sync
+        that starts mid-day never lowers the day's count. Other events keep
+        their own id.
+        
+        Args:
+            username: GitHub username
+            events: list of event dicts as returned by the events API, or
+                GraphQL commit contributions carrying a 'commits' count
+        """
+        rows = {}
+        for event in events:
+            if 'commits' in event:
+                commits = event['commits']
+            else:
+                commits = len(event.get('payload', {}).get('commits', [])) if event['type'] == 'PushEvent' else 0
+            repo = event['repo']['name']
+            created_at = event['created_at']
+            if not commits:
+                rows[str(event['id'])] = (event['type'], repo, created_at, 0)
+                continue
+            
+            event_id = f"commits:{repo}:{created_at[:10]}"
+            if event_id in rows:
+                _, _, newest, total = rows[event_id]
+                created_at = max(created_at, newest)
+                commits += total
+            rows[event_id] = (event['type'], repo, created_at, commits)
+        
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO github_events (id, username, type, repo, created_at, created_ts, commits) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET type = excluded.type, '
+                'created_at = MAX(created_at, excluded.created_at), created_ts = MAX(created_ts, excluded.created_ts), '
+                'commits = MAX(commits, excluded.commits)',
+                [
+                    (event_id, username, event_type, repo, created_at,
+                     datetime.strptime(created_at, '%Y-%m-%dT%H:%M:%SZ').timestamp(), commits)
+                    for event_id, (event_type, repo, created_at, commits) in rows.items()
+                ]
+            )
+            self._invalidate('github', username)
+    
+    def github_events(self, username, start_date, end_date):
+        """Stored events for a user in the date range, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT type, repo, created_at, commits FROM github_events '
+                'WHERE username = ? AND created_ts BETWEEN ? AND ? ORDER BY created_ts DESC',
+                (username, start_date.timestamp(), end_date.timestamp())
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    # Google Search Console
+    
+    def record_gsc_rows(self, property_url, rows):
+        """
+        Upsert daily search analytics rows
+        
+        Args:
+            property_url: Search Console property
+            rows: list of rows queried with dimensions ['date', 'country']
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO gsc_daily (property_url, date, country, clicks, impressions) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(property_url, row['keys'][0], row['keys'][1], row['clicks'], row['impressions'])
+                 for row in rows]
+            )
+            self._invalidate('gsc', property_url)
+    
+    def gsc_rows(self, property_url, start_date, end_date):
+        """Stored daily rows for a property, in the same shape as the API returns them"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT date, country, clicks, impressions FROM gsc_daily '
+                'WHERE property_url = ? AND date BETWEEN ? AND ? ORDER BY date',
+                (property_url, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+            ).fetchall()
+        return [{'keys': [row['date'], row['country']], 'clicks': row['clicks'],
+                 'impressions': row['impressions']} for row in rows]
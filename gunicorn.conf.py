@@ -0,0 +1,19 @@
+"""
+gunicorn settings, read automatically when gunicorn starts in this directory
+
+    gunicorn stats:app --bind 0.0.0.0:$PORT
+"""
+
+
+def post_worker_init(worker):
+    """Start the background threads (refresh scheduler, metrics flush) once the worker has loaded the app"""
+    import stats
+    
+    stats.start_background()
+
+
+def worker_exit(server, worker):
+    """Add the worker's last metric changes to the shared /metrics totals"""
+    import stats
+    
+    stats.metrics.REGISTRY.flush()
@@ -4,17 +4,40 @@ Social Media Stats Dashboard
 A simple web app to view your weekly social media statistics
 """
 
+import asyncio
 import os
-from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, session
+import re
+import time
+from datetime import date, datetime, timedelta
+from flask import Flask, Response, abort, make_response, render_template, request, jsonify, session, stream_with_context
 from dotenv import load_dotenv
 import logging
 
 from collectors import (
     RedditCollector,
+    RedditScoreRefresher,
     YouTubeCollector,
     GSCCollector,
-    GitHubCollector
+    GitHubCollector,
+    metrics,
+    ratelimit,
+    tracing,
+    transport
+)
+from collectors.youtube_collector import quota as youtube_quota
+from dashboard import (
+    CircuitBreakers,
+    CollectionEngine,
+    CollectionTask,
+    StatsCache,
+    SharedStatsCache,
+    SnapshotStore,
+    RefreshScheduler,
+    MetricsStore,
+    FRESH,
+    MISS,
+    STALE,
+    data_time
 )
 
 # Load environment variables
@@ -31,172 +54,745 @@ app.config['TEMPLATES_AUTO_RELOAD'] = True
 app.jinja_env.auto_reload = True
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 
-# Store manual LinkedIn stats in memory (you could use a database instead)
-linkedin_manual_stats = {}
+# Per-platform results keyed by (platform, window), plus the manual LinkedIn stats.
+# The SQLite backend is shared by all gunicorn workers; 'memory' keeps them per process
+# (STATS_CACHE_BACKEND, STATS_CACHE_PATH, STATS_CACHE_TTL, STATS_CACHE_STALE_TTL)
+if os.getenv('STATS_CACHE_BACKEND', 'sqlite').lower() == 'memory':
+    # Snapshot files (STATS_SNAPSHOT_DIR) outlive the process
+    stats_cache = StatsCache(snapshots=SnapshotStore())
+else:
+    # The SQLite file itself outlives the processes
+    stats_cache = SharedStatsCache()
+    # Rate-limit budgets, the YouTube quota and the /metrics totals are shared by the workers too
+    ratelimit.share(stats_cache.path)
+    youtube_quota.share(stats_cache.path)
+    metrics.REGISTRY.share(stats_cache.path)
 
+# Shared worker pool for platform collection (COLLECT_MAX_WORKERS, COLLECT_DEADLINE[_<PLATFORM>]).
+# With the SQLite cache, last good results outlive restarts and are seen by every worker.
+engine = CollectionEngine(breakers=CircuitBreakers(
+    results=stats_cache if isinstance(stats_cache, SharedStatsCache) else None
+))
 
-def get_date_range(days=7):
-    """Get date range for the last N days"""
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-    return start_date, end_date
+# Warm start: serve the last collected stats (with their age) right after a restart,
+# while the scheduler or the first request re-collects them
+stats_cache.warm_start()
+
+# Raw per-item metrics; narrower windows are computed from the last sync (STATS_DB_PATH)
+metrics_store = MetricsStore()
+
+PLATFORMS = ['reddit', 'youtube', 'gsc', 'github']
+
+# Day windows offered by the dashboard; /api/stats/full carries all of them
+DASHBOARD_WINDOWS = [7, 14, 30]
 
+# Longest ?days= window accepted (far larger ones overflow the date range)
+MAX_DAYS = 3660
 
-def collect_stats(platforms=None, days=7):
+
+def get_date_range(days=7, start=None, end=None):
     """
-    Collect stats from selected platforms
+    Get date range for the last N days, or for explicit start/end dates
     
     Args:
-        platforms: list of platform names (e.g. ['reddit', 'youtube'])
-                  If None, collects from all configured platforms
         days: number of days to look back
-    
+        start, end: optional date objects (inclusive) that override days
+        
     Returns:
-        dict with stats for each platform
+        tuple (start_date, end_date) of datetimes; end_date is exclusive
     """
-    start_date, end_date = get_date_range(days)
-    results = {
-        'start_date': start_date.strftime('%Y-%m-%d'),
-        'end_date': end_date.strftime('%Y-%m-%d'),
-        'platforms': {}
+    if start and end:
+        start_date = datetime.combine(start, datetime.min.time())
+        end_date = datetime.combine(end + timedelta(days=1), datetime.min.time())
+        return start_date, end_date
+    
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    return start_date, end_date
+
+
+def window_key(days=7, start=None, end=None):
+    """Cache key for a window: the day count, or the custom start/end dates"""
+    if start and end:
+        return (start.isoformat(), end.isoformat())
+    return days
+
+
+def date_range_labels(start_date, end_date):
+    """start_date/end_date strings shown on the dashboard (end is inclusive)"""
+    return start_date.strftime('%Y-%m-%d'), (end_date - timedelta(seconds=1)).strftime('%Y-%m-%d')
+
+
+def get_reddit_accounts():
+    """Reddit accounts configured via REDDIT_USERNAME_N / REDDIT_DISPLAY_NAME_N (any N)"""
+    slots = sorted(
+        int(match.group(1)) for match in
+        (re.fullmatch(r'REDDIT_USERNAME_(\d+)', key) for key in os.environ) if match
+    )
+    reddit_accounts = []
+    for i in slots:
+        username = os.getenv(f'REDDIT_USERNAME_{i}')
+        display_name = os.getenv(f'REDDIT_DISPLAY_NAME_{i}', username)  # Default to username if no display name
+        if username and username.strip():
+            reddit_accounts.append({
+                'username': username,
+                'display_name': display_name if display_name and display_name.strip() else username
+            })
+    return reddit_accounts
+
+
+def reddit_placeholder():
+    """Empty per-account Reddit stats"""
+    return {
+        'posts_count': 0, 'karma': 0, 'comments': 0, 'avg_karma': 0,
+        'avg_comments': 0, 'top_post': None, 'subreddits': {}
+    }
+
+
+def youtube_placeholder():
+    """Empty YouTube stats"""
+    return {
+        'videos_count': 0, 'views': 0, 'likes': 0, 'comments': 0,
+        'avg_views': 0, 'subscribers': 0, 'total_videos': 0, 'total_channel_views': 0
+    }
+
+
+def gsc_placeholder():
+    """Empty Google Search Console stats"""
+    return {
+        'clicks': 0, 'impressions': 0, 'ctr': 0, 'clicks_us': 0
     }
+
+
+def github_placeholder(username=''):
+    """Empty GitHub stats"""
+    return {
+        'username': username,
+        'public_repos': 0,
+        'followers': 0,
+        'following': 0,
+        'total_stars': 0,
+        'total_forks': 0,
+        'commits_count': 0,
+        'recent_activity': []
+    }
+
+
+def build_tasks(platforms, start_date, end_date):
+    """
+    Build collection tasks for the selected platforms
+    
+    Each Reddit account is its own task so accounts are fetched in parallel.
+    Unconfigured platforms get no task; their placeholder is returned by
+    collect_stats directly. Reddit and GitHub tasks also get an async_func
+    for the asyncio mode (asgi.py); YouTube and Search Console use the
+    synchronous Google client and run in threads there.
+    """
+    tasks = []
     
-    # Reddit - Support up to 3 accounts
     if not platforms or 'reddit' in platforms:
-        reddit_accounts = []
-        for i in range(1, 4):  # Support 3 Reddit accounts
-            username = os.getenv(f'REDDIT_USERNAME_{i}')
-            display_name = os.getenv(f'REDDIT_DISPLAY_NAME_{i}', username)  # Default to username if no display name
-            if username and username.strip():
-                reddit_accounts.append({
-                    'username': username,
-                    'display_name': display_name if display_name and display_name.strip() else username
-                })
-        
-        if reddit_accounts:
-            # Collect stats for each Reddit account
-            all_reddit_stats = []
-            for account in reddit_accounts:
-                collector = RedditCollector(account['username'])
-                stats = collector.collect(start_date, end_date)
-                stats['username'] = account['username']
-                stats['display_name'] = account['display_name']
-                all_reddit_stats.append(stats)
-            
-            # Always show individual accounts (even if only one)
-            results['platforms']['reddit'] = {
-                'accounts': all_reddit_stats,
-                'total_posts': sum(s['posts_count'] for s in all_reddit_stats),
-                'total_karma': sum(s['karma'] for s in all_reddit_stats),
-                'total_comments': sum(s['comments'] for s in all_reddit_stats)
-            }
+        reddit_accounts = get_reddit_accounts()
+        # One batched /api/info score refresh shared by every account
+        score_refresher = RedditScoreRefresher(metrics_store, [a['username'] for a in reddit_accounts])
+        for account in reddit_accounts:
+            collector = RedditCollector(account['username'], store=metrics_store, score_refresher=score_refresher)
+            tasks.append(CollectionTask(
+                key=f"reddit:{account['username']}",
+                platform='reddit',
+                func=lambda c=collector: c.collect(start_date, end_date),
+                placeholder=reddit_placeholder(),
+                async_func=lambda c=collector: c.collect_async(start_date, end_date)
+            ))
     
-    # YouTube
     if not platforms or 'youtube' in platforms:
         api_key = os.getenv('YOUTUBE_API_KEY')
         channel_id = os.getenv('YOUTUBE_CHANNEL_ID')
         if api_key and channel_id and api_key.strip() and api_key != 'your_youtube_api_key_here':
-            try:
-                collector = YouTubeCollector(api_key, channel_id)
-                results['platforms']['youtube'] = collector.collect(start_date, end_date)
-            except Exception as e:
-                logger.error(f"YouTube collection failed: {e}")
-                results['platforms']['youtube'] = {
-                    'videos_count': 0, 'views': 0, 'likes': 0, 'comments': 0, 
-                    'avg_views': 0, 'subscribers': 0, 'total_videos': 0, 'total_channel_views': 0
-                }
-        else:
-            # Show placeholder if not configured
-            results['platforms']['youtube'] = {
-                'videos_count': 0, 'views': 0, 'likes': 0, 'comments': 0,
-                'avg_views': 0, 'subscribers': 0, 'total_videos': 0, 'total_channel_views': 0,
-                'error': 'API not configured'
-            }
+            collector = YouTubeCollector(api_key, channel_id, store=metrics_store)
+            tasks.append(CollectionTask(
+                key='youtube',
+                platform='youtube',
+                func=lambda c=collector: c.collect(start_date, end_date),
+                placeholder=youtube_placeholder()
+            ))
     
-    # Google Search Console
     if not platforms or 'gsc' in platforms:
         credentials_file = os.getenv('GSC_CREDENTIALS_FILE')
         property_url = os.getenv('GSC_PROPERTY_URL')
         if credentials_file and property_url and credentials_file != 'path/to/gsc-credentials.json':
-            try:
-                collector = GSCCollector(credentials_file, property_url)
-                results['platforms']['gsc'] = collector.collect(start_date, end_date)
-            except Exception as e:
-                logger.error(f"GSC collection failed: {e}")
-                results['platforms']['gsc'] = {
-                    'clicks': 0, 'impressions': 0, 'ctr': 0, 'clicks_us': 0
-                }
-        else:
-            # Show placeholder if not configured
-            results['platforms']['gsc'] = {
-                'clicks': 0, 'impressions': 0, 'ctr': 0, 'clicks_us': 0,
-                'error': 'API not configured'
-            }
+            collector = GSCCollector(credentials_file, property_url, store=metrics_store)
+            tasks.append(CollectionTask(
+                key='gsc',
+                platform='gsc',
+                func=lambda c=collector: c.collect(start_date, end_date),
+                placeholder=gsc_placeholder()
+            ))
     
-    # GitHub
     if not platforms or 'github' in platforms:
         github_username = os.getenv('GITHUB_USERNAME')
         github_token = os.getenv('GITHUB_TOKEN')  # Optional, but recommended for higher rate limits
         if github_username and github_username.strip():
-            try:
-                collector = GitHubCollector(github_username, github_token)
-                results['platforms']['github'] = collector.collect(start_date, end_date)
-            except Exception as e:
-                logger.error(f"GitHub collection failed: {e}")
-                results['platforms']['github'] = {
-                    'username': github_username,
-                    'public_repos': 0,
-                    'followers': 0,
-                    'following': 0,
-                    'total_stars': 0,
-                    'total_forks': 0,
-                    'commits_count': 0,
-                    'recent_activity': []
-                }
-        else:
-            # Show placeholder if not configured
-            results['platforms']['github'] = {
-                'username': '',
-                'public_repos': 0,
-                'followers': 0,
-                'following': 0,
-                'total_stars': 0,
-                'total_forks': 0,
-                'commits_count': 0,
-                'recent_activity': [],
-                'error': 'Username not configured'
-            }
+            collector = GitHubCollector(github_username, github_token, store=metrics_store)
+            tasks.append(CollectionTask(
+                key='github',
+                platform='github',
+                func=lambda c=collector: c.collect(start_date, end_date),
+                placeholder=github_placeholder(github_username),
+                async_func=lambda c=collector: c.collect_async(start_date, end_date)
+            ))
+    
+    return tasks
+
+
+def reddit_summary(accounts, collected):
+    """Reddit platform stats: one card per configured account plus totals"""
+    all_reddit_stats = []
+    for account in accounts:
+        stats = collected[f"reddit:{account['username']}"]
+        stats['username'] = account['username']
+        stats['display_name'] = account['display_name']
+        all_reddit_stats.append(stats)
+    
+    return {
+        'accounts': all_reddit_stats,
+        'total_posts': sum(s['posts_count'] for s in all_reddit_stats),
+        'total_karma': sum(s['karma'] for s in all_reddit_stats),
+        'total_comments': sum(s['comments'] for s in all_reddit_stats)
+    }
+
+
+class PlatformResults:
+    """
+    Turns finished collection tasks into per-platform results
+    
+    Unconfigured platforms are ready right away (as placeholders); Reddit
+    is ready once every account is done.
+    """
+    
+    def __init__(self, platforms, tasks):
+        self.platforms = platforms
+        self.configured = {task.platform for task in tasks}
+        self.reddit_accounts = get_reddit_accounts() if 'reddit' in self.configured else []
+        self.reddit_results = {}
+    
+    def unconfigured(self):
+        """(platform, placeholder) for selected platforms without credentials"""
+        # Show placeholder if not configured
+        placeholders = {
+            'youtube': dict(youtube_placeholder(), error='API not configured'),
+            'gsc': dict(gsc_placeholder(), error='API not configured'),
+            'github': dict(github_placeholder(), error='Username not configured')
+        }
+        return [
+            (platform, placeholder) for platform, placeholder in placeholders.items()
+            if (not self.platforms or platform in self.platforms) and platform not in self.configured
+        ]
+    
+    def add(self, task, stats):
+        """Record a finished task; returns the (platform, stats) pairs now complete"""
+        if task.platform != 'reddit':
+            return [(task.platform, stats)]
+        # Reddit - one card per configured account
+        self.reddit_results[task.key] = stats
+        if len(self.reddit_results) == len(self.reddit_accounts):
+            return [('reddit', reddit_summary(self.reddit_accounts, self.reddit_results))]
+        return []
+
+
+def collection_tasks(platforms, days, start, end):
+    """
+    Tasks for a window; concurrent requests for the same platform (or
+    Reddit account) and window share one collection
+    """
+    start_date, end_date = get_date_range(days, start, end)
+    tasks = build_tasks(platforms, start_date, end_date)
+    for task in tasks:
+        task.flight_key = (task.key, window_key(days, start, end))
+    return tasks
+
+
+def iter_collect_stats(platforms=None, days=7, start=None, end=None):
+    """
+    Collect stats from selected platforms, yielding (platform, stats) as
+    each platform finishes
+    
+    Unconfigured platforms come first (as placeholders), then the others in
+    the order their collection completes. Reddit is yielded once every
+    account is done.
+    """
+    for _, platform, stats in iter_collect_windows([(platforms, days, start, end)]):
+        yield platform, stats
+
+
+def iter_collect_windows(windows):
+    """
+    iter_collect_stats() for several windows in one engine run, so they
+    are all collected concurrently
+    
+    Args:
+        windows: list of (platforms, days, start, end)
+    
+    Yields:
+        tuple (index into windows, platform, stats)
+    """
+    tasks = []
+    owners = {}
+    for index, (platforms, days, start, end) in enumerate(windows):
+        window_tasks = collection_tasks(platforms, days, start, end)
+        results = PlatformResults(platforms, window_tasks)
+        for platform, stats in results.unconfigured():
+            yield index, platform, stats
+        owners.update({id(task): (index, results) for task in window_tasks})
+        tasks.extend(window_tasks)
+    
+    for task, stats in engine.run_iter(tasks):
+        index, results = owners[id(task)]
+        for platform, value in results.add(task, stats):
+            yield index, platform, value
+
+
+async def iter_collect_stats_async(platforms=None, days=7, start=None, end=None):
+    """iter_collect_stats() on the running event loop"""
+    tasks = collection_tasks(platforms, days, start, end)
+    results = PlatformResults(platforms, tasks)
+    
+    for item in results.unconfigured():
+        yield item
+    async for task, stats in engine.run_iter_async(tasks):
+        for item in results.add(task, stats):
+            yield item
+
+
+def collect_stats(platforms=None, days=7, start=None, end=None):
+    """
+    Collect stats from selected platforms
+    
+    All platforms (and every Reddit account) are collected concurrently;
+    a platform that misses its deadline comes back as a placeholder
+    marked timed_out. A platform already being collected for the same
+    window (by another request or the scheduler) is not collected twice:
+    the call waits for that collection and shares its result.
+    
+    Args:
+        platforms: list of platform names (e.g. ['reddit', 'youtube'])
+                  If None, collects from all configured platforms
+        days: number of days to look back
+        start, end: optional custom date range (inclusive dates)
+    
+    Returns:
+        dict with stats for each platform
+    """
+    return collected_results(dict(iter_collect_stats(platforms, days, start, end)), days, start, end)
+
+
+async def collect_stats_async(platforms=None, days=7, start=None, end=None):
+    """collect_stats() on the running event loop"""
+    collected = {platform: stats async for platform, stats in iter_collect_stats_async(platforms, days, start, end)}
+    return collected_results(collected, days, start, end)
+
+
+def collected_results(collected, days, start, end):
+    """collect_stats result dict from per-platform stats"""
+    start_label, end_label = date_range_labels(*get_date_range(days, start, end))
+    return {
+        'start_date': start_label,
+        'end_date': end_label,
+        'platforms': {platform: collected[platform] for platform in PLATFORMS if platform in collected}
+    }
+
+
+def is_cacheable(platform_stats):
+    """
+    Failed (errored, timed-out, rate-limited or scraped-instead) results, and
+    last good results standing in for a failed collection, are never cached,
+    so the last good entry keeps being served and the next request retries
+    """
+    def failed(stats):
+        return any(stats.get(flag) for flag in ('error', 'timed_out', 'rate_limited', 'api_failed', 'last_good'))
+    
+    if failed(platform_stats):
+        return False
+    return not any(failed(account) for account in platform_stats.get('accounts', []))
+
+
+def refresh_platform(platform, days, start=None, end=None):
+    """Re-collect one platform, returning None if the result should not be cached"""
+    # Refreshes run behind requests a dashboard page is waiting on
+    with ratelimit.priority(ratelimit.BACKGROUND):
+        value = collect_stats([platform], days, start, end)['platforms'].get(platform)
+    if value is None or not is_cacheable(value):
+        return None
+    return value
+
+
+def platform_meta(state, stored_at, ttl=None):
+    """
+    Cache state and age of one platform's data, as shown on the dashboard,
+    and when it stops being fresh (after ttl, default the cache's)
+    """
+    return {
+        'cache': state,
+        'collected_at': datetime.fromtimestamp(stored_at).isoformat(timespec='seconds'),
+        'collected_ts': int(stored_at),
+        'age_seconds': int(time.time() - stored_at),
+        'fresh_until': int(stored_at + (ttl or stats_cache.ttl))
+    }
+
+
+def iter_stats(platforms=None, days=7, start=None, end=None, collect=True):
+    """
+    Stats for the selected platforms as each becomes available
+    
+    Fresh entries are yielded first, stale entries are yielded while a
+    background thread re-collects them, and misses are collected (in
+    parallel) and yielded as each platform finishes. With collect=False
+    misses are skipped.
+    
+    Yields:
+        tuple (platform, stats, meta) where meta has the cache state and
+        age of the platform's data
+    """
+    cached, missing = lookup_cached(platforms, days, start, end)
+    yield from cached
+    
+    if missing and collect:
+        collected_at = time.time()
+        with tracing.span('collect', 'dashboard', platforms=missing):
+            for platform, value in iter_collect_stats(missing, days, start, end):
+                yield platform, value, store_collected(platform, value, collected_at, days, start, end)
+
+
+def iter_window_stats(windows):
+    """
+    iter_stats() of every platform for several day windows, collecting the
+    misses of all of them concurrently
+    
+    Yields:
+        tuple (days, platform, stats, meta)
+    """
+    missing = []
+    for days in windows:
+        cached, platforms = lookup_cached(None, days, None, None)
+        for platform, value, meta in cached:
+            yield days, platform, value, meta
+        if platforms:
+            missing.append((platforms, days, None, None))
+    
+    if missing:
+        collected_at = time.time()
+        with tracing.span('collect', 'dashboard', windows=[window[1] for window in missing]):
+            for index, platform, value in iter_collect_windows(missing):
+                days = missing[index][1]
+                yield days, platform, value, store_collected(platform, value, collected_at, days, None, None)
+
+
+async def iter_stats_async(platforms=None, days=7, start=None, end=None):
+    """
+    iter_stats() on the running event loop
+    
+    Cache lookups and writes (SQLite, snapshot files) run in a worker
+    thread, so a slow disk or a worker holding the store lock never stalls
+    the loop.
+    """
+    cached, missing = await asyncio.to_thread(lookup_cached, platforms, days, start, end)
+    for item in cached:
+        yield item
+    
+    if missing:
+        collected_at = time.time()
+        with tracing.span('collect', 'dashboard', platforms=missing):
+            async for platform, value in iter_collect_stats_async(missing, days, start, end):
+                meta = await asyncio.to_thread(store_collected, platform, value, collected_at, days, start, end)
+                yield platform, value, meta
+
+
+def lookup_cached(platforms, days, start, end):
+    """
+    Look the selected platforms up in the stats cache, starting background
+    revalidation of stale entries
+    
+    Returns:
+        tuple (list of (platform, stats, meta) for hits, list of missing platforms)
+    """
+    wanted = [p for p in (platforms or PLATFORMS) if p in PLATFORMS]
+    window = window_key(days, start, end)
+    
+    cached = []
+    missing = []
+    for platform in wanted:
+        value, state, stored_at, ttl = stats_cache.lookup((platform, window))
+        metrics.CACHE_LOOKUPS.inc(platform=platform, result=state)
+        if state == MISS:
+            missing.append(platform)
+            continue
+        if state == STALE:
+            stats_cache.revalidate(
+                (platform, window),
+                lambda p=platform: refresh_platform(p, days, start, end)
+            )
+        cached.append((platform, value, platform_meta(state, stored_at, ttl)))
+    return cached, missing
+
+
+def store_collected(platform, value, collected_at, days, start, end):
+    """
+    Cache a freshly collected result (if cacheable) and return its meta
+    
+    A result computed from a recent store sync is dated by that sync, not
+    by collected_at, so its age (and TTL) count from when it was fetched.
+    """
+    collected_at = data_time(value, collected_at)
+    if is_cacheable(value):
+        stats_cache.put((platform, window_key(days, start, end)), value, collected_at)
+    
+    # A collection failed (or its circuit is open) and the last good data stands in: show its age
+    last_good_at = [stats['last_good_at'] for stats in [value, *value.get('accounts', [])] if stats.get('last_good')]
+    if last_good_at:
+        return platform_meta(STALE, min(last_good_at))
+    return platform_meta(MISS, collected_at)
+
+
+def get_stats(platforms=None, days=7, start=None, end=None, collect=True):
+    """
+    Stats for the selected platforms, served from the cache where possible
+    (see iter_stats)
+    
+    Returns:
+        collect_stats-style dict plus a 'meta' entry with the cache state
+        and age of each platform's data; with collect=False, meta also
+        lists the 'pending' platforms that were not cached
+    """
+    wanted = [p for p in (platforms or PLATFORMS) if p in PLATFORMS]
+    start_label, end_label = date_range_labels(*get_date_range(days, start, end))
+    results = {
+        'start_date': start_label,
+        'end_date': end_label,
+        'platforms': {},
+        'meta': {'platforms': {}}
+    }
+    
+    found = {platform: (value, meta) for platform, value, meta in iter_stats(wanted, days, start, end, collect)}
+    for platform in wanted:
+        if platform not in found:
+            continue
+        results['platforms'][platform], results['meta']['platforms'][platform] = found[platform]
+    
+    if not collect:
+        results['meta']['pending'] = [platform for platform in wanted if platform not in found]
     
     return results
 
 
+def configured_platforms():
+    """Platforms that have credentials/usernames configured"""
+    start_date, end_date = get_date_range()
+    return sorted({task.platform for task in build_tasks(None, start_date, end_date)})
+
+
+def scheduler_lease():
+    """Lock file letting one worker refresh the shared cache (None for a per-process cache)"""
+    lease_dir = os.getenv('COLLECT_LEASE_DIR', os.path.join('data', 'leases'))
+    if isinstance(stats_cache, SharedStatsCache) and lease_dir:
+        return os.path.join(lease_dir, 'refresh-scheduler.lock')
+    return None
+
+
+# Keeps the cache warm so dashboard requests don't wait on the APIs
+# (REFRESH_SCHEDULER, REFRESH_WINDOWS, REFRESH_INTERVAL_<PLATFORM>)
+scheduler = RefreshScheduler(stats_cache, refresh_platform, configured_platforms, lease=scheduler_lease())
+
+
+def start_background():
+    """
+    Start the per-worker background threads: the shared /metrics flush and,
+    unless REFRESH_SCHEDULER=false, the refresh scheduler
+    
+    Called by the serving entry points (python stats.py, the gunicorn hook
+    in gunicorn.conf.py and the ASGI lifespan), never on import, so scripts
+    and benchmarks importing this module don't start calling the APIs.
+    """
+    metrics.REGISTRY.start_flushing()
+    if os.getenv('REFRESH_SCHEDULER', 'true').lower() in ('1', 'true', 'yes'):
+        scheduler.start()
+
+
+@app.template_filter('age')
+def format_age(seconds):
+    """Human readable data age, e.g. 45s, 3m, 2h"""
+    if seconds < 60:
+        return f'{seconds}s'
+    if seconds < 3600:
+        return f'{seconds // 60}m'
+    return f'{seconds // 3600}h'
+
+
+def parse_date_range(start, end):
+    """Parse custom YYYY-MM-DD start/end query params; (None, None) unless both are valid"""
+    try:
+        start = date.fromisoformat(start) if start else None
+        end = date.fromisoformat(end) if end else None
+    except ValueError:
+        return None, None
+    if not start or not end or start > end:
+        return None, None
+    return start, end
+
+
+def dashboard_args(args=None):
+    """
+    Selected platforms, days and custom start/end dates from the query string (default request.args)
+    
+    Raises:
+        werkzeug BadRequest (a 400) if days is not a whole number from 1 to MAX_DAYS
+    """
+    args = request.args if args is None else args
+    selected = args.getlist('platform')
+    try:
+        days = int(args.get('days', 7))
+    except ValueError:
+        days = 0
+    if not 1 <= days <= MAX_DAYS:
+        abort(400, description=f'days must be a whole number from 1 to {MAX_DAYS}')
+    start, end = parse_date_range(args.get('start'), args.get('end'))
+    return selected, days, start, end
+
+
 @app.route('/')
 def index():
     """Main dashboard page"""
     # Get selected platforms from query params
-    selected = request.args.getlist('platform')
-    days = int(request.args.get('days', 7))
+    selected, days, start, end = dashboard_args()
+    # ?stream=0 collects every platform before rendering (no JavaScript needed)
+    stream = request.args.get('stream') != '0'
+    
+    # ?trace=1 (or STATS_TRACE=true) writes a Chrome trace of this request
+    with tracing.request_trace(f'GET {request.full_path}', request.args.get('trace') == '1') as trace:
+        # Cached platforms are rendered right away; the page streams the rest from /api/stats
+        stats = get_stats(platforms=selected if selected else None, days=days, start=start, end=end,
+                          collect=not stream)
+        
+        # Add LinkedIn manual stats if available
+        linkedin = stats_cache.get_state('linkedin')
+        if linkedin:
+            stats['platforms']['linkedin'] = linkedin
+        
+        with tracing.span('render', 'dashboard'):
+            html = render_template('dashboard.html', 
+                                 stats=stats, 
+                                 selected=selected if selected else ['reddit', 'youtube', 'gsc', 'github'],
+                                 pending=stats['meta'].get('pending', []),
+                                 windows=DASHBOARD_WINDOWS,
+                                 days=days,
+                                 start=start,
+                                 end=end)
+    
+    response = make_response(html)
+    if trace and trace.path:
+        response.headers['X-Trace-File'] = os.path.basename(trace.path)
+    return response
+
+
+def render_card(platform, value):
+    """HTML of one platform's dashboard card(s)"""
+    return render_template(f'cards/{platform}.html', stats={'platforms': {platform: value}})
+
+
+def stream_line(platform, value, meta):
+    """One /api/stats line: a platform's stats, meta and rendered card"""
+    with tracing.span('render', 'dashboard', platform=platform):
+        html = render_card(platform, value)
+    return app.json.dumps({'platform': platform, 'stats': value, 'meta': meta, 'html': html}) + '\n'
+
+
+def stream_end(trace):
+    """Last /api/stats line, naming the trace file if the request was traced"""
+    trace_file = os.path.basename(trace.path) if trace and trace.path else None
+    return app.json.dumps({'done': True, 'trace': trace_file}) + '\n'
+
+
+@app.route('/api/stats')
+def api_stats():
+    """
+    Stream the selected platforms' stats as newline-delimited JSON
     
-    # Collect stats
-    stats = collect_stats(platforms=selected if selected else None, days=days)
+    Each platform is sent as soon as it is available - cached ones first,
+    then collections in the order they finish - as
+    {"platform", "stats", "meta", "html"} where html is its rendered card.
+    A final {"done": true, "trace": ...} line ends the stream. Takes the
+    same query parameters as the dashboard.
+    """
+    selected, days, start, end = dashboard_args()
     
-    # Add LinkedIn manual stats if available
-    if linkedin_manual_stats:
-        stats['platforms']['linkedin'] = linkedin_manual_stats
+    def generate():
+        with tracing.request_trace(f'GET {request.full_path}', request.args.get('trace') == '1') as trace:
+            for platform, value, meta in iter_stats(selected or None, days, start, end):
+                yield stream_line(platform, value, meta)
+        yield stream_end(trace)
     
-    return render_template('dashboard.html', 
-                         stats=stats, 
-                         selected=selected if selected else ['reddit', 'youtube', 'gsc', 'github'],
-                         days=days)
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    # Ask reverse proxies not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/stats/full')
+def api_stats_full():
+    """
+    Every platform's stats for every dashboard window, in one cacheable payload
+    
+    The dashboard loads this once and switches platforms and windows
+    client-side. Windows missing from the cache are collected
+    concurrently. The response carries an ETag of its content and a
+    Cache-Control max-age of the time until the first entry turns stale,
+    so the browser only comes back when the data may have changed (and
+    then usually gets a 304).
+    """
+    found = {days: {} for days in DASHBOARD_WINDOWS}
+    for days, platform, value, meta in iter_window_stats(DASHBOARD_WINDOWS):
+        found[days][platform] = (value, meta)
+    linkedin = stats_cache.get_state('linkedin')
+    
+    payload = {'windows': {}}
+    # Each entry has its own ttl (the scheduler stores them with their platform's interval)
+    fresh_until = min(
+        (meta['fresh_until'] for window in found.values() for _, meta in window.values()),
+        default=time.time() + stats_cache.ttl
+    )
+    for days in DASHBOARD_WINDOWS:
+        platforms = {}
+        for platform in PLATFORMS:
+            if platform not in found[days]:
+                continue
+            value, meta = found[days][platform]
+            # Just collected is as good as fresh; ages are computed client-side from collected_ts
+            meta = {
+                'cache': FRESH if meta['cache'] == MISS else meta['cache'],
+                'collected_at': meta['collected_at'],
+                'collected_ts': meta['collected_ts']
+            }
+            platforms[platform] = {'stats': value, 'meta': meta, 'html': render_card(platform, value)}
+        if linkedin:
+            platforms['linkedin'] = {'stats': linkedin, 'meta': None, 'html': render_card('linkedin', linkedin)}
+        
+        start_label, end_label = date_range_labels(*get_date_range(days))
+        payload['windows'][days] = {
+            'start_date': start_label,
+            'end_date': end_label,
+            'platforms': platforms
+        }
+    
+    response = jsonify(payload)
+    response.cache_control.private = True
+    response.cache_control.max_age = max(int(fresh_until - time.time()), 0)
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @app.route('/api/linkedin', methods=['POST'])
 def save_linkedin_stats():
-    """Save manually entered LinkedIn stats"""
-    global linkedin_manual_stats
-    
+    """Save manually entered LinkedIn stats (shared by all workers)"""
     data = request.get_json()
-    linkedin_manual_stats = {
+    stats_cache.set_state('linkedin', {
         'posts_count': int(data.get('posts_count', 0)),
         'likes': int(data.get('likes', 0)),
         'comments': int(data.get('comments', 0)),
@@ -204,22 +800,37 @@ def save_linkedin_stats():
         'impressions': int(data.get('impressions', 0)),
         'engagement_rate': float(data.get('engagement_rate', 0)),
         'manual': True
-    }
+    })
     
     return jsonify({'success': True, 'message': 'LinkedIn stats saved!'})
 
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Collection latency, HTTP, cache and fallback metrics in Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/health')
 def health_check():
     """Health check endpoint to verify environment variables"""
-    env_check = {
+    return jsonify(health_status())
+
+
+def health_status():
+    """Configuration, HTTP pool and rate-limit state reported by /health"""
+    return {
         'status': 'ok',
         'reddit_configured': bool(os.getenv('REDDIT_USERNAME_1')),
         'youtube_configured': bool(os.getenv('YOUTUBE_API_KEY')),
         'github_configured': bool(os.getenv('GITHUB_USERNAME')),
-        'environment': 'production' if (os.getenv('RENDER') or os.getenv('RAILWAY_ENVIRONMENT')) else 'local'
+        'environment': 'production' if (os.getenv('RENDER') or os.getenv('RAILWAY_ENVIRONMENT')) else 'local',
+        # Per-host request, new-connection and retry counts of the shared HTTP pool
+        'http': transport.host_stats(),
+        'rate_limits': ratelimit.snapshot(),
+        # Platforms and accounts whose circuit breaker is open or half-open
+        'circuits': engine.breakers.snapshot()
     }
-    return jsonify(env_check)
 
 
 if __name__ == '__main__':
@@ -238,5 +849,9 @@ if __name__ == '__main__':
     port = int(os.getenv('PORT', 5050))
     debug_mode = not is_production
     
+    # With the debug reloader only the child process serves requests
+    if not debug_mode or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background()
+    
     app.run(debug=debug_mode, host='0.0.0.0', port=port)
 
@@ -0,0 +1,89 @@
+"""Shared fixtures: offline APIs and fresh per-process state for every test"""
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fixtures import SyntheticAPIs
+from bench.replay import replay
+from collectors import ratelimit
+
+
+@pytest.fixture(autouse=True)
+def unpaced(monkeypatch):
+    """Token buckets that never make a test wait"""
+    for platform in ratelimit.DEFAULT_RATES:
+        monkeypatch.setenv(f'RATE_LIMIT_{platform.upper()}', '100000')
+    monkeypatch.setattr(ratelimit, '_buckets', {})
+    monkeypatch.setattr(ratelimit, '_state', None)
+
+
+@pytest.fixture
+def apis():
+    """Synthetic Reddit/GitHub/YouTube/GSC APIs answering every collector HTTP call"""
+    apis = SyntheticAPIs(latency=0, padding=10)
+    with replay(apis):
+        yield apis
+
+
+@pytest.fixture
+def outage(apis):
+    """URL pattern (regex) -> status: matching requests fail with that status until removed"""
+    failing = {}
+    handle = apis.handle
+    
+    def handle_or_fail(method, url, *args, **kwargs):
+        for pattern, status in failing.items():
+            if re.search(pattern, url):
+                return status, {}, {'message': 'Service Unavailable'}
+        return handle(method, url, *args, **kwargs)
+    
+    apis.handle = handle_or_fail
+    return failing
+
+
+@pytest.fixture(scope='session')
+def stats_module(tmp_path_factory):
+    """The dashboard app module, imported once with its files in a temporary directory"""
+    data = tmp_path_factory.mktemp('data')
+    os.environ.update(
+        STATS_CACHE_BACKEND='memory',
+        STATS_SNAPSHOT_DIR=str(data / 'snapshots'),
+        STATS_DB_PATH=str(data / 'stats.db'),
+        COLLECT_LEASE_DIR=str(data / 'leases'),
+        TRACE_DIR=str(data / 'traces'),
+        REFRESH_SCHEDULER='false'
+    )
+    import stats
+    
+    return stats
+
+
+@pytest.fixture
+def dashboard(stats_module, apis, monkeypatch, tmp_path):
+    """
+    The dashboard app with a fresh cache, store and engine, configured for
+    one Reddit account, GitHub and YouTube (all answered by apis)
+    """
+    from collectors import youtube_collector
+    from dashboard import CircuitBreakers, CollectionEngine, MetricsStore, SingleFlight, StatsCache
+    
+    for name in [key for key in os.environ if key.startswith(('REDDIT_USERNAME_', 'REDDIT_DISPLAY_NAME_'))]:
+        monkeypatch.delenv(name)
+    monkeypatch.setenv('REDDIT_USERNAME_1', 'spez')
+    monkeypatch.setenv('GITHUB_USERNAME', 'octocat')
+    monkeypatch.setenv('YOUTUBE_API_KEY', 'test-key')
+    monkeypatch.setenv('YOUTUBE_CHANNEL_ID', 'UCtestchannel')
+    monkeypatch.delenv('GSC_CREDENTIALS_FILE', raising=False)
+    monkeypatch.setattr(youtube_collector, 'quota', youtube_collector.QuotaLedger(daily_limit=10000))
+    monkeypatch.setattr(stats_module, 'stats_cache', StatsCache())
+    monkeypatch.setattr(stats_module, 'metrics_store', MetricsStore(str(tmp_path / 'stats.db')))
+    monkeypatch.setattr(stats_module, 'engine', CollectionEngine(
+        flights=SingleFlight(lease_dir=str(tmp_path / 'leases')),
+        breakers=CircuitBreakers()
+    ))
+    return stats_module
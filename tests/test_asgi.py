@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from collectors import async_transport
+
+
+@pytest.fixture
+def asgi_get(dashboard):
+    """GET a path from the ASGI app; returns the httpx response"""
+    import asgi
+    
+    async def get(path):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url='http://dashboard') as client:
+            response = await client.get(path)
+        await async_transport.close()
+        return response
+    
+    return lambda path: asyncio.run(get(path))
+
+
+def test_api_stats_streams_the_same_lines_as_the_flask_route(dashboard, asgi_get):
+    response = asgi_get('/api/stats?platform=reddit&platform=github&days=7')
+    
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1] == {'done': True, 'trace': None}
+    by_platform = {line['platform']: line for line in lines[:-1]}
+    assert sorted(by_platform) == ['github', 'reddit']
+    
+    # The Flask route is then served from the cache the ASGI request filled
+    flask_lines = dashboard.app.test_client().get('/api/stats?platform=reddit&platform=github&days=7').get_data(as_text=True)
+    flask_by_platform = {line['platform']: line for line in map(json.loads, flask_lines.splitlines()[:-1])}
+    assert {line['meta']['cache'] for line in flask_by_platform.values()} == {'fresh'}
+    assert flask_by_platform['github']['stats'] == by_platform['github']['stats']
+
+def test_api_stats_collects_on_the_event_loop(dashboard, apis, asgi_get):
+    asgi_get('/api/stats?platform=github&days=14')
+    
+    assert apis.calls['api.github.com'] > 0
+
+
+def test_invalid_days_is_a_bad_request(dashboard, apis, asgi_get):
+    assert asgi_get('/api/stats?days=abc').status_code == 400
+    assert not apis.calls
+
+
+def test_health_and_metrics_are_answered_on_the_loop(asgi_get):
+    health = asgi_get('/health')
+    assert health.status_code == 200
+    assert health.json()['status'] == 'ok'
+    
+    metrics = asgi_get('/metrics')
+    assert metrics.status_code == 200
+    assert metrics.headers['content-type'].startswith('text/plain')
+
+
+def test_other_routes_are_served_by_flask(dashboard, asgi_get):
+    response = asgi_get('/api/stats/full')
+    
+    assert response.status_code == 200
+    assert set(response.json()['windows']) == {'7', '14', '30'}
+    assert asgi_get('/no-such-page').status_code == 404
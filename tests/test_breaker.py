@@ -0,0 +1,117 @@
+import time
+
+from dashboard import CircuitBreakers, CollectionEngine, CollectionTask, SharedStatsCache
+from dashboard.breaker import HALF_OPEN, OPEN
+
+
+def state(breakers, key):
+    """A breaker's state as reported on /health (closed ones aren't listed)"""
+    return breakers.snapshot().get(key, {}).get('state', 'closed')
+
+
+def test_opens_after_consecutive_failures():
+    breakers = CircuitBreakers(failures=3, cooldown=60)
+    for _ in range(2):
+        breakers.record('reddit', True)
+    assert breakers.allow('reddit')
+    breakers.record('reddit', True)
+    assert state(breakers, 'reddit') == OPEN
+    assert not breakers.allow('reddit')
+    assert 'reddit' in breakers.snapshot()
+
+
+def test_success_resets_the_count():
+    breakers = CircuitBreakers(failures=2, cooldown=60)
+    breakers.record('github', True)
+    breakers.record('github', False)
+    breakers.record('github', True)
+    assert breakers.allow('github')
+    assert breakers.snapshot() == {}
+
+
+def test_half_open_probe_closes_or_reopens():
+    breakers = CircuitBreakers(failures=1, cooldown=0.05)
+    breakers.record('youtube', True)
+    assert not breakers.allow('youtube')
+    
+    time.sleep(0.06)
+    assert breakers.allow('youtube')
+    assert state(breakers, 'youtube') == HALF_OPEN
+    # Only one probe at a time
+    assert not breakers.allow('youtube')
+    breakers.record('youtube', True)
+    assert state(breakers, 'youtube') == OPEN
+    
+    time.sleep(0.06)
+    assert breakers.allow('youtube')
+    breakers.record('youtube', False)
+    assert breakers.allow('youtube')
+    assert 'youtube' not in breakers.snapshot()
+
+
+def test_fallback_is_the_last_good_result():
+    breakers = CircuitBreakers()
+    assert breakers.fallback(('gsc', 7), 'down') is None
+    breakers.remember(('gsc', 7), {'clicks': 5})
+    fallback = breakers.fallback(('gsc', 7), 'down')
+    assert fallback['clicks'] == 5
+    assert fallback['last_good'] and fallback['unavailable'] == 'down'
+
+
+def test_last_good_results_are_shared_through_the_cache(tmp_path):
+    cache = SharedStatsCache(str(tmp_path / 'cache.db'))
+    CircuitBreakers(results=cache).remember(('gsc', 7), {'clicks': 5})
+    # Another worker (or the next process) sees it
+    assert CircuitBreakers(results=cache).fallback(('gsc', 7), 'down')['clicks'] == 5
+
+
+def test_timed_out_task_is_counted_once():
+    breakers = CircuitBreakers(failures=5, cooldown=60)
+    engine = CollectionEngine(deadlines={'slow': 0.05}, breakers=breakers)
+    
+    def slow():
+        time.sleep(0.2)
+        return {'posts': 1}
+    
+    results = engine.run([CollectionTask('slow', 'slow', slow)])
+    assert results['slow']['timed_out']
+    # The abandoned thread succeeds later without counting again (which would reset the count)
+    time.sleep(0.3)
+    for _ in range(4):
+        breakers.record('slow', True)
+    assert breakers.snapshot()['slow']['failures'] == 5
+
+
+def test_engine_answers_failures_with_the_last_good_result():
+    breakers = CircuitBreakers(failures=1, cooldown=60)
+    engine = CollectionEngine(breakers=breakers)
+    calls = []
+    
+    def collect():
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError('API down')
+        return {'stars': 5}
+    
+    def run():
+        return engine.run([CollectionTask('github', 'github', collect, placeholder={'stars': 0})])['github']
+    
+    assert run() == {'stars': 5}
+    
+    failed = run()
+    assert failed['stars'] == 5 and failed['last_good'] and failed['unavailable'] == 'API down'
+    assert state(breakers, 'github') == OPEN
+    
+    # While the breaker is open the collector isn't called at all
+    skipped = run()
+    assert len(calls) == 2
+    assert skipped['stars'] == 5 and skipped['unavailable'] == 'Unavailable after repeated failures'
+
+
+def test_engine_skips_to_the_placeholder_without_a_good_result():
+    breakers = CircuitBreakers(failures=1, cooldown=60)
+    engine = CollectionEngine(breakers=breakers)
+    task = CollectionTask('gsc', 'gsc', lambda: {'clicks': 0, 'error': 'API down'}, placeholder={'clicks': 0})
+    
+    assert engine.run([task])['gsc']['error'] == 'API down'
+    assert engine.run([task])['gsc'] == {'clicks': 0, 'error': 'Unavailable after repeated failures'}
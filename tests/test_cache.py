@@ -0,0 +1,75 @@
+import threading
+import time
+
+from dashboard import FRESH, MISS, STALE, StatsCache
+
+
+def test_entries_turn_stale_then_expire():
+    cache = StatsCache(ttl=60, stale_ttl=60)
+    now = time.time()
+    cache.put('fresh', 1, stored_at=now - 30)
+    cache.put('stale', 2, stored_at=now - 90)
+    cache.put('expired', 3, stored_at=now - 150)
+    
+    assert cache.get('fresh')[:2] == (1, FRESH)
+    assert cache.get('stale')[:2] == (2, STALE)
+    assert cache.get('expired') == (None, MISS, None)
+
+
+def test_per_entry_ttl_overrides_the_default():
+    cache = StatsCache(ttl=60, stale_ttl=60)
+    cache.put('refreshed', 1, stored_at=time.time() - 90, ttl=600)
+    assert cache.get('refreshed')[1] == FRESH
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = StatsCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b')[1] == MISS
+    assert cache.get('a')[1] == FRESH and cache.get('c')[1] == FRESH
+
+
+def test_stale_entry_is_reloaded_once_in_the_background():
+    cache = StatsCache(ttl=60, stale_ttl=600)
+    cache.put('reddit', 'old', stored_at=time.time() - 90)
+    release = threading.Event()
+    loads = []
+    
+    def loader():
+        loads.append(1)
+        release.wait(5)
+        return 'new'
+    
+    assert cache.revalidate('reddit', loader)
+    # A reload already running is not started again; the stale value is still served
+    assert not cache.revalidate('reddit', loader)
+    assert cache.get('reddit')[:2] == ('old', STALE)
+    
+    release.set()
+    deadline = time.time() + 5
+    while cache.get('reddit')[0] != 'new' and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get('reddit')[:2] == ('new', FRESH)
+    assert len(loads) == 1
+
+
+def test_failed_or_empty_reload_keeps_the_stale_value():
+    cache = StatsCache(ttl=60, stale_ttl=600)
+    cache.put('github', 'old', stored_at=time.time() - 90)
+    
+    for result in (RuntimeError('API down'), None):
+        done = threading.Event()
+        
+        def loader():
+            done.set()
+            if result:
+                raise result
+            return result
+        
+        cache.revalidate('github', loader)
+        done.wait(5)
+        time.sleep(0.05)
+        assert cache.get('github')[:2] == ('old', STALE)
@@ -0,0 +1,106 @@
+import json
+import threading
+
+import pytest
+
+
+def stream_lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_api_stats_streams_every_platform_then_done(dashboard):
+    response = dashboard.app.test_client().get('/api/stats?days=7')
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = stream_lines(response)
+    assert lines[-1] == {'done': True, 'trace': None}
+    by_platform = {line['platform']: line for line in lines[:-1]}
+    assert set(by_platform) == {'reddit', 'youtube', 'gsc', 'github'}
+    assert by_platform['gsc']['stats']['error'] == 'API not configured'
+    assert by_platform['github']['stats']['username'] == 'octocat'
+    assert by_platform['github']['meta']['cache'] == 'miss'
+    assert 'octocat' in by_platform['github']['html']
+
+
+def test_api_stats_serves_the_second_request_from_the_cache(dashboard, apis):
+    client = dashboard.app.test_client()
+    client.get('/api/stats?platform=github&days=7').get_data()
+    apis.reset_calls()
+    
+    lines = stream_lines(client.get('/api/stats?platform=github&days=7'))
+    
+    assert [line['meta']['cache'] for line in lines[:-1]] == ['fresh']
+    assert not apis.calls
+
+
+def test_api_stats_honours_the_platform_filter(dashboard):
+    lines = stream_lines(dashboard.app.test_client().get('/api/stats?platform=reddit&platform=github'))
+    by_platform = {line['platform']: line['stats'] for line in lines[:-1]}
+    
+    assert sorted(by_platform) == ['github', 'reddit']
+    assert [account['username'] for account in by_platform['reddit']['accounts']] == ['spez']
+
+
+def test_dashboard_page_renders_collected_cards_without_streaming(dashboard):
+    response = dashboard.app.test_client().get('/?days=14&stream=0')
+    
+    assert response.status_code == 200
+    assert 'octocat' in response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize('days', ['abc', '', '0', '-3', '1.5', '100000'])
+@pytest.mark.parametrize('path', ['/', '/api/stats'])
+def test_invalid_days_is_a_bad_request(dashboard, apis, path, days):
+    response = dashboard.app.test_client().get(f'{path}?days={days}')
+    
+    assert response.status_code == 400
+    assert not apis.calls
+
+
+def test_full_payload_has_every_window(dashboard):
+    response = dashboard.app.test_client().get('/api/stats/full')
+    
+    assert response.status_code == 200
+    windows = response.get_json()['windows']
+    assert sorted(windows, key=int) == [str(days) for days in dashboard.DASHBOARD_WINDOWS]
+    for window in windows.values():
+        assert set(window['platforms']) == {'reddit', 'youtube', 'gsc', 'github'}
+        assert window['platforms']['github']['meta']['cache'] == 'fresh'
+    assert windows['7']['platforms']['github']['stats']['commits_count'] < windows['30']['platforms']['github']['stats']['commits_count']
+
+
+def test_full_payload_is_revalidated_with_its_etag(dashboard):
+    client = dashboard.app.test_client()
+    etag = client.get('/api/stats/full').headers['ETag']
+    
+    assert client.get('/api/stats/full', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_full_payload_max_age_follows_each_entrys_own_ttl(dashboard):
+    client = dashboard.app.test_client()
+    client.get('/api/stats/full')
+    assert client.get('/api/stats/full').cache_control.max_age > 60
+    
+    # The scheduler stores entries with their platform's refresh interval as ttl
+    value, _, stored_at = dashboard.stats_cache.get(('github', 7))
+    dashboard.stats_cache.put(('github', 7), value, stored_at, ttl=60)
+    
+    assert client.get('/api/stats/full').cache_control.max_age <= 60
+
+
+def test_full_payload_collects_the_windows_concurrently(dashboard, apis):
+    # Each window's GitHub collection fetches the profile; none gets an answer until all three ask
+    arrived = threading.Barrier(len(dashboard.DASHBOARD_WINDOWS), timeout=5)
+    handle = apis.handle
+    
+    def profile_after_all_windows(method, url, *args, **kwargs):
+        if url.endswith('/users/octocat'):
+            arrived.wait()
+        return handle(method, url, *args, **kwargs)
+    
+    apis.handle = profile_after_all_windows
+    windows = dashboard.app.test_client().get('/api/stats/full').get_json()['windows']
+    
+    assert not arrived.broken
+    assert all('error' not in window['platforms']['github']['stats'] for window in windows.values())
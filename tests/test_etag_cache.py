@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from collectors.etag_cache import ConditionalCache
+
+URL = 'https://api.github.com/users/test-user/repos?per_page=100'
+
+
+@pytest.fixture
+def sent_headers(apis):
+    """Request headers of every call, in order"""
+    sent = []
+    handle = apis.handle
+    
+    def recording(method, url, headers=None, *args, **kwargs):
+        sent.append(dict(headers or {}))
+        return handle(method, url, headers, *args, **kwargs)
+    
+    apis.handle = recording
+    return sent
+
+
+def test_304_returns_the_cached_body_and_headers(apis, sent_headers, tmp_path):
+    cache = ConditionalCache(str(tmp_path / 'etags.db'))
+    status, first, headers = cache.get_json(URL)
+    assert status == 200 and len(first) == 100
+    assert 'If-None-Match' not in sent_headers[0]
+    
+    status, second, headers = cache.get_json(URL)
+    assert sent_headers[1]['If-None-Match'] == headers['ETag']
+    # Answered 304 by the API, reported as 200 with the stored body
+    assert status == 200
+    assert second == first
+    # The Link header a 304 may omit is replayed from the cache
+    assert 'rel="next"' in headers['Link']
+
+
+def test_entries_are_shared_by_every_instance(apis, sent_headers, tmp_path):
+    path = str(tmp_path / 'etags.db')
+    ConditionalCache(path).get_json(URL)
+    status, data, _ = ConditionalCache(path).get_json(URL)
+    assert 'If-None-Match' in sent_headers[1]
+    assert status == 200 and len(data) == 100
+
+
+def test_expired_entries_are_not_revalidated(apis, sent_headers, tmp_path):
+    cache = ConditionalCache(str(tmp_path / 'etags.db'), max_age=0.01)
+    cache.get_json(URL)
+    time.sleep(0.02)
+    cache.get_json(URL)
+    assert 'If-None-Match' not in sent_headers[1]
+
+
+def test_least_recently_used_entries_are_evicted(apis, sent_headers, tmp_path):
+    cache = ConditionalCache(str(tmp_path / 'etags.db'), max_entries=2)
+    for user in ('a', 'b', 'c'):
+        cache.get_json(f'https://api.github.com/users/{user}')
+    sent_headers.clear()
+    cache.get_json('https://api.github.com/users/c')
+    cache.get_json('https://api.github.com/users/a')
+    assert 'If-None-Match' in sent_headers[0]
+    assert 'If-None-Match' not in sent_headers[1]
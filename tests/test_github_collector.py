@@ -0,0 +1,167 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from collectors import GitHubCollector, YouTubeCollector
+from collectors.etag_cache import ConditionalCache
+from dashboard import MetricsStore
+
+USER = 'octocat'
+CHANNEL = 'UCtestchannel'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricsStore(str(tmp_path / 'stats.db'), sync_ttl=0)
+
+
+def window():
+    end = datetime.now()
+    return end - timedelta(days=7), end
+
+
+def github(store, tmp_path):
+    return GitHubCollector(USER, store=store, etag_cache=ConditionalCache(str(tmp_path / 'etags.db')))
+
+
+@pytest.mark.parametrize('failing', [f'/users/{USER}$', f'/users/{USER}/repos', f'/users/{USER}/events'])
+def test_failed_github_call_is_an_error_and_keeps_the_last_profile(apis, outage, store, tmp_path, failing):
+    collector = github(store, tmp_path)
+    good = collector.collect(*window())
+    assert good['followers'] == 120 and good['total_stars'] > 0
+    synced_at = store.synced_at('github', USER)
+    
+    outage[failing] = 403
+    failed = collector.collect(*window())
+    assert failed['error']
+    assert store.get_profile('github', USER)['followers'] == 120
+    assert store.synced_at('github', USER) == synced_at
+    
+    del outage[failing]
+    assert collector.collect(*window())['total_stars'] == good['total_stars']
+
+
+def test_failed_github_call_is_an_error_in_the_async_mode(apis, outage, store, tmp_path):
+    collector = github(store, tmp_path)
+    asyncio.run(collector.collect_async(*window()))
+    
+    outage[f'/users/{USER}/repos'] = 403
+    failed = asyncio.run(collector.collect_async(*window()))
+    assert failed['error']
+    assert store.get_profile('github', USER)['total_stars'] > 0
+
+
+def test_failed_later_page_fails_the_collection(apis, outage, store, tmp_path):
+    outage[r'/repos\?per_page=100&page=2'] = 403
+    assert github(store, tmp_path).collect(*window())['error']
+    assert store.synced_at('github', USER) is None
+
+
+def test_failed_channel_stats_keep_the_stored_youtube_profile(apis, outage, store):
+    collector = YouTubeCollector('key', CHANNEL, store=store)
+    assert collector.collect(*window())['subscribers'] == 1500
+    synced_at = store.synced_at('youtube', CHANNEL)
+    
+    outage['/channels'] = 403
+    failed = collector.collect(*window())
+    assert failed['api_failed']
+    assert store.get_profile('youtube', CHANNEL)['subscribers'] == 1500
+    assert store.synced_at('youtube', CHANNEL) == synced_at
+
+
+@pytest.fixture
+def github_pages(apis):
+    """(path, page) of every GitHub REST call, in order"""
+    pages = []
+    handle = apis.handle
+    
+    def recording(method, url, *args, **kwargs):
+        parsed = urlparse(url)
+        if parsed.hostname == 'api.github.com':
+            pages.append((parsed.path, int(parse_qs(parsed.query).get('page', ['1'])[0])))
+        return handle(method, url, *args, **kwargs)
+    
+    apis.handle = recording
+    return pages
+
+
+def test_every_repository_page_is_counted(apis, github_pages, tmp_path):
+    _, _, repos = apis.handle('GET', f'https://api.github.com/users/{USER}/repos?per_page=1000')
+    github_pages.clear()
+    stats = github(None, tmp_path).collect(*window())
+    assert [page for path, page in github_pages if path.endswith('/repos')] == [1, 2]
+    assert stats['total_stars'] == sum(repo['stargazers_count'] for repo in repos)
+    assert stats['total_forks'] == sum(repo['forks_count'] for repo in repos)
+
+
+def test_event_pages_stop_once_the_window_is_covered(apis, github_pages, tmp_path):
+    # The first page of events already reaches back past a 7-day window
+    github(None, tmp_path).collect(*window())
+    assert [page for path, page in github_pages if path.endswith('/events')] == [1]
+
+
+def test_partial_day_sync_never_lowers_a_days_commits(store):
+    def push(hour, commits):
+        return {
+            'id': f'push-{hour}',
+            'type': 'PushEvent',
+            'repo': {'name': f'{USER}/repo'},
+            'created_at': f'2026-03-02T{hour:02d}:00:00Z',
+            'payload': {'commits': [{}] * commits}
+        }
+    
+    def day_commits():
+        return sum(event['commits'] for event in store.github_events(USER, datetime(2026, 3, 1), datetime(2026, 3, 4)))
+    
+    store.record_github_events(USER, [push(9, 2), push(15, 3)])
+    assert day_commits() == 5
+    # A later sync starting at noon only sees the afternoon push
+    store.record_github_events(USER, [push(15, 3)])
+    assert day_commits() == 5
+    # New pushes of the day are still added
+    store.record_github_events(USER, [push(9, 2), push(15, 3), push(20, 1)])
+    assert day_commits() == 6
+
+
+@pytest.fixture
+def graphql_requests(apis):
+    """Bodies of the GraphQL requests, in order"""
+    requests = []
+    handle = apis.handle
+    
+    def recording(method, url, headers=None, body=None, *args, **kwargs):
+        if urlparse(url).path == '/graphql':
+            requests.append(json.loads(body))
+        return handle(method, url, headers, body, *args, **kwargs)
+    
+    apis.handle = recording
+    return requests
+
+
+def test_graphql_mode_matches_the_rest_mode(apis, graphql_requests, tmp_path):
+    rest = GitHubCollector(USER, etag_cache=ConditionalCache(str(tmp_path / 'etags.db'))).collect(*window())
+    graphql = GitHubCollector(USER, mode='graphql').collect(*window())
+    for field in ('public_repos', 'followers', 'following', 'total_stars', 'total_forks', 'commits_count'):
+        assert graphql[field] == rest[field]
+    # One query for the profile and commits, one more per further 100 repositories
+    assert len(graphql_requests) == 2
+    assert 'contributionsCollection' in graphql_requests[0]['query']
+    assert graphql_requests[1]['variables']['cursor']
+
+
+def test_graphql_and_rest_syncs_never_count_a_commit_twice(apis, tmp_path):
+    store = MetricsStore(str(tmp_path / 'stats.db'), sync_ttl=0)
+    rest = github(store, tmp_path).collect(*window())
+    graphql = GitHubCollector(USER, store=store, mode='graphql').collect(*window())
+    assert graphql['commits_count'] == rest['commits_count'] > 0
+    assert github(store, tmp_path).collect(*window())['commits_count'] == rest['commits_count']
+
+
+def test_graphql_errors_are_reported(apis, outage, store):
+    outage['/graphql'] = 401
+    stats = GitHubCollector(USER, store=store, mode='graphql').collect(*window())
+    assert stats['error']
+    assert store.synced_at('github', USER) is None
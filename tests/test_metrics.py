@@ -0,0 +1,73 @@
+import pytest
+
+from collectors.metrics import Counter, Gauge, Histogram, Registry
+
+
+def sample_lines(registry):
+    return [line for line in registry.render().splitlines() if not line.startswith('#')]
+
+
+def test_counter_renders_labelled_samples():
+    registry = Registry()
+    requests = Counter('http_requests_total', 'Requests', ['host', 'status'], registry=registry)
+    requests.inc(host='api.github.com', status=200)
+    requests.inc(2, host='api.github.com', status=200)
+    requests.inc(host='say "hi"', status=500)
+    
+    text = registry.render()
+    assert '# TYPE http_requests_total counter' in text
+    assert 'http_requests_total{host="api.github.com",status="200"} 3' in text
+    assert 'http_requests_total{host="say \\"hi\\"",status="500"} 1' in text
+
+
+def test_labels_must_match_the_declared_names():
+    counter = Counter('events_total', 'Events', ['platform'], registry=Registry())
+    with pytest.raises(ValueError):
+        counter.inc(host='reddit')
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = Histogram('collect_seconds', 'Latency', ['platform'], registry=registry, buckets=(1, 5))
+    for seconds in (0.5, 2, 7):
+        latency.observe(seconds, platform='reddit')
+    
+    assert sample_lines(registry) == [
+        'collect_seconds_bucket{platform="reddit",le="1"} 1',
+        'collect_seconds_bucket{platform="reddit",le="5"} 2',
+        'collect_seconds_bucket{platform="reddit",le="+Inf"} 3',
+        'collect_seconds_sum{platform="reddit"} 9.5',
+        'collect_seconds_count{platform="reddit"} 3'
+    ]
+
+
+def worker(path):
+    """One worker process's registry, sharing totals through path"""
+    registry = Registry()
+    registry.share(path)
+    return registry, {
+        'counter': Counter('collections_total', 'Collections', ['platform'], registry=registry),
+        'gauge': Gauge('last_success', 'Last success', ['platform'], registry=registry),
+        'histogram': Histogram('collect_seconds', 'Latency', ['platform'], registry=registry, buckets=(1,))
+    }
+
+
+def test_shared_registries_report_the_totals_of_every_worker(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    (first, a), (second, b) = worker(path), worker(path)
+    a['counter'].inc(2, platform='reddit')
+    b['counter'].inc(3, platform='reddit')
+    a['histogram'].observe(0.5, platform='reddit')
+    b['histogram'].observe(4, platform='reddit')
+    a['gauge'].set(100, platform='reddit')
+    second.flush()
+    b['gauge'].set(200, platform='reddit')
+    
+    for registry in (first, second, first):
+        lines = sample_lines(registry)
+        # Flushing again (every render flushes) adds nothing twice
+        assert 'collections_total{platform="reddit"} 5' in lines
+        assert 'collect_seconds_count{platform="reddit"} 2' in lines
+        assert 'collect_seconds_bucket{platform="reddit",le="1"} 1' in lines
+    # Gauges keep the last value written
+    assert 'last_success{platform="reddit"} 200' in sample_lines(second)
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+from collectors.ratelimit import BACKGROUND, INTERACTIVE, BUCKET_SCHEMA, RateLimited, TokenBucket
+from collectors.shared_state import SharedState
+
+
+def reset_in(seconds):
+    return str(time.time() + seconds)
+
+
+def test_burst_then_paced():
+    bucket = TokenBucket('test', rate=50, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [False] * 3
+    started = time.perf_counter()
+    assert bucket.acquire()
+    assert time.perf_counter() - started >= 0.01
+
+
+def test_reported_budget_is_spread_until_the_reset():
+    bucket = TokenBucket('test', rate=1, reserve=1)
+    bucket.update({'X-RateLimit-Remaining': '101', 'X-RateLimit-Reset': reset_in(50)})
+    assert bucket.snapshot()['rate'] == pytest.approx(2, rel=0.01)
+    assert bucket.snapshot()['remaining'] == 101
+
+
+def test_exhausted_budget_fails_fast():
+    bucket = TokenBucket('test', rate=1)
+    bucket.update({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset_in(3600)})
+    with pytest.raises(RateLimited):
+        bucket.acquire()
+
+
+def test_reserve_is_kept_for_interactive_requests():
+    bucket = TokenBucket('test', rate=1, reserve=1)
+    bucket.update({'X-RateLimit-Remaining': '1', 'X-RateLimit-Reset': reset_in(3600)})
+    with pytest.raises(RateLimited):
+        bucket.acquire(BACKGROUND)
+    assert bucket.acquire(INTERACTIVE) is False
+
+
+def test_reddit_reset_is_seconds_from_now():
+    bucket = TokenBucket('reddit', rate=1)
+    bucket.update(CaseInsensitiveDict({'x-ratelimit-remaining': '10', 'x-ratelimit-reset': '60'}))
+    assert 55 <= bucket.snapshot()['reset_in'] <= 60
+
+
+def test_shared_bucket_is_one_budget_for_every_process(tmp_path):
+    state = SharedState(str(tmp_path / 'cache.db'), BUCKET_SCHEMA)
+    # Two workers' buckets for the same platform
+    first = TokenBucket('github', rate=0.001, capacity=2, state=state)
+    second = TokenBucket('github', rate=0.001, capacity=2, state=state)
+    first.acquire()
+    second.acquire()
+    with pytest.raises(RateLimited):
+        first.acquire()
+    
+    second.update({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset_in(3600)})
+    assert first.snapshot()['remaining'] == 0
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from collectors import RedditCollector
+from dashboard import MetricsStore
+
+USER = 'test_user'
+LISTING = f'https://www.reddit.com/user/{USER}/submitted.json'
+
+
+@pytest.fixture
+def listing_pages(apis):
+    """Query strings of the submitted-listing pages requested, in order"""
+    pages = []
+    handle = apis.handle
+    
+    def recording(method, url, *args, **kwargs):
+        if urlparse(url).path.endswith('/submitted.json'):
+            pages.append(parse_qs(urlparse(url).query))
+        return handle(method, url, *args, **kwargs)
+    
+    apis.handle = recording
+    return pages
+
+
+@pytest.fixture
+def new_posts(apis):
+    """Number of new submissions to put at the top of the listing"""
+    added = {'count': 0}
+    handle = apis.handle
+    
+    def with_new_posts(method, url, *args, **kwargs):
+        status, headers, body = handle(method, url, *args, **kwargs)
+        if urlparse(url).path.endswith('/submitted.json') and 'after=' not in url and added['count']:
+            children = body['data']['children']
+            newest = children[0]['data']
+            children[:0] = [
+                {'kind': 't3', 'data': dict(newest, name=f't3_new{i}', id=f'new{i}',
+                                            created_utc=newest['created_utc'] + 60 * (added['count'] - i))}
+                for i in range(added['count'])
+            ]
+        return status, headers, body
+    
+    apis.handle = with_new_posts
+    return added
+
+
+def newest_listed(apis):
+    _, _, body = apis.handle('GET', LISTING)
+    return body['data']['children'][0]['data']['created_utc']
+
+
+def collect(store):
+    end = datetime.now()
+    return RedditCollector(USER, store=store).collect(end - timedelta(days=7), end)
+
+
+def test_first_sync_follows_the_after_cursor(apis, listing_pages, tmp_path):
+    store = MetricsStore(str(tmp_path / 'stats.db'), sync_ttl=0)
+    collect(store)
+    assert len(listing_pages) > 1
+    assert 'after' not in listing_pages[0]
+    assert all('after' in page for page in listing_pages[1:])
+
+
+def test_resync_stops_at_the_high_water_mark(apis, listing_pages, tmp_path):
+    store = MetricsStore(str(tmp_path / 'stats.db'), sync_ttl=0)
+    first = collect(store)
+    newest = store.reddit_high_water(USER)
+    assert newest == newest_listed(apis)
+    
+    listing_pages.clear()
+    second = collect(store)
+    # The first page already reaches the newest stored submission
+    assert len(listing_pages) == 1
+    assert second['posts_count'] == first['posts_count']
+    assert store.reddit_high_water(USER) == newest
+
+
+def test_new_submissions_above_the_mark_are_added(apis, listing_pages, new_posts, tmp_path):
+    store = MetricsStore(str(tmp_path / 'stats.db'), sync_ttl=0)
+    first = collect(store)
+    
+    new_posts['count'] = 2
+    listing_pages.clear()
+    second = collect(store)
+    assert len(listing_pages) == 1
+    assert second['posts_count'] == first['posts_count'] + 2
+    assert store.reddit_high_water(USER) == newest_listed(apis)
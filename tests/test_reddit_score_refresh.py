@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from collectors import RedditCollector, RedditScoreRefresher
+from dashboard import MetricsStore
+
+USERS = ['user_a', 'user_b']
+
+
+@pytest.fixture
+def info_batches(apis):
+    """Fullnames asked for by each /api/info call"""
+    batches = []
+    handle = apis.handle
+    
+    def recording(method, url, *args, **kwargs):
+        if urlparse(url).path == '/api/info.json':
+            batches.append(parse_qs(urlparse(url).query)['id'][0].split(','))
+        return handle(method, url, *args, **kwargs)
+    
+    apis.handle = recording
+    return batches
+
+
+def collect_all(store, refresher=None):
+    end = datetime.now()
+    start = end - timedelta(days=30)
+    return {
+        user: RedditCollector(user, store=store, score_refresher=refresher).collect(start, end)
+        for user in USERS
+    }
+
+
+def test_known_scores_are_refreshed_in_shared_batches(apis, info_batches, tmp_path):
+    store = MetricsStore(str(tmp_path / 'stats.db'), sync_ttl=0)
+    first = collect_all(store)
+    assert not info_batches
+    
+    second = collect_all(store, RedditScoreRefresher(store, USERS))
+    refreshed = [fullname for batch in info_batches for fullname in batch]
+    known = sum(len(store.reddit_post_ids([user], datetime.now() - timedelta(days=30))) for user in USERS)
+    # Every stored post of both accounts once, at most 100 per call
+    assert len(refreshed) == len(set(refreshed)) >= known
+    assert all(len(batch) <= 100 for batch in info_batches)
+    assert len(info_batches) == -(-len(refreshed) // 100)
+    
+    # The fixture's /api/info answers every score one higher. The first account's
+    # refresh covers both; the second account's listing page then re-reads its
+    # newest posts at their listed scores
+    assert second['user_a']['karma'] == first['user_a']['karma'] + first['user_a']['posts_count']
+    assert second['user_b']['karma'] > first['user_b']['karma']
+
+
+def test_each_refresher_refreshes_a_post_once(apis, info_batches, tmp_path):
+    store = MetricsStore(str(tmp_path / 'stats.db'), sync_ttl=0)
+    collect_all(store)
+    refresher = RedditScoreRefresher(store, USERS)
+    collect_all(store, refresher)
+    calls = len(info_batches)
+    collect_all(store, refresher)
+    assert len(info_batches) == calls
@@ -0,0 +1,51 @@
+from datetime import date, datetime, timedelta
+
+from collectors import RedditCollector
+from collectors.utils import window_days
+from dashboard import MetricsStore
+from dashboard.rollups import DailyRollup
+
+
+def make_rollup():
+    rows = [
+        ('2026-03-01', {'posts': 1, 'score': 10}),
+        ('2026-03-02', {'posts': 2, 'score': 20}),
+        ('2026-03-03', {'posts': 4, 'score': 40}),
+        ('2026-03-05', {'posts': 8, 'score': 80})
+    ]
+    return DailyRollup.from_rows(rows, ['posts', 'score'], last_day=date(2026, 3, 6))
+
+
+def test_n_day_range_sums_n_buckets():
+    # 18:30 on the 1st to 18:30 on the 3rd is two days: the 2nd and the 3rd
+    totals = make_rollup().between(datetime(2026, 3, 1, 18, 30), datetime(2026, 3, 3, 18, 30))
+    assert totals == {'posts': 6, 'score': 60}
+
+
+def test_window_days_ends_with_the_day_of_the_last_instant():
+    end = datetime(2026, 3, 10, 9, 15)
+    assert window_days(end - timedelta(days=7), end) == (date(2026, 3, 4), date(2026, 3, 10))
+    # A partial day counts as a whole one
+    assert window_days(end - timedelta(days=6, hours=1), end) == (date(2026, 3, 4), date(2026, 3, 10))
+
+
+def test_between_end_is_exclusive_at_midnight():
+    totals = make_rollup().between(datetime(2026, 3, 1), datetime(2026, 3, 3))
+    assert totals == {'posts': 3, 'score': 30}
+
+
+def test_between_clamps_to_the_stored_days():
+    rollup = make_rollup()
+    assert rollup.between(datetime(2026, 1, 1), datetime(2026, 12, 31)) == {'posts': 15, 'score': 150}
+    assert rollup.between(datetime(2025, 1, 1), datetime(2025, 2, 1)) == {'posts': 0, 'score': 0}
+
+
+def test_store_and_live_collection_count_the_same_window(apis, tmp_path):
+    store = MetricsStore(str(tmp_path / 'stats.db'))
+    end = datetime.now()
+    for days in (7, 14, 30):
+        start = end - timedelta(days=days)
+        from_store = RedditCollector('test_user', store=store).collect(start, end)
+        live = RedditCollector('test_user').collect(start, end)
+        assert from_store['posts_count'] == live['posts_count']
+        assert from_store['karma'] == live['karma']
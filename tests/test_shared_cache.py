@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from collectors.youtube_collector import QuotaExceeded, QuotaLedger
+from dashboard import FRESH, MISS, STALE, RefreshScheduler, SharedStatsCache
+from dashboard import scheduler as scheduler_module
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two caches on one SQLite file, standing in for two gunicorn workers"""
+    path = str(tmp_path / 'cache.db')
+    return SharedStatsCache(path, ttl=60, stale_ttl=600), SharedStatsCache(path, ttl=60, stale_ttl=600)
+
+
+def test_entries_stored_by_one_worker_are_served_by_another(workers):
+    first, second = workers
+    first.put(('reddit', 7), {'posts': 3})
+    assert second.get(('reddit', 7))[:2] == ({'posts': 3}, FRESH)
+    
+    first.put(('reddit', 7), {'posts': 4}, stored_at=time.time() - 90)
+    assert second.get(('reddit', 7))[:2] == ({'posts': 4}, STALE)
+    
+    first.clear()
+    assert second.get(('reddit', 7)) == (None, MISS, None)
+
+
+def test_state_is_shared(workers):
+    first, second = workers
+    first.set_state('linkedin', {'followers': 10})
+    assert second.get_state('linkedin') == {'followers': 10}
+    assert second.get_state('missing', 'default') == 'default'
+
+
+def test_entries_stored_longest_ago_are_evicted(tmp_path):
+    cache = SharedStatsCache(str(tmp_path / 'cache.db'), max_entries=2)
+    now = time.time()
+    cache.put('a', 1, stored_at=now - 30)
+    cache.put('b', 2, stored_at=now - 20)
+    cache.put('c', 3, stored_at=now - 10)
+    
+    assert cache.get('a')[1] == MISS
+    assert cache.get('b')[1] == FRESH and cache.get('c')[1] == FRESH
+
+
+def test_only_one_worker_revalidates_a_stale_entry(workers):
+    first, second = workers
+    first.put('github', 'old', stored_at=time.time() - 90)
+    release = threading.Event()
+    
+    def loader():
+        release.wait(5)
+        return 'new'
+    
+    assert first.revalidate('github', loader)
+    assert not second.revalidate('github', lambda: 'other')
+    
+    release.set()
+    deadline = time.time() + 5
+    while second.get('github')[0] != 'new' and time.time() < deadline:
+        time.sleep(0.01)
+    assert second.get('github')[:2] == ('new', FRESH)
+
+
+def test_youtube_quota_is_one_budget_for_every_worker(tmp_path):
+    first, second = QuotaLedger(daily_limit=150), QuotaLedger(daily_limit=150)
+    for ledger in (first, second):
+        ledger.share(str(tmp_path / 'cache.db'))
+    
+    first.spend(100)
+    assert second.spent_today() == 100
+    with pytest.raises(QuotaExceeded):
+        second.spend(100)
+
+
+def test_one_worker_runs_the_scheduler_and_another_takes_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler_module, 'LEASE_RETRY', 0.05)
+    lease = str(tmp_path / 'leases' / 'refresh-scheduler.lock')
+    refreshed = {'first': [], 'second': []}
+    
+    def scheduler(name):
+        def refresh(platform, days):
+            refreshed[name].append((platform, days))
+            return {'platform': platform}
+        return RefreshScheduler(SharedStatsCache(str(tmp_path / 'cache.db')), refresh, lambda: ['github'],
+                                intervals={'github': 3600}, windows=[7], lease=lease)
+    
+    def wait_for(name):
+        deadline = time.time() + 5
+        while not refreshed[name] and time.time() < deadline:
+            time.sleep(0.01)
+    
+    first, second = scheduler('first'), scheduler('second')
+    first.start()
+    wait_for('first')
+    second.start()
+    time.sleep(0.2)
+    assert refreshed == {'first': [('github', 7)], 'second': []}
+    
+    # The lease is released when the holder stops (or its process exits)
+    first.stop()
+    wait_for('second')
+    second.stop()
+    assert refreshed['second'] == [('github', 7)]
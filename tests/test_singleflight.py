@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from dashboard import CircuitBreakers, CollectionEngine, CollectionTask
+from dashboard.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight(lease_dir='')
+    calls = []
+    release = threading.Event()
+    results = []
+    
+    def collect():
+        calls.append(1)
+        release.wait(5)
+        return {'posts': 3}
+    
+    def caller():
+        results.append(flights.run(('reddit', 7), collect))
+    
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    # Every caller gets its own copy
+    values = [value for value, _ in results]
+    assert all(value == {'posts': 3} for value in values)
+    assert len({id(value) for value in values}) == 5
+
+
+def test_async_callers_share_one_call():
+    flights = SingleFlight(lease_dir='')
+    calls = []
+    
+    async def collect():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'views': 10}
+    
+    async def main():
+        return await asyncio.gather(*(flights.run_async(('youtube', 7), collect) for _ in range(4)))
+    
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [shared for _, shared in results].count(False) == 1
+
+
+def test_error_reaches_every_waiting_caller():
+    flights = SingleFlight(lease_dir='')
+    release = threading.Event()
+    errors = []
+    
+    def collect():
+        release.wait(5)
+        raise ValueError('API down')
+    
+    def caller():
+        with pytest.raises(ValueError):
+            flights.run('github', collect)
+        errors.append(1)
+    
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(errors) == 3
+
+
+def test_sequential_calls_are_not_shared():
+    flights = SingleFlight(lease_dir='')
+    assert flights.run('gsc', lambda: 1) == (1, False)
+    assert flights.run('gsc', lambda: 2) == (2, False)
+
+
+
+def test_lease_files_are_removed_once_released(tmp_path):
+    flights = SingleFlight(lease_dir=str(tmp_path))
+    
+    async def collect():
+        return 2
+    
+    for days in (7, 14, 30):
+        assert flights.run(('reddit:spez', days), lambda: 1) == (1, False)
+        assert asyncio.run(flights.run_async(('github', days), collect)) == (2, False)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_worker_waits_for_another_workers_lease(tmp_path):
+    # Two instances on one lease directory stand in for two gunicorn workers
+    first, second = SingleFlight(lease_dir=str(tmp_path)), SingleFlight(lease_dir=str(tmp_path))
+    running = threading.Event()
+    release = threading.Event()
+    order = []
+    
+    def slow():
+        running.set()
+        release.wait(5)
+        order.append('first')
+        return 1
+    
+    def fast():
+        order.append('second')
+        return 2
+    
+    thread = threading.Thread(target=first.run, args=('gsc', slow))
+    thread.start()
+    running.wait(5)
+    waiting = threading.Thread(target=second.run, args=('gsc', fast))
+    waiting.start()
+    time.sleep(0.1)
+    assert order == []
+    
+    release.set()
+    thread.join(5)
+    waiting.join(5)
+    assert order == ['first', 'second']
+    assert list(tmp_path.iterdir()) == []
+    # A worker arriving after the lease file was removed takes a new one
+    assert SingleFlight(lease_dir=str(tmp_path)).run('gsc', lambda: 3) == (3, False)
+
+
+def failing_tasks(count, delay=0.2):
+    def collect():
+        time.sleep(delay)
+        raise RuntimeError('API down')
+    
+    async def collect_async():
+        await asyncio.sleep(delay)
+        raise RuntimeError('API down')
+    
+    return [
+        CollectionTask('github', 'github', collect, async_func=collect_async, flight_key=('github', 7))
+        for _ in range(count)
+    ]
+
+
+def test_callers_sharing_a_failed_collection_count_it_once(tmp_path):
+    breakers = CircuitBreakers(failures=2, cooldown=60)
+    engine = CollectionEngine(flights=SingleFlight(lease_dir=str(tmp_path)), breakers=breakers)
+    
+    results = engine.run_iter(failing_tasks(3))
+    assert [result['error'] for _, result in results] == ['API down'] * 3
+    assert breakers.snapshot() == {} and breakers.allow('github')
+    
+    engine.run(failing_tasks(1, delay=0))
+    assert breakers.snapshot()['github']['failures'] == 2
+
+
+def test_coroutines_sharing_a_failed_collection_count_it_once(tmp_path):
+    breakers = CircuitBreakers(failures=2, cooldown=60)
+    engine = CollectionEngine(flights=SingleFlight(lease_dir=str(tmp_path)), breakers=breakers)
+    
+    results = asyncio.run(engine.run_async(failing_tasks(3)))
+    assert results['github']['error'] == 'API down'
+    assert breakers.snapshot() == {} and breakers.allow('github')
+    
+    asyncio.run(engine.run_async(failing_tasks(1, delay=0)))
+    assert breakers.snapshot()['github']['failures'] == 2
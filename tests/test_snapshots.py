@@ -0,0 +1,74 @@
+import time
+
+from dashboard import FRESH, MISS, STALE, SharedStatsCache, SnapshotStore, StatsCache
+
+
+def test_snapshots_seed_a_new_process_with_their_real_age(tmp_path):
+    snapshots = SnapshotStore(str(tmp_path))
+    now = time.time()
+    before = StatsCache(ttl=60, stale_ttl=600, snapshots=snapshots)
+    before.put(('reddit', 7), {'posts': 3}, stored_at=now - 30)
+    before.put(('github', 7), {'stars': 5}, stored_at=now - 90)
+    before.put(('gsc', 7), {'clicks': 1}, stored_at=now - 1000)
+    
+    after = StatsCache(ttl=60, stale_ttl=600, snapshots=snapshots)
+    assert after.warm_start() == 2
+    assert after.get(('reddit', 7)) == ({'posts': 3}, FRESH, now - 30)
+    assert after.get(('github', 7)) == ({'stars': 5}, STALE, now - 90)
+    # Too old to serve even as stale
+    assert after.get(('gsc', 7)) == (None, MISS, None)
+
+
+def test_snapshots_keep_their_own_ttl(tmp_path):
+    snapshots = SnapshotStore(str(tmp_path))
+    StatsCache(ttl=60, snapshots=snapshots).put(('youtube', 30), {'views': 9}, stored_at=time.time() - 900, ttl=1800)
+    
+    after = StatsCache(ttl=60, stale_ttl=600, snapshots=snapshots)
+    after.warm_start()
+    assert after.get(('youtube', 30))[:2] == ({'views': 9}, FRESH)
+
+
+def test_newer_entries_are_not_replaced_by_snapshots(tmp_path):
+    snapshots = SnapshotStore(str(tmp_path))
+    StatsCache(snapshots=snapshots).put(('reddit', 7), 'old', stored_at=time.time() - 30)
+    
+    cache = StatsCache(snapshots=snapshots)
+    cache.put(('reddit', 7), 'new')
+    assert cache.load_snapshots() == 0
+    assert cache.get(('reddit', 7))[0] == 'new'
+
+
+def test_only_the_newest_snapshots_are_kept_and_bad_files_skipped(tmp_path):
+    snapshots = SnapshotStore(str(tmp_path), max_files=2)
+    for days in (7, 14, 30):
+        snapshots.save(('reddit', days), {'days': days}, time.time(), 60)
+        time.sleep(0.01)
+    (tmp_path / 'torn.json').write_text('{"key": ')
+    
+    assert sorted(key for key, _, _, _ in snapshots.load()) == [('reddit', 14), ('reddit', 30)]
+
+
+def test_sqlite_warm_start_serves_entries_without_reviving_old_ones(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    now = time.time()
+    before = SharedStatsCache(path, ttl=60, stale_ttl=600)
+    before.put(('reddit', 7), {'posts': 3}, stored_at=now - 30)
+    before.put(('github', 7), {'stars': 5}, stored_at=now - 90)
+    before.put(('gsc', 7), {'clicks': 1}, stored_at=now - 1000)
+    
+    worker = SharedStatsCache(path, ttl=60, stale_ttl=600)
+    assert worker.warm_start() == 2
+    assert worker.get(('reddit', 7)) == ({'posts': 3}, FRESH, now - 30)
+    assert worker.get(('github', 7)) == ({'stars': 5}, STALE, now - 90)
+    assert worker.get(('gsc', 7)) == (None, MISS, None)
+
+
+def test_sqlite_warm_start_leaves_the_shared_entries_alone(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    running = SharedStatsCache(path, ttl=60, stale_ttl=600)
+    running.put(('github', 7), {'stars': 5}, stored_at=time.time() - 90)
+    
+    # Another worker starting up doesn't change what the running one serves
+    SharedStatsCache(path, ttl=3600, stale_ttl=0).warm_start()
+    _, state, _, ttl = running.lookup(('github', 7))
+    assert (state, ttl) == (STALE, 60)
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from collectors import async_transport, transport
+
+URL = 'https://api.github.com/users/octocat'
+
+
+@pytest.fixture(autouse=True)
+def quick_backoff(monkeypatch):
+    monkeypatch.setattr(transport, 'BACKOFF_BASE', 0.001)
+
+
+@pytest.fixture
+def answers(apis):
+    """(status, headers) answers given before the fixture APIs answer, and the number of calls"""
+    queued = []
+    calls = []
+    handle = apis.handle
+    
+    def scripted(method, url, *args, **kwargs):
+        calls.append(url)
+        if queued:
+            status, headers = queued.pop(0)
+            return status, headers, {'message': 'scripted'}
+        return handle(method, url, *args, **kwargs)
+    
+    apis.handle = scripted
+    return queued, calls
+
+
+def retries():
+    return transport.host_stats().get('api.github.com', {}).get('retries', 0)
+
+
+def test_server_errors_are_retried(answers):
+    queued, calls = answers
+    queued.extend([(503, {}), (502, {})])
+    before = retries()
+    response = transport.get(URL)
+    assert response.status_code == 200 and response.json()['login'] == 'octocat'
+    assert len(calls) == 3
+    assert retries() == before + 2
+
+
+def test_client_errors_are_not_retried(answers):
+    queued, calls = answers
+    queued.append((404, {}))
+    assert transport.get(URL).status_code == 404
+    assert len(calls) == 1
+
+
+def test_retries_give_up_after_the_limit(answers):
+    queued, calls = answers
+    queued.extend([(500, {})] * 5)
+    assert transport.get(URL, retries=2).status_code == 500
+    assert len(calls) == 3
+
+
+def test_long_retry_after_is_not_waited_for(answers):
+    queued, calls = answers
+    queued.append((429, {'Retry-After': str(transport.BACKOFF_MAX + 1)}))
+    assert transport.get(URL).status_code == 429
+    assert len(calls) == 1
+
+
+def test_short_retry_after_is_honoured(answers):
+    queued, calls = answers
+    queued.append((429, {'Retry-After': '0'}))
+    assert transport.get(URL).status_code == 200
+    assert len(calls) == 2
+
+
+def test_async_transport_retries_the_same_way(answers):
+    queued, calls = answers
+    queued.extend([(503, {}), (504, {})])
+    response = asyncio.run(async_transport.get(URL))
+    assert response.status_code == 200
+    assert len(calls) == 3
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from collectors import YouTubeCollector, youtube_collector
+from collectors.youtube_collector import VIDEOS_BATCH_SIZE, QuotaLedger
+
+
+@pytest.fixture(autouse=True)
+def fresh_quota(monkeypatch):
+    """A full daily quota for every test"""
+    ledger = QuotaLedger(daily_limit=10000)
+    monkeypatch.setattr(youtube_collector, 'quota', ledger)
+    return ledger
+
+
+@pytest.fixture
+def youtube_calls(apis):
+    """(resource, query) of every YouTube Data API call, in order"""
+    calls = []
+    handle = apis.handle
+    
+    def recording(method, url, *args, **kwargs):
+        parsed = urlparse(url)
+        if parsed.hostname == 'youtube.googleapis.com':
+            query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+            calls.append((parsed.path.rstrip('/').rsplit('/', 1)[-1], query))
+        return handle(method, url, *args, **kwargs)
+    
+    apis.handle = recording
+    return calls
+
+
+def collect(channel, days=30):
+    end = datetime.now()
+    return YouTubeCollector('key', channel).collect(end - timedelta(days=days), end)
+
+
+def test_video_statistics_are_fetched_in_batches(apis, youtube_calls):
+    stats = collect('UCbatches')
+    batches = [query['id'].split(',') for resource, query in youtube_calls if resource == 'videos']
+    assert stats['videos_count'] > VIDEOS_BATCH_SIZE
+    assert len(batches) == -(-stats['videos_count'] // VIDEOS_BATCH_SIZE)
+    assert all(len(batch) <= VIDEOS_BATCH_SIZE for batch in batches)
+    assert sum(len(batch) for batch in batches) == stats['videos_count']
+
+
+def test_uploads_playlist_is_used_instead_of_search(apis, youtube_calls):
+    stats = collect('UCplaylist')
+    resources = [resource for resource, _ in youtube_calls]
+    assert 'search' not in resources
+    assert resources[0] == 'channels' and 'playlistItems' in resources
+    assert stats['source'] == 'api-playlist'
+    # Units: one per channels/playlistItems/videos call
+    assert stats['quota']['units'] == len(youtube_calls)
+    
+    # The playlist id is resolved once per process
+    youtube_calls.clear()
+    collect('UCplaylist')
+    assert youtube_calls[0] == ('channels', dict(youtube_calls[0][1], part='statistics'))
+
+
+def test_search_is_the_fallback_without_an_uploads_playlist(apis, youtube_calls):
+    handle = apis.handle
+    
+    def without_playlist(method, url, *args, **kwargs):
+        status, headers, body = handle(method, url, *args, **kwargs)
+        if urlparse(url).path.endswith('/channels'):
+            for channel in body['items']:
+                del channel['contentDetails']
+        return status, headers, body
+    
+    apis.handle = without_playlist
+    stats = collect('UCsearch', days=7)
+    assert stats['source'] == 'api-search'
+    searches = [resource for resource, _ in youtube_calls].count('search')
+    assert searches >= 1
+    assert stats['quota']['units'] == 100 * searches + len(youtube_calls) - searches
+
+
+def test_exhausted_quota_falls_back_to_scraping(apis, youtube_calls, fresh_quota):
+    fresh_quota.daily_limit = 1
+    stats = collect('UCquota')
+    # Only channels.list fit in the budget
+    assert [resource for resource, _ in youtube_calls] == ['channels']
+    assert stats['api_failed']
+    assert fresh_quota.spent_today() == 1
+
+
+def test_shared_ledger_is_one_budget_for_every_instance(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    first, second = QuotaLedger(daily_limit=150), QuotaLedger(daily_limit=150)
+    first.share(path)
+    second.share(path)
+    first.spend(100)
+    with pytest.raises(youtube_collector.QuotaExceeded):
+        second.spend(100)
+    second.spend(50)
+    assert first.spent_today() == 150
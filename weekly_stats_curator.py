@@ -8,7 +8,6 @@ for weekly reporting starting from September 22nd.
 import os
 import csv
 import json
-import requests
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
@@ -16,6 +15,10 @@ import logging
 from dataclasses import dataclass
 from dotenv import load_dotenv
 
+from collectors import transport
+from collectors.google_clients import get_service, get_service_account_credentials
+from collectors.youtube_collector import MAX_SEARCH_PAGES, QUOTA_COSTS, VIDEOS_BATCH_SIZE, quota
+
 # Load environment variables
 load_dotenv()
 
@@ -85,7 +88,7 @@ class WeeklyStatsCurator:
             }
             
             # Get user's posts using public API
-            response = requests.get(
+            response = transport.get(
                 f'https://www.reddit.com/user/{self.reddit_config["username"]}/submitted.json?limit=100',
                 headers=headers,
                 timeout=10
@@ -151,7 +154,7 @@ class WeeklyStatsCurator:
                 'count': 100
             }
             
-            response = requests.get(ugc_url, headers=headers, params=params)
+            response = transport.get(ugc_url, headers=headers, params=params)
             
             if response.status_code != 200:
                 logger.warning(f"Failed to fetch LinkedIn posts: {response.status_code}")
@@ -189,7 +192,7 @@ class WeeklyStatsCurator:
                             'shares': f'List({post_id})'
                         }
                         
-                        analytics_response = requests.get(analytics_url, headers=headers, params=analytics_params)
+                        analytics_response = transport.get(analytics_url, headers=headers, params=analytics_params)
                         
                         if analytics_response.status_code == 200:
                             analytics_data = analytics_response.json()
@@ -241,7 +244,7 @@ class WeeklyStatsCurator:
                 'tweet.fields': 'public_metrics,created_at'
             }
             
-            response = requests.get(url, headers=headers, params=params)
+            response = transport.get(url, headers=headers, params=params)
             
             if response.status_code != 200:
                 logger.warning("Failed to fetch Twitter posts")
@@ -277,7 +280,7 @@ class WeeklyStatsCurator:
                 return None
             
             url = f'https://api.twitter.com/2/users/by/username/{username}'
-            response = requests.get(url, headers=headers)
+            response = transport.get(url, headers=headers)
             
             if response.status_code == 200:
                 return response.json()['data']['id']
@@ -292,38 +295,41 @@ class WeeklyStatsCurator:
         logger.info("Fetching YouTube stats...")
         
         try:
-            from googleapiclient.discovery import build
-            
-            youtube = build('youtube', 'v3', developerKey=self.youtube_config['api_key'])
-            
-            # Get channel videos
-            request = youtube.search().list(
-                part='snippet',
-                channelId=self.youtube_config['channel_id'],
-                publishedAfter=self.start_date.isoformat() + 'Z',
-                publishedBefore=self.end_date.isoformat() + 'Z',
-                type='video',
-                maxResults=50
-            )
-            
-            response = request.execute()
-            videos = response.get('items', [])
+            youtube = get_service('youtube', 'v3', developer_key=self.youtube_config['api_key'])
+            
+            # Get channel videos (search returns at most 50 per page, at 100 quota units each)
+            videos = []
+            page_token = None
+            for _ in range(MAX_SEARCH_PAGES):
+                quota.spend(QUOTA_COSTS['search.list'])
+                response = youtube.search().list(
+                    part='snippet',
+                    channelId=self.youtube_config['channel_id'],
+                    publishedAfter=self.start_date.isoformat() + 'Z',
+                    publishedBefore=self.end_date.isoformat() + 'Z',
+                    type='video',
+                    maxResults=50,
+                    pageToken=page_token
+                ).execute()
+                videos.extend(response.get('items', []))
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
             
             total_views = 0
             total_likes = 0
             
-            for video in videos:
-                video_id = video['id']['videoId']
-                
-                # Get video statistics
-                stats_request = youtube.videos().list(
+            # Get video statistics, VIDEOS_BATCH_SIZE ids per request
+            video_ids = [video['id']['videoId'] for video in videos]
+            for i in range(0, len(video_ids), VIDEOS_BATCH_SIZE):
+                quota.spend(QUOTA_COSTS['videos.list'])
+                stats_response = youtube.videos().list(
                     part='statistics',
-                    id=video_id
-                )
-                stats_response = stats_request.execute()
+                    id=','.join(video_ids[i:i + VIDEOS_BATCH_SIZE])
+                ).execute()
                 
-                if stats_response['items']:
-                    stats = stats_response['items'][0]['statistics']
+                for item in stats_response.get('items', []):
+                    stats = item['statistics']
                     total_views += int(stats.get('viewCount', 0))
                     total_likes += int(stats.get('likeCount', 0))
             
@@ -343,16 +349,13 @@ class WeeklyStatsCurator:
         logger.info("Fetching Google Search Console stats...")
         
         try:
-            from google.oauth2 import service_account
-            from googleapiclient.discovery import build
-            
-            # Load credentials
-            credentials = service_account.Credentials.from_service_account_file(
+            # Credentials and service are loaded once per process
+            credentials = get_service_account_credentials(
                 self.gsc_config['credentials_file'],
                 scopes=['https://www.googleapis.com/auth/webmasters.readonly']
             )
             
-            service = build('searchconsole', 'v1', credentials=credentials)
+            service = get_service('searchconsole', 'v1', credentials=credentials)
             
             # Get search analytics
             request = {
@@ -461,6 +464,10 @@ class WeeklyStatsCurator:
 
 def main():
     """Main function to run the weekly stats curator"""
+    # Draw from the same daily YouTube quota as the dashboard's workers
+    if os.getenv('STATS_CACHE_BACKEND', 'sqlite').lower() != 'memory':
+        quota.share(os.getenv('STATS_CACHE_PATH', os.path.join('data', 'cache.db')))
+    
     curator = WeeklyStatsCurator()
     
     try: